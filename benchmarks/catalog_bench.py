@@ -0,0 +1,86 @@
+"""
+共有カタログ（CatalogItemStore）と MemoryItemStore のワーカーごとのメモリ使用量・取得レイテンシを比較するベンチマーク
+
+    python benchmarks/catalog_bench.py --items 10000
+
+メモリは tracemalloc で計測したストア作成前後の差分です（カタログ本体はメモリマップなので含まれず、
+OS のページキャッシュで全ワーカーに共有されます）。
+
+- get (hot): LRU に載っているアイテムの取得
+- get (cold): LRU に載っていないアイテムの取得（ハッシュ表の検索と JSON のデコード）
+- list: 20件のページ取得（ランダムな offset、order_by なし）
+"""
+import argparse
+import gc
+import random
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from pathlib import Path
+
+from sonolus_models import LevelItem
+
+sys.path.insert(0, str(Path(__file__).parent))
+from routes_bench import make_engine, make_level  # noqa: E402
+
+from sonolus_fastapi.backend.catalog import Catalog, CatalogItemStore, write_catalog  # noqa: E402
+from sonolus_fastapi.backend.memory import DEFAULT_CACHE_SIZE, MemoryItemStore  # noqa: E402
+
+
+def traced(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return store, after - before
+
+
+def measure(name: str, store, count: int, number: int) -> None:
+    names = [f"level-{index}" for index in range(count)]
+    hot = names[:DEFAULT_CACHE_SIZE // 2]
+    for level in hot:
+        store.get(level)
+    get_hot = timeit.timeit(lambda: store.get(random.choice(hot)), number=number) / number
+    get_cold = timeit.timeit(lambda: store.get(random.choice(names)), number=number) / number
+    list_page = timeit.timeit(lambda: store.list(limit=20, offset=random.randrange(count)), number=number) / number
+    print(
+        f"{name:>8}  get (hot) {get_hot * 1e6:8.1f} us  get (cold) {get_cold * 1e6:8.1f} us"
+        f"  list {list_page * 1e6:8.1f} us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = make_engine()
+    levels = [make_level(index, engine.model_copy(deep=True)) for index in range(args.items)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(Path(directory) / "catalog.bin")
+        write_catalog(path, {"level": levels})
+        size = Path(path).stat().st_size
+
+        def build_memory():
+            store = MemoryItemStore(LevelItem)
+            store.add_many(level.model_copy(deep=True) for level in levels)
+            return store
+
+        memory, memory_bytes = traced(build_memory)
+        catalog, catalog_bytes = traced(lambda: CatalogItemStore(LevelItem, Catalog(path).section("level")))
+
+        print(f"{args.items} levels, catalog file {size / 1024 / 1024:.1f} MiB (shared)")
+        print(f"per-worker memory: memory {memory_bytes / 1024 / 1024:7.1f} MiB  catalog {catalog_bytes / 1024 / 1024:7.1f} MiB")
+        measure("memory", memory, args.items, args.number)
+        measure("catalog", catalog, args.items, args.number)
+        print(f"catalog LRU: {catalog.cache_hits} hits / {catalog.cache_misses} misses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+リクエストごとの SonolusContext 作成のオーバーヘッドを比較するベンチマーク
+
+    python benchmarks/context_bench.py --number 100000
+
+- pydantic: 以前の実装（全オプションを変換してから pydantic モデルを作成）
+- lazy: Sonolus.build_context（オプションは参照されたときに変換）
+- lazy+options: Sonolus.build_context の後に ctx.options を参照
+"""
+import argparse
+import timeit
+from types import SimpleNamespace
+from typing import Dict, Generic, Optional, TypeVar, Union
+
+from pydantic import BaseModel
+from starlette.requests import Request
+
+from sonolus_fastapi import Sonolus
+
+T = TypeVar("T")
+OptionValue = Union[str, int, float, bool]
+
+
+class PydanticContext(BaseModel, Generic[T]):
+    user_session: Optional[str] = None
+    request: Optional[T] = None
+    localization: Optional[str] = None
+    options: Optional[Dict[str, OptionValue]] = None
+    is_dev: bool = False
+
+
+def build_pydantic_context(sonolus: Sonolus, request: Request) -> PydanticContext:
+    options = {}
+    for option_query in sonolus._configuration_options:
+        if option_query in request.query_params:
+            raw_value = request.query_params.get(option_query)
+            option_type = sonolus._configuration_option_types.get(option_query)
+            if option_type == "toggle":
+                options[option_query] = raw_value == "1" or raw_value.lower() == "true"
+            elif option_type == "slider":
+                try:
+                    options[option_query] = float(raw_value) if "." in raw_value else int(raw_value)
+                except ValueError:
+                    options[option_query] = raw_value
+            else:
+                options[option_query] = raw_value
+    return PydanticContext(
+        user_session=request.headers.get("Sonolus-Session"),
+        localization=request.query_params.get("localization"),
+        options=options if options else None,
+        is_dev=sonolus.dev,
+    )
+
+
+def make_request() -> Request:
+    # query_params / headers はリクエストごとにパースされるので毎回作り直す
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/sonolus/levels/list",
+        "query_string": b"localization=en&speed=1.5&mirror=1&keywords=abc",
+        "headers": [(b"sonolus-session", b"session")],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+
+    sonolus = Sonolus(enable_itemstores=False)
+    sonolus.register_configuration_options([
+        SimpleNamespace(query="speed", type="slider"),
+        SimpleNamespace(query="mirror", type="toggle"),
+        SimpleNamespace(query="keywords", type="text"),
+    ])
+
+    paths = {
+        "request only": lambda: make_request().query_params,
+        "pydantic": lambda: build_pydantic_context(sonolus, make_request()),
+        "lazy": lambda: sonolus.build_context(make_request()),
+        "lazy+options": lambda: sonolus.build_context(make_request()).options,
+    }
+
+    print(f"build_context number={args.number}")
+    for name, fn in paths.items():
+        seconds = min(timeit.repeat(fn, number=args.number, repeat=3))
+        print(f"  {name:<13} {seconds / args.number * 1e6:7.2f} us/op")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+ServerItemList のレスポンスを JSON バイト列にするまでの時間を比較するベンチマーク
+
+    python benchmarks/json_encoder_bench.py --items 20 --number 2000
+
+- jsonable_encoder: FastAPI が dict の戻り値に対して行う jsonable_encoder + JSONResponse.render
+- stdlib: jsonable_encoder を通さずに標準ライブラリの json でエンコード
+- fast: pydantic-core の to_json でエンコード
+"""
+import argparse
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sonolus_models import LevelItem, ServerItemList
+
+from sonolus_fastapi.utils.json_response import encode_json, encode_json_fast
+from sonolus_fastapi.utils.response_serializer import get_response_serializer
+
+
+def make_level(index: int) -> LevelItem:
+    resource = {"hash": f"hash-{index}", "url": f"/sonolus/repository/hash-{index}"}
+    common = {"title": f"Title {index}", "author": "Author", "description": "説明", "tags": [{"title": "tag"}], "subtitle": ""}
+    return LevelItem.model_validate({
+        "name": f"level-{index}",
+        "rating": 30,
+        "artists": "Artist",
+        "cover": resource,
+        "bgm": resource,
+        "data": resource,
+        "useSkin": {"useDefault": True},
+        "useBackground": {"useDefault": True},
+        "useEffect": {"useDefault": True},
+        "useParticle": {"useDefault": True},
+        "engine": {
+            "name": "engine",
+            "thumbnail": resource,
+            "playData": resource,
+            "watchData": resource,
+            "previewData": resource,
+            "tutorialData": resource,
+            "configuration": resource,
+            "skin": {"name": "skin", "data": resource, "texture": resource, "thumbnail": resource, **common},
+            "background": {"name": "background", "data": resource, "image": resource, "thumbnail": resource, "configuration": resource, **common},
+            "effect": {"name": "effect", "data": resource, "audio": resource, "thumbnail": resource, **common},
+            "particle": {"name": "particle", "data": resource, "texture": resource, "thumbnail": resource, **common},
+            **common,
+        },
+        **common,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    result = ServerItemList(pageCount=1, items=[make_level(i) for i in range(args.items)])
+    content = get_response_serializer(ServerItemList)(result, "https://example.com")
+
+    response = JSONResponse(content=None)
+    paths = {
+        "jsonable_encoder": lambda: response.render(jsonable_encoder(content)),
+        "stdlib": lambda: encode_json(content),
+        "fast": lambda: encode_json_fast(content),
+    }
+
+    print(f"ServerItemList items={args.items} number={args.number}")
+    baseline = None
+    for name, fn in paths.items():
+        seconds = min(timeit.repeat(fn, number=args.number, repeat=3))
+        per_call = seconds / args.number * 1e6
+        baseline = baseline or per_call
+        print(f"  {name:<17} {per_call:9.1f} us/op  x{baseline / per_call:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+MemoryItemStore の通常モードと compact モードのメモリ使用量・取得レイテンシを比較するベンチマーク
+
+    python benchmarks/memory_bench.py --items 10000,80000
+
+JSON / パックから読み込んだカタログと同じく、レベルごとに EngineItem などのネストしたアイテムを
+別オブジェクトとして持たせます。メモリは tracemalloc で計測したストア作成前後の差分で、
+1万件あたりの値も出力します。
+
+- get (hot): LRU に載っているアイテムの取得
+- get (cold): LRU に載っていないアイテムの取得（JSON のデコードが発生）
+- list: 20件のページ取得（ランダムな offset、order_by なし）
+- write: batch() を使わない1件ずつの update()（スナップショットのコピーを含む）
+"""
+import argparse
+import gc
+import random
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+from sonolus_models import LevelItem
+
+sys.path.insert(0, str(Path(__file__).parent))
+from routes_bench import make_engine, make_level  # noqa: E402
+
+from sonolus_fastapi.backend.memory import DEFAULT_CACHE_SIZE, MemoryItemStore  # noqa: E402
+
+
+def build(count: int, compact: bool, cache_size: int) -> MemoryItemStore:
+    engine = make_engine()
+    store = MemoryItemStore(LevelItem, compact=compact, cache_size=cache_size)
+    with store.batch() as batch:
+        for index in range(count):
+            # 読み込んだカタログと同様に、ネストしたアイテムはレベルごとのコピーにする
+            batch.add(make_level(index, engine.model_copy(deep=True)))
+    return store
+
+
+def measure(count: int, compact: bool, cache_size: int, number: int, writes: int) -> None:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = build(count, compact, cache_size)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    rng = random.Random(0)
+    hot = [f"level-{index}" for index in range(max(1, min(count, cache_size or DEFAULT_CACHE_SIZE) // 2))]
+    for name in hot:
+        store.get(name)
+    cold = [f"level-{rng.randrange(count)}" for _ in range(number)]
+
+    get_hot = timeit.timeit(lambda: store.get(rng.choice(hot)), number=number) / number
+    get_cold = sum(timeit.timeit(lambda: store.get(name), number=1) for name in cold) / number
+    list_page = timeit.timeit(lambda: store.list(offset=rng.randrange(count)), number=number // 10) / (number // 10)
+    updated = [store.get(f"level-{rng.randrange(count)}") for _ in range(writes)]
+    write = sum(timeit.timeit(lambda: store.update(item), number=1) for item in updated) / writes
+
+    mode = f"compact(cache={cache_size})" if compact else "models"
+    print(
+        f"{mode:>20} items={count:>6} memory={used / 2**20:8.1f}MiB "
+        f"per10k={used / count * 10_000 / 2**20:7.1f}MiB "
+        f"get(hot)={get_hot * 1e6:6.1f}us get(cold)={get_cold * 1e6:6.1f}us list={list_page * 1e6:7.1f}us "
+        f"write={write * 1e6:7.1f}us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", default="10000", help="カンマ区切りのアイテム数")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE)
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--writes", type=int, default=500, help="1件ずつの書き込みの回数")
+    args = parser.parse_args()
+
+    for count in (int(value) for value in args.items.split(",")):
+        measure(count, compact=False, cache_size=0, number=args.number, writes=args.writes)
+        measure(count, compact=True, cache_size=args.cache_size, number=args.number, writes=args.writes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""
+全ルート種別 × ストレージバックエンドのエンドツーエンドベンチマーク
+
+ASGI アプリを httpx の ASGITransport でプロセス内から叩き、
+info / list / detail / community / leaderboard の各ルートのスループット・p50/p99 レイテンシ・
+ピーク RSS を計測します。バックエンドとカタログサイズの組み合わせごとに別プロセスで実行するため、
+ピーク RSS はその組み合わせだけの値になります。
+
+    python benchmarks/routes_bench.py --sizes 1000,10000,100000 --output result.json
+    python benchmarks/routes_bench.py --sizes 1000 --compare result.json --threshold 0.1
+
+--compare を指定すると保存済みの結果と比較し、スループットの低下または p99 の増加が
+閾値を超えた組み合わせがあれば終了コード 1 で終了します。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+import httpx
+from sonolus_models import (
+    EngineItem,
+    LevelItem,
+    LevelSection,
+    ServerItemCommunityComment,
+    ServerItemCommunityCommentList,
+    ServerItemCommunityInfo,
+    ServerItemDetails,
+    ServerItemInfo,
+    ServerItemLeaderboardDetails,
+    ServerItemLeaderboardRecord,
+    ServerItemLeaderboardRecordDetails,
+    ServerItemLeaderboardRecordList,
+    ServerItemList,
+)
+
+from sonolus_fastapi import Sonolus
+from sonolus_fastapi.backend import StorageBackend
+
+ROUTES = (
+    "info",
+    "list",
+    "detail",
+    "community_info",
+    "community_comments",
+    "leaderboard_detail",
+    "leaderboard_records",
+    "leaderboard_record_detail",
+)
+# コメント・レコードを持つアイテム数（カタログサイズに関係なく固定）
+HOT_ITEMS = 20
+COMMENTS_PER_ITEM = 30
+RECORDS_PER_ITEM = 30
+LEADERBOARD = "score"
+
+
+def make_engine() -> EngineItem:
+    resource = {"hash": "engine", "url": "/sonolus/repository/engine"}
+    common = {"title": "Engine", "author": "Author", "description": "", "tags": [], "subtitle": ""}
+    return EngineItem.model_validate({
+        "name": "engine",
+        "thumbnail": resource,
+        "playData": resource,
+        "watchData": resource,
+        "previewData": resource,
+        "tutorialData": resource,
+        "configuration": resource,
+        "skin": {"name": "skin", "data": resource, "texture": resource, "thumbnail": resource, **common},
+        "background": {"name": "background", "data": resource, "image": resource, "thumbnail": resource, "configuration": resource, **common},
+        "effect": {"name": "effect", "data": resource, "audio": resource, "thumbnail": resource, **common},
+        "particle": {"name": "particle", "data": resource, "texture": resource, "thumbnail": resource, **common},
+        **common,
+    })
+
+
+def make_level(index: int, engine: EngineItem) -> LevelItem:
+    resource = {"hash": f"hash-{index}", "url": f"/sonolus/repository/hash-{index}"}
+    return LevelItem(
+        name=f"level-{index}",
+        title=f"Title {index}",
+        author=f"Author {index % 100}",
+        description="説明",
+        tags=[{"title": f"tag-{index % 10}"}],
+        rating=index % 40,
+        artists="Artist",
+        engine=engine,
+        useSkin={"useDefault": True},
+        useBackground={"useDefault": True},
+        useEffect={"useDefault": True},
+        useParticle={"useDefault": True},
+        cover=resource,
+        bgm=resource,
+        data=resource,
+    )
+
+
+def seed_levels(store: Any, levels: List[LevelItem]) -> None:
+    """カタログを一括で投入する（JSON は1回の書き込み、DB は1つのトランザクション）"""
+    store.add_many(levels)
+
+
+def build_app(backend: StorageBackend, size: int, path: str) -> Sonolus:
+    options: Dict[str, Any] = {}
+    if backend == StorageBackend.JSON:
+        options["path"] = path
+    elif backend == StorageBackend.DATABASE:
+        options["url"] = f"sqlite:///{os.path.join(path, 'bench.db')}"
+    sonolus = Sonolus(backend=backend, **options)
+    items = sonolus.items
+
+    engine = make_engine()
+    seed_levels(items.level, [make_level(index, engine) for index in range(size)])
+    for index in range(min(HOT_ITEMS, size)):
+        name = f"level-{index}"
+        comments = items.level_comments.for_item(name)
+        records = items.level_leaderboards.for_item(name, LEADERBOARD)
+        for number in range(COMMENTS_PER_ITEM):
+            comments.add(ServerItemCommunityComment(
+                name=f"comment-{number}", author="Author", time=number, content="コメント",
+            ))
+        for number in range(RECORDS_PER_ITEM):
+            records.add(ServerItemLeaderboardRecord(
+                name=f"record-{number}", rank=str(number + 1), player="Player", playerUser=None, value=str(1000 - number),
+            ))
+
+    @sonolus.level.info(ServerItemInfo)
+    async def level_info(ctx):
+        return ServerItemInfo(sections=[LevelSection(title="Newest", items=items.level.list(limit=5).items)])
+
+    @sonolus.level.list(ServerItemList)
+    async def level_list(ctx, query):
+        page = int(query.get("page", 0))
+        result = items.level.list(limit=20, offset=page * 20)
+        return ServerItemList(pageCount=max(1, result.total_count // 20), items=result.items)
+
+    @sonolus.level.detail(ServerItemDetails)
+    async def level_detail(ctx, name):
+        level = items.level.get(name)
+        return ServerItemDetails(item=level, hasCommunity=True, leaderboards=[{"name": LEADERBOARD, "title": "Score"}])
+
+    @sonolus.level.community.info(ServerItemCommunityInfo)
+    async def community_info(ctx, name):
+        return ServerItemCommunityInfo(topComments=items.level_comments.for_item(name).list(limit=5).items)
+
+    @sonolus.level.community.comments(ServerItemCommunityCommentList)
+    async def community_comments(ctx, name, query):
+        result = items.level_comments.for_item(name).list(limit=10)
+        return ServerItemCommunityCommentList(pageCount=1, comments=result.items)
+
+    @sonolus.level.leaderboard.detail(ServerItemLeaderboardDetails)
+    async def leaderboard_detail(ctx, name, leaderboard_name):
+        return ServerItemLeaderboardDetails(
+            topRecords=items.level_leaderboards.for_item(name, leaderboard_name).list(limit=10).items,
+        )
+
+    @sonolus.level.leaderboard.records(ServerItemLeaderboardRecordList)
+    async def leaderboard_records(ctx, name, leaderboard_name, query):
+        result = items.level_leaderboards.for_item(name, leaderboard_name).list(limit=10)
+        return ServerItemLeaderboardRecordList(pageCount=1, records=result.items)
+
+    @sonolus.level.leaderboard.record_detail(ServerItemLeaderboardRecordDetails)
+    async def leaderboard_record_detail(ctx, name, leaderboard_name, record_name):
+        items.level_leaderboards.for_item(name, leaderboard_name).get(record_name)
+        return ServerItemLeaderboardRecordDetails(replays=[])
+
+    return sonolus
+
+
+def route_path(route: str, rng: random.Random, size: int) -> str:
+    name = f"level-{rng.randrange(size)}"
+    hot = f"level-{rng.randrange(min(HOT_ITEMS, size))}"
+    base = f"/sonolus/levels/{hot}"
+    if route == "info":
+        return "/sonolus/levels/info"
+    if route == "list":
+        return f"/sonolus/levels/list?page={rng.randrange(max(1, size // 20))}"
+    if route == "detail":
+        return f"/sonolus/levels/{name}"
+    if route == "community_info":
+        return f"{base}/community/info"
+    if route == "community_comments":
+        return f"{base}/community/comments/list"
+    if route == "leaderboard_detail":
+        return f"{base}/leaderboards/{LEADERBOARD}"
+    if route == "leaderboard_records":
+        return f"{base}/leaderboards/{LEADERBOARD}/records/list"
+    return f"{base}/leaderboards/{LEADERBOARD}/records/record-{rng.randrange(RECORDS_PER_ITEM)}"
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KiB、macOS は byte
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def drive(
+    sonolus: Sonolus,
+    route: str,
+    size: int,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    budget: float,
+) -> Dict[str, Any]:
+    rng = random.Random(route)
+    transport = httpx.ASGITransport(app=sonolus.app)
+    latencies: List[float] = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        deadline = time.perf_counter() + budget
+        for _ in range(warmup):
+            (await client.get(route_path(route, rng, size))).raise_for_status()
+            if time.perf_counter() > deadline:
+                break
+
+        paths = [route_path(route, rng, size) for _ in range(requests)]
+        # 遅いバックエンドでも終わるように、ルートごとの時間を budget 秒までに制限する
+        deadline = time.perf_counter() + budget
+
+        async def worker(chunk: List[str]) -> None:
+            for path in chunk:
+                if latencies and time.perf_counter() > deadline:
+                    return
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(paths[index::concurrency]) for index in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "route": route,
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    backend = StorageBackend(args.worker_backend)
+    with tempfile.TemporaryDirectory() as path:
+        start = time.perf_counter()
+        sonolus = build_app(backend, args.worker_size, path)
+        setup = time.perf_counter() - start
+
+        results = []
+        for route in args.routes:
+            result = asyncio.run(drive(
+                sonolus, route, args.worker_size, args.requests, args.concurrency, args.warmup, args.budget,
+            ))
+            result.update(backend=backend.value, size=args.worker_size, setup_s=setup, peak_rss_mb=peak_rss_mb())
+            results.append(result)
+    json.dump(results, sys.stdout)
+
+
+def run_suite(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for backend in args.backends:
+        for size in args.sizes:
+            command = [
+                sys.executable, os.path.abspath(__file__),
+                "--worker-backend", backend,
+                "--worker-size", str(size),
+                "--routes", ",".join(args.routes),
+                "--requests", str(args.requests),
+                "--concurrency", str(args.concurrency),
+                "--warmup", str(args.warmup),
+                "--budget", str(args.budget),
+            ]
+            output = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True).stdout
+            rows = json.loads(output)
+            for row in rows:
+                print(
+                    f"{row['backend']:<9} {row['size']:>7} {row['route']:<26} n={row['requests']:<5}"
+                    f" {row['throughput']:9.1f} req/s  p50 {row['p50_ms']:7.2f} ms"
+                    f"  p99 {row['p99_ms']:7.2f} ms  rss {row['peak_rss_mb']:7.1f} MiB",
+                    flush=True,
+                )
+            results.extend(rows)
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> int:
+    """保存済みの結果と比較し、閾値を超えて悪化した件数を返す"""
+    key = lambda row: (row["backend"], row["size"], row["route"])  # noqa: E731
+    previous: Dict[Tuple[str, int, str], Dict[str, Any]] = {key(row): row for row in baseline["results"]}
+    regressions = 0
+    print(f"\ncompared with baseline (threshold {threshold:.0%})")
+    for row in results:
+        before = previous.get(key(row))
+        if before is None:
+            continue
+        throughput = row["throughput"] / before["throughput"] - 1
+        p99 = row["p99_ms"] / before["p99_ms"] - 1
+        regressed = throughput < -threshold or p99 > threshold
+        regressions += regressed
+        print(
+            f"{'REGRESSION' if regressed else 'ok':<10} {row['backend']:<9} {row['size']:>7} {row['route']:<26}"
+            f" throughput {throughput:+7.1%}  p99 {p99:+7.1%}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", type=lambda value: value.split(","), default=[backend.value for backend in StorageBackend])
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")], default=[1000, 10000, 100000])
+    parser.add_argument("--routes", type=lambda value: value.split(","), default=list(ROUTES))
+    parser.add_argument("--requests", type=int, default=500, help="ルートごとのリクエスト数")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--budget", type=float, default=30.0, help="ルートごとの計測時間の上限（秒）")
+    parser.add_argument("--output", help="結果を保存する JSON ファイル")
+    parser.add_argument("--compare", help="比較するベースラインの JSON ファイル")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--worker-backend", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_backend:
+        run_worker(args)
+        return
+
+    results = run_suite(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "results": results,
+            }, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
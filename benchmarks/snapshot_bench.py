@@ -0,0 +1,58 @@
+"""
+メモリバックエンドのスナップショットからの復元と、JSON からの再構築（検証あり）の所要時間を比較するベンチマーク
+
+    python benchmarks/snapshot_bench.py --items 10000
+
+- rebuild: db.json と同じ dict から model_validate して add_many する（パックの読み込みに相当）
+- restore: スナップショットファイルから復元する（どちらも JSON のバイト列で、通常モードは信頼済みの入力としてデコードする）
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from routes_bench import make_engine, make_level  # noqa: E402
+
+from sonolus_models import LevelItem  # noqa: E402
+
+from sonolus_fastapi import Sonolus  # noqa: E402
+
+
+def elapsed(callback) -> float:
+    start = time.perf_counter()
+    callback()
+    return (time.perf_counter() - start) * 1000
+
+
+def measure(count: int, compact: bool, directory: str) -> None:
+    engine = make_engine()
+    raw = [make_level(index, engine).model_dump(mode="json") for index in range(count)]
+    path = str(Path(directory) / f"memory-{int(compact)}.snapshot")
+
+    source = Sonolus(compact=compact)
+    rebuild_ms = elapsed(lambda: source.items.level.add_many(LevelItem.model_validate(value) for value in raw))
+    size = source.save_snapshot(path)
+
+    restore_ms = elapsed(lambda: Sonolus(compact=compact, snapshot_path=path))
+    mmap_ms = elapsed(lambda: Sonolus(compact=compact, snapshot_path=path, snapshot_mmap=True))
+
+    mode = "compact" if compact else "normal"
+    print(f"{mode:>8} {count:>7} items  snapshot {size / 1024 / 1024:7.1f} MiB")
+    print(f"{'':>8} rebuild {rebuild_ms:9.1f} ms  restore {restore_ms:9.1f} ms  restore (mmap) {mmap_ms:9.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", default="10000", help="カンマ区切りのアイテム数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for count in (int(value) for value in args.items.split(",")):
+            for compact in (False, True):
+                measure(count, compact, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+ストアの読み取りで返す TaggableItem のラップ・アンラップのコストを計測するベンチマーク
+
+    python benchmarks/taggable_bench.py --items 100000
+
+- map: MemoryItemStore.map()（全アイテムのラップ）
+- get_many: 20件の MemoryItemStore.get_many()
+- list (compiled): store.list() の20件を ServerItemList として検証・シリアライズ（compiled_serializer=True）
+- list (legacy): 同じく従来の処理（compiled_serializer=False）
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+from fastapi import FastAPI
+from starlette.requests import Request
+from sonolus_models import LevelItem, ServerItemList
+
+sys.path.insert(0, str(Path(__file__).parent))
+from routes_bench import make_engine, make_level  # noqa: E402
+
+from sonolus_fastapi import Sonolus  # noqa: E402
+from sonolus_fastapi.backend.memory import MemoryItemStore  # noqa: E402
+
+SOURCE = "https://example.com"
+
+
+def make_request() -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/sonolus/levels/list",
+        "query_string": b"",
+        "headers": [(b"host", b"example.com")],
+        "server": ("example.com", 443),
+        "scheme": "https",
+    })
+
+
+def bench(label: str, func, number: int) -> None:
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"{label:>16}: {seconds * 1e6:10.1f}us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = make_engine()
+    store = MemoryItemStore(LevelItem)
+    with store.batch() as batch:
+        for index in range(args.items):
+            batch.add(make_level(index, engine))
+    names = [f"level-{index}" for index in range(20)]
+
+    compiled = Sonolus(address=SOURCE, app=FastAPI()).api
+    legacy = Sonolus(address=SOURCE, app=FastAPI(), compiled_serializer=False).api
+    handler = type("Handler", (), {"response_model": ServerItemList})()
+    request = make_request()
+
+    def list_response(api):
+        result = store.list(limit=20)
+        return api._build_response(handler, ServerItemList(pageCount=1, items=result.items), request, SOURCE)
+
+    print(f"items={args.items}")
+    bench("map", store.map, max(1, args.number // 100))
+    bench("get_many", lambda: store.get_many(names), args.number * 10)
+    bench("list (compiled)", lambda: list_response(compiled), args.number)
+    bench("list (legacy)", lambda: list_response(legacy), args.number)
+
+
+if __name__ == "__main__":
+    main()
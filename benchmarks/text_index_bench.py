@@ -0,0 +1,84 @@
+"""
+キーワード検索の TextIndex と apply_query の線形スキャンを比較するベンチマーク
+
+    python benchmarks/text_index_bench.py --items 100000
+
+- linear: apply_query(items, query)（全アイテムの title / subtitle / author / description を毎回走査）
+- index: TextIndex.search（n-gram の posting list から候補を絞ってスコア付け、1ページ分だけ返す）
+- index (cached): 同じキーワードの2ページ目以降（並び替え済みの結果を再利用）
+- page: search_items（MemoryItemStore から2ページ目の20件だけを取得する。検索結果はキャッシュ済み）
+
+タイトル等は `--vocabulary` 個の単語からランダムに作ります。
+"""
+import argparse
+import random
+import timeit
+from types import SimpleNamespace
+
+from sonolus_models import PostItem
+
+from sonolus_fastapi.backend.memory import MemoryItemStore
+from sonolus_fastapi.search.text_index import TextIndex, build_text_index
+from sonolus_fastapi.utils.query_executor import apply_query, search_items
+
+BASE_WORDS = ["星", "桜", "夜", "空", "夢", "光", "sky", "night", "dream", "star", "light", "rain", "千本", "初音", "ミク"]
+KEYWORDS = ["桜", "千本桜", "star", "night sky", "初音ミク", "ドラゴン", "さ"]
+KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわん"
+
+
+def make_words(count: int, rng: random.Random) -> list[str]:
+    words = list(BASE_WORDS)
+    while len(words) < count:
+        words.append("".join(rng.choices(KANA, k=rng.randint(2, 4))))
+    return words
+
+
+def make_items(count: int, vocabulary: int, seed: int = 0) -> list[PostItem]:
+    rng = random.Random(seed)
+    words = make_words(vocabulary, rng)
+    return [
+        PostItem(
+            name=f"post-{index}",
+            title="".join(rng.choices(words, k=3)),
+            subtitle=" ".join(rng.choices(words, k=2)),
+            author=f"author-{rng.randrange(1000)}",
+            description=" ".join(rng.choices(words, k=8)),
+        )
+        for index in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    items = make_items(args.items, args.vocabulary)
+    index = TextIndex()
+    build = timeit.timeit(lambda: index.rebuild({item.name: item for item in items}), number=1)
+    print(f"items={args.items} build={build * 1000:.0f}ms grams={len(index._postings)}")
+    store = MemoryItemStore(PostItem)
+    store.add_many(items)
+    store_index = build_text_index(store)
+
+    for keywords in KEYWORDS:
+        query = SimpleNamespace(keywords=keywords)
+        linear = timeit.timeit(lambda: apply_query(items, query), number=args.number) / args.number
+        indexed = timeit.timeit(
+            lambda: (index._results.clear(), index.search(keywords)), number=args.number
+        ) / args.number
+        cached = timeit.timeit(lambda: index.search(keywords, offset=20), number=args.number) / args.number
+        paged = timeit.timeit(
+            lambda: search_items(store, query, store_index, offset=20), number=args.number
+        ) / args.number
+        _, total = index.search(keywords)
+        print(
+            f"{keywords!r:>14} matches={total:>7} linear={linear * 1000:8.2f}ms "
+            f"index={indexed * 1000:8.3f}ms cached={cached * 1000:8.3f}ms page={paged * 1000:8.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Sonolus-Version ヘッダーのミドルウェアの requests/sec を比較するベンチマーク
+
+    python benchmarks/version_middleware_bench.py --requests 5000
+
+- none: ミドルウェアなし
+- base_http: 以前の `@app.middleware("http")`（BaseHTTPMiddleware）
+- asgi: SonolusVersionMiddleware
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+
+from sonolus_fastapi.utils.version_middleware import SonolusVersionMiddleware
+
+VERSION = "1.1.2"
+
+
+def create_app(kind: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sonolus/info")
+    async def info():
+        return {"title": "Benchmark"}
+
+    if kind == "base_http":
+        @app.middleware("http")
+        async def sonolus_version_middleware(request: Request, call_next):
+            response = await call_next(request)
+            if request.url.path.startswith("/sonolus"):
+                response.headers["Sonolus-Version"] = VERSION
+            return response
+    elif kind == "asgi":
+        app.add_middleware(SonolusVersionMiddleware, version=VERSION)
+
+    return app
+
+
+async def measure(app: FastAPI, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/sonolus/info")
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                response = await client.get("/sonolus/info")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"GET /sonolus/info requests={args.requests} concurrency={args.concurrency}")
+    for kind in ("none", "base_http", "asgi"):
+        rps = asyncio.run(measure(create_app(kind), args.requests, args.concurrency))
+        print(f"  {kind:<10} {rps:9.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""
+ワーカー間で共有する読み取り専用のカタログファイル
+
+パックから読み込んだアイテムを1つのファイルにまとめ、各ワーカーはそれをメモリマップして読み込みます。
+アイテムは JSON のバイト列のまま置かれ、名前での検索はファイル内のハッシュ表で行うので、
+カタログの中身は OS のページキャッシュで共有され、ワーカーごとに持つのはデコード済みアイテムの小さな LRU だけになります。
+
+    write_catalog("./data/catalog.bin", {"skin": skins, "background": backgrounds})
+    catalog = Catalog("./data/catalog.bin")
+    store = CatalogItemStore(SkinItem, catalog.section("skin"))
+
+ファイルの構成（リトルエンディアン）:
+
+- ヘッダー: マジック、バージョン、ディレクトリの位置
+- セクション（ストアごと）:
+    - レコード: [名前の長さ u32][JSON の長さ u32][名前][JSON]
+    - 並び: 書き込んだ順のレコードの位置（u64 の配列）
+    - ハッシュ表: [名前のハッシュ u64][レコードの位置 u64] のスロット（線形探索、位置 0 は空き）
+    - タグ: タグのタイトル -> 名前のリスト（JSON）
+- ディレクトリ（末尾）: fingerprint と各セクションの位置（JSON）
+
+ファイルは一時ファイルに書いてから置き換えるので、読み込み中のワーカーが途中の内容を見ることはありません。
+"""
+import json
+import mmap
+import os
+import struct
+from collections import OrderedDict
+from hashlib import blake2b
+from threading import Lock
+from typing import Any, Dict, Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from sonolus_fastapi.utils.source import dump_json_without_source
+from sonolus_fastapi.utils.taggable_item import TaggableItem, unwrap_taggable_item, wrap_taggable_item
+from sonolus_fastapi.utils.taggable_pydantic import trusted_input
+from .events import StoreEvents
+from .memory import DEFAULT_CACHE_SIZE
+from .result import ListResult
+from .sorted_index import SortedIndex, parse_order_by
+from .tag_index import TagIndex, page
+
+T = TypeVar("T")
+
+MAGIC = b"SNLSCAT\0"
+VERSION = 1
+_HEADER = struct.Struct("<8sIQ")
+_RECORD = struct.Struct("<II")
+_SLOT = struct.Struct("<QQ")
+_OFFSET = struct.Struct("<Q")
+
+
+class CatalogError(ValueError):
+    """カタログファイルが壊れている、または形式が異なる"""
+
+
+def name_hash(name: str) -> int:
+    # プロセスごとに変わる hash() ではなく、どのワーカーでも同じ値になるハッシュを使う
+    return int.from_bytes(blake2b(name.encode(), digest_size=8).digest(), "little")
+
+
+def _table_size(count: int) -> int:
+    """負荷率が 1/2 以下になる2のべき乗"""
+    size = 8
+    while size < count * 2:
+        size *= 2
+    return size
+
+
+def _write_section(f: Any, items: Iterable[Any]) -> Dict[str, Any]:
+    offsets: Dict[str, int] = {}
+    tags = TagIndex()
+    # 同じ名前のアイテムは後のものが優先される（add_many と同じ）
+    latest: Dict[str, Any] = {}
+    for item in items:
+        item = unwrap_taggable_item(item)
+        latest[item.name] = item
+    for name, item in latest.items():
+        encoded = name.encode()
+        raw = dump_json_without_source(item).encode()
+        offsets[name] = f.tell()
+        f.write(_RECORD.pack(len(encoded), len(raw)))
+        f.write(encoded)
+        f.write(raw)
+        tags.insert(name, item)
+
+    order = f.tell()
+    for offset in offsets.values():
+        f.write(_OFFSET.pack(offset))
+
+    slots = _table_size(len(offsets))
+    table: List[Tuple[int, int]] = [(0, 0)] * slots
+    mask = slots - 1
+    for name, offset in offsets.items():
+        hashed = name_hash(name)
+        index = hashed & mask
+        while table[index][1]:
+            index = (index + 1) & mask
+        table[index] = (hashed, offset)
+    table_offset = f.tell()
+    for hashed, offset in table:
+        f.write(_SLOT.pack(hashed, offset))
+
+    tags_raw = json.dumps(tags.postings(), ensure_ascii=False).encode()
+    tags_offset = f.tell()
+    f.write(tags_raw)
+    return {
+        "count": len(offsets),
+        "order": order,
+        "table": table_offset,
+        "slots": slots,
+        "tags": [tags_offset, len(tags_raw)],
+    }
+
+
+def write_catalog(path: str, sections: Dict[str, Iterable[Any]], fingerprint: str = "") -> None:
+    """
+    アイテムをカタログファイルに書き出す
+
+    Args:
+        sections: ストア名 -> アイテム
+        fingerprint: 元データの識別子（`Catalog.fingerprint` で読める。作り直しが必要かの判断に使う）
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # 複数のワーカーが同時に作成しても互いの一時ファイルを壊さないようにする
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "w+b") as f:
+            # 書き込み位置を決めるため、セクションを先に書いてからディレクトリを書く
+            f.write(b"\0" * _HEADER.size)
+            layout = {name: _write_section(f, items) for name, items in sections.items()}
+            directory_raw = json.dumps({"fingerprint": fingerprint, "sections": layout}).encode()
+            directory_offset = f.tell()
+            f.write(directory_raw)
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, VERSION, directory_offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+class CatalogSection:
+    """カタログ内の1つのストア分のアイテム"""
+
+    def __init__(self, buffer: mmap.mmap, layout: Dict[str, Any]):
+        self._buffer = buffer
+        self.count: int = layout["count"]
+        self._order: int = layout["order"]
+        self._table: int = layout["table"]
+        self._mask: int = layout["slots"] - 1
+        self._tags: Tuple[int, int] = tuple(layout["tags"])
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _record(self, offset: int) -> Tuple[str, bytes]:
+        buffer = self._buffer
+        name_length, raw_length = _RECORD.unpack_from(buffer, offset)
+        start = offset + _RECORD.size
+        name = buffer[start:start + name_length].decode()
+        start += name_length
+        return name, buffer[start:start + raw_length]
+
+    def get(self, name: str) -> Optional[bytes]:
+        """名前に対応するアイテムの JSON のバイト列を返す"""
+        buffer = self._buffer
+        hashed = name_hash(name)
+        encoded = name.encode()
+        index = hashed & self._mask
+        while True:
+            slot_hash, offset = _SLOT.unpack_from(buffer, self._table + index * _SLOT.size)
+            if not offset:
+                return None
+            if slot_hash == hashed:
+                name_length, raw_length = _RECORD.unpack_from(buffer, offset)
+                start = offset + _RECORD.size
+                if buffer[start:start + name_length] == encoded:
+                    start += name_length
+                    return buffer[start:start + raw_length]
+            index = (index + 1) & self._mask
+
+    def records(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[str, bytes]]:
+        """書き込んだ順に (名前, JSON のバイト列) を返す"""
+        stop = self.count if stop is None else min(stop, self.count)
+        for position in range(start, stop):
+            (offset,) = _OFFSET.unpack_from(self._buffer, self._order + position * _OFFSET.size)
+            yield self._record(offset)
+
+    def names(self) -> Iterator[str]:
+        for name, _ in self.records():
+            yield name
+
+    def tag_postings(self) -> Dict[str, List[str]]:
+        offset, length = self._tags
+        return json.loads(self._buffer[offset:offset + length])
+
+
+class Catalog:
+    """メモリマップしたカタログファイル"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                raise CatalogError("catalog file is truncated")
+            # ファイルを閉じてもマップは有効（置き換えられても古い内容を読み続ける）
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, directory_offset = _HEADER.unpack_from(self._buffer)
+            if magic != MAGIC:
+                raise CatalogError("not a sonolus-fastapi catalog file")
+            if version != VERSION:
+                raise CatalogError(f"unsupported catalog version {version} (expected {VERSION})")
+            directory = json.loads(self._buffer[directory_offset:])
+        except BaseException:
+            self._buffer.close()
+            raise
+        self.fingerprint: str = directory["fingerprint"]
+        self.sections: Dict[str, CatalogSection] = {
+            name: CatalogSection(self._buffer, layout) for name, layout in directory["sections"].items()
+        }
+
+    def section(self, name: str) -> CatalogSection:
+        return self.sections[name]
+
+    def close(self) -> None:
+        """メモリマップを閉じる（以降、このカタログのセクションやストアは使えない）"""
+        self._buffer.close()
+
+    def __enter__(self) -> "Catalog":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def read_fingerprint(path: str) -> Optional[str]:
+    """カタログファイルの fingerprint を返す（ファイルがない・読めない場合は None）"""
+    try:
+        with Catalog(path) as catalog:
+            return catalog.fingerprint
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+class CatalogItemStore(Generic[T]):
+    def __init__(self, item_cls, section: CatalogSection, cache_size: int = DEFAULT_CACHE_SIZE):
+        """
+        カタログのアイテムを読み取る読み取り専用のストア
+
+        名前での取得はカタログのハッシュ表を引いて JSON をデコードし、デコードしたモデルは
+        ワーカーごとの LRU に `cache_size` 件まで保持します。書き込みメソッドは RuntimeError を送出します。
+
+        Args:
+            cache_size: デコード済みのモデルを保持する件数
+        """
+        self.item_cls = item_cls
+        self.events = StoreEvents(item_cls)
+        self.section = section
+        self._tags = TagIndex.from_postings(section.tag_postings())
+        # order_by 用のインデックス（初めて使われたときに全件をデコードして作成する）
+        self._indexes: Dict[str, SortedIndex] = {}
+        self._decoded: "OrderedDict[str, T]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _decode(self, raw: bytes) -> T:
+        # カタログの作成時に検証済みの JSON なので TaggableItem は含まれない
+        with trusted_input():
+            return self.item_cls.model_validate_json(raw)
+
+    def _load(self, name: str) -> Optional[T]:
+        with self._lock:
+            item = self._decoded.get(name)
+            if item is not None:
+                self._decoded.move_to_end(name)
+                self.cache_hits += 1
+                return item
+            self.cache_misses += 1
+        raw = self.section.get(name)
+        if raw is None:
+            return None
+        item = self._decode(raw)
+        if self._cache_size > 0:
+            with self._lock:
+                self._decoded[name] = item
+                if len(self._decoded) > self._cache_size:
+                    self._decoded.popitem(last=False)
+        return item
+
+    def _index(self, key: str) -> SortedIndex:
+        index = self._indexes.get(key)
+        if index is None:
+            index = SortedIndex(key, ((name, self._decode(raw)) for name, raw in self.section.records()))
+            self._indexes[key] = index
+        return index
+
+    def get(self, name: str) -> Optional[TaggableItem[T]]:
+        self.events.record_read(name)
+        item = self._load(name)
+        if item is None:
+            return None
+        return wrap_taggable_item(item)
+
+    def list(self, limit: int = 20, offset: int = 0, order_by: Optional[str] = None) -> ListResult[T]:
+        """アイテムを取得する
+
+        Args:
+            order_by: 並び替えるフィールド名（先頭に `-` で降順）
+        """
+        self.events.record_read()
+        if limit > 20:
+            limit = 20  # 最大20件に制限
+
+        if order_by is None:
+            names = [name for name, _ in self.section.records(offset, offset + limit)]
+        else:
+            key, descending = parse_order_by(self.item_cls, order_by)
+            names = self._index(key).names(offset, limit, descending)
+        return ListResult(
+            items=[wrap_taggable_item(self._load(name)) for name in names],
+            total_count=len(self.section),
+            limit=limit,
+            offset=offset
+        )
+
+    def find_by_tags(
+        self,
+        all: Optional[Iterable[str]] = None,
+        any: Optional[Iterable[str]] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> ListResult[T]:
+        """タグで絞り込んだアイテムを名前順で取得する
+
+        Args:
+            all: すべて持っている必要があるタグのタイトル
+            any: いずれかを持っている必要があるタグのタイトル
+        """
+        self.events.record_read()
+        if limit > 20:
+            limit = 20  # 最大20件に制限
+
+        names = self._tags.find(all or (), any or ())
+        if names is None:
+            names = set(self.section.names())
+        page_names, total_count = page(names, limit, offset)
+        return ListResult(
+            items=[wrap_taggable_item(self._load(name)) for name in page_names],
+            total_count=total_count,
+            limit=limit,
+            offset=offset
+        )
+
+    def map(self) -> Dict[str, T]:
+        self.events.record_read()
+        # 全件のデコードで LRU を押し流さないように直接デコードする
+        return {name: wrap_taggable_item(self._decode(raw)) for name, raw in self.section.records()}
+
+    def get_many(self, names: List[str]) -> List[T]:
+        for name in names:
+            self.events.record_read(name)
+        result = []
+        for name in names:
+            item = self._load(name)
+            if item is not None:
+                result.append(wrap_taggable_item(item))
+        return result
+
+    def _read_only(self, *args: Any, **kwargs: Any) -> None:
+        raise RuntimeError(
+            f"The {self.item_cls.__name__} store is served from a read-only catalog. "
+            "Rebuild the catalog with Sonolus.load() to change its items."
+        )
+
+    add = update = delete = add_many = update_many = delete_many = _read_only
+
+
+__all__ = [
+    "Catalog",
+    "CatalogError",
+    "CatalogItemStore",
+    "CatalogSection",
+    "read_fingerprint",
+    "write_catalog",
+]
@@ -1,7 +1,8 @@
-from typing import Dict, Tuple, Union, Any
+from typing import TYPE_CHECKING, Dict, Optional, Tuple, Union, Any
 from sonolus_models import ItemType
 from .backend import StorageBackend
 from .community_memory import MemoryCommentStore
+from .instrumented import instrument_store
 from .community_json import JsonCommentStore
 from .community_database import (
     DatabaseCommentStore,
@@ -9,19 +10,24 @@ from .community_database import (
     init_comments_table,
 )
 
+if TYPE_CHECKING:
+    from sonolus_fastapi.utils.metrics import SonolusMetrics
+
 CommentStoreType = Union[MemoryCommentStore, JsonCommentStore, DatabaseCommentStore]
 
 class CommunityCommentStore:
     """アイテムごとのコメントを管理する統合ストア"""
     
-    def __init__(self, backend: StorageBackend, **options: Any) -> None:
+    def __init__(self, backend: StorageBackend, metrics: Optional["SonolusMetrics"] = None, **options: Any) -> None:
         """Initialize CommunityCommentStore.
         
         Args:
             backend: Storage backend type
+            metrics: If given, comment stores are wrapped to record per-operation metrics
             **options: Additional backend-specific options
         """
         self.backend: StorageBackend = backend
+        self.metrics = metrics
         self.options: dict[str, Any] = options
         
         # Memory バックエンドの場合、全データをここに保持
@@ -51,13 +57,16 @@ class CommunityCommentStore:
         
         if self.backend == StorageBackend.MEMORY:
             if key not in self._memory_data:
-                self._memory_data[key] = MemoryCommentStore(item_type, item_name)
+                self._memory_data[key] = self._instrument(MemoryCommentStore(item_type, item_name), item_type)
             return self._memory_data[key]
         
         # JSON/Database の場合、都度作成（軽量なので問題ない）
         if key not in self._stores:
-            self._stores[key] = self._create_store(item_type, item_name)
+            self._stores[key] = self._instrument(self._create_store(item_type, item_name), item_type)
         return self._stores[key]
+
+    def _instrument(self, store: CommentStoreType, item_type: ItemType) -> CommentStoreType:
+        return instrument_store(store, self.metrics, f"{item_type.name}_comments", self.backend)
     
     def _create_store(self, item_type: ItemType, item_name: str) -> CommentStoreType:
         """Create a new comment store based on backend type.
@@ -86,6 +86,8 @@ class DatabaseCommentStore:
         self.engine = engine or get_shared_community_engine(
             url or "sqlite:///./data/database.db"
         )
+        # データベースから読み込んだ JSON の文字数（計測用）
+        self.bytes_read = 0
 
         if init_table:
             self._init_table()
@@ -113,6 +115,7 @@ class DatabaseCommentStore:
             if row is None:
                 return None
             
+            self.bytes_read += len(row[0])
             return ServerItemCommunityComment.model_validate(json.loads(row[0]))
     
     def list(self, limit: int = 10, offset: int = 0) -> ListResult[ServerItemCommunityComment]:
@@ -151,6 +154,8 @@ class DatabaseCommentStore:
                 }
             ).fetchall()
         
+        self.bytes_read += sum(len(row[0]) for row in rows)
+        
         items = [
             ServerItemCommunityComment.model_validate(json.loads(row[0]))
             for row in rows
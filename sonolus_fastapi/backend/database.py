@@ -1,17 +1,46 @@
 import json
-from typing import TypeVar, Generic, List, Optional, Union
-from sqlalchemy import create_engine, text
-from sonolus_fastapi.utils.source import strip_source_fields
-from sonolus_fastapi.utils.taggable_item import TaggableItem, unwrap_taggable_item
+from typing import Any, Dict, Iterable, Tuple, TypeVar, Generic, List, Optional, Union
+from sqlalchemy import bindparam, create_engine, text
+from sonolus_fastapi.utils.source import dump_json_without_source
+from sonolus_fastapi.utils.taggable_item import TaggableItem, unwrap_taggable_item, wrap_taggable_item
+from .events import StoreEvents
 from .result import ListResult
+from .sorted_index import parse_order_by
+from .tag_index import item_tag_titles
 
 T = TypeVar("T")
 
+# IN 句に渡す名前の数の上限（SQLite のバインド変数の上限に収める）
+_IN_CHUNK = 500
+
+
+def _chunks(values: List[str], size: int = _IN_CHUNK):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _order_clause(dialect: str, key: str, descending: bool) -> Tuple[str, Dict[str, str]]:
+    """JSON の `key` の値で並べる ORDER BY 句とバインド変数を返す（値が null のアイテムは昇順で先頭）"""
+    direction = "DESC" if descending else "ASC"
+    if dialect == "sqlite":
+        # JSON の null は SQL の NULL になり、SQLite では昇順で先頭に並ぶ
+        return f"ORDER BY json_extract(data, :order_path) {direction}, name {direction}", {"order_path": f"$.{key}"}
+    if dialect == "postgresql":
+        # ->> はテキストになり数値が文字列順に並ぶので、jsonb のまま比較する
+        nulls = "NULLS LAST" if descending else "NULLS FIRST"
+        value = "NULLIF(CAST(data AS jsonb) -> :order_key, CAST('null' AS jsonb))"
+        return f"ORDER BY {value} {direction} {nulls}, name {direction}", {"order_key": key}
+    raise ValueError(f"order_by is not supported on the '{dialect}' database (only SQLite and PostgreSQL)")
+
+
 class DatabaseItemStore(Generic[T]):
     def __init__(self, item_cls, url: str):
         self.item_cls = item_cls
+        self.events = StoreEvents(item_cls)
         self.item_type = item_cls.__name__.lower()  # アイテムタイプを取得
         self.engine = create_engine(url, future=True)
+        # データベースから読み込んだ JSON の文字数（計測用）
+        self.bytes_read = 0
         
         self._init_table()
         
@@ -25,9 +54,79 @@ class DatabaseItemStore(Generic[T]):
                     PRIMARY KEY (name, item_type)
                 )
             """))
+            # タグの正規化テーブル（find_by_tags 用）
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS item_tags(
+                    item_type TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    PRIMARY KEY (item_type, tag, name)
+                )
+            """))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS item_tags_name ON item_tags (item_type, name)"))
+            # タグテーブルへの移行が終わったアイテムタイプ（タグのないアイテムだけの場合も記録する）
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS item_tags_backfilled(
+                    item_type TEXT NOT NULL PRIMARY KEY
+                )
+            """))
+            self._backfill_tags(conn)
             conn.commit()
+
+    def _backfill_tags(self, conn):
+        """タグテーブルができる前に保存されたアイテムのタグを登録する（アイテムタイプごとに1回だけ）"""
+        params = {"item_type": self.item_type}
+        if conn.execute(
+            text("SELECT 1 FROM item_tags_backfilled WHERE item_type = :item_type"), params
+        ).fetchone():
+            return
+        rows = conn.execute(text("SELECT name, data FROM items WHERE item_type = :item_type"), params).fetchall()
+        for name, data in rows:
+            self._write_tags(conn, name, json.loads(data), replace=False)
+        # 同時に起動した他のプロセスが先に記録していてもよい
+        conn.execute(
+            text("INSERT INTO item_tags_backfilled (item_type) VALUES (:item_type) ON CONFLICT DO NOTHING"), params
+        )
+
+    def _write_tags_many(self, conn, items: List[Any]):
+        """複数のアイテムのタグをまとめて書き直す"""
+        names = [item.name for item in items]
+        for chunk in _chunks(names):
+            conn.execute(
+                text("DELETE FROM item_tags WHERE item_type = :item_type AND name IN :names").bindparams(
+                    bindparam("names", expanding=True)
+                ),
+                {"item_type": self.item_type, "names": chunk}
+            )
+        rows = [
+            {"item_type": self.item_type, "tag": title, "name": item.name}
+            for item in items
+            for title in item_tag_titles(item)
+        ]
+        if rows:
+            conn.execute(
+                text("INSERT INTO item_tags (item_type, tag, name) VALUES (:item_type, :tag, :name) ON CONFLICT DO NOTHING"),
+                rows
+            )
+
+    def _write_tags(self, conn, name: str, item: Any, replace: bool = True):
+        if replace:
+            conn.execute(
+                text("DELETE FROM item_tags WHERE item_type = :item_type AND name = :name"),
+                {"item_type": self.item_type, "name": name}
+            )
+        rows = [
+            {"item_type": self.item_type, "tag": title, "name": name}
+            for title in item_tag_titles(item)
+        ]
+        if rows:
+            conn.execute(
+                text("INSERT INTO item_tags (item_type, tag, name) VALUES (:item_type, :tag, :name) ON CONFLICT DO NOTHING"),
+                rows
+            )
             
     def get(self, name: str) -> Optional[Union[T, TaggableItem[T]]]:
+        self.events.record_read(name)
         with self.engine.connect() as conn:
             row = conn.execute(
                 text("SELECT data FROM items WHERE name = :name AND item_type = :item_type"),
@@ -37,12 +136,27 @@ class DatabaseItemStore(Generic[T]):
             if row is None:
                 return None
             
+            self.bytes_read += len(row[0])
             item = self.item_cls.model_validate(json.loads(row[0]))
-            return TaggableItem(item)
+            return wrap_taggable_item(item)
         
-    def list(self, limit: int = 20, offset: int = 0) -> ListResult[T]:
+    def list(self, limit: int = 20, offset: int = 0, order_by: Optional[str] = None) -> ListResult[T]:
+        """アイテムを取得する
+
+        Args:
+            order_by: 並び替えるフィールド名（先頭に `-` で降順）。SQLite / PostgreSQL のみ対応
+                （それ以外のデータベースでは ValueError）
+        """
+        self.events.record_read()
         if limit > 20:
             limit = 20  # 最大20件に制限
+
+        order_clause = ""
+        params = {"item_type": self.item_type, "limit": limit, "offset": offset}
+        if order_by is not None:
+            key, descending = parse_order_by(self.item_cls, order_by)
+            order_clause, order_params = _order_clause(self.engine.dialect.name, key, descending)
+            params.update(order_params)
         
         with self.engine.begin() as conn:
             # totalcountを取得
@@ -54,17 +168,18 @@ class DatabaseItemStore(Generic[T]):
             
             # データを取得
             rows = conn.execute(
-                text("SELECT data FROM items WHERE item_type = :item_type LIMIT :limit OFFSET :offset"),
-                {"item_type": self.item_type, "limit": limit, "offset": offset}
+                text(f"SELECT data FROM items WHERE item_type = :item_type {order_clause} LIMIT :limit OFFSET :offset"),
+                params
             ).fetchall()
 
+        self.bytes_read += sum(len(row[0]) for row in rows)
         items = [
             self.item_cls.model_validate(json.loads(row[0]))
             for row in rows
         ]
         
         # Wrap items with TaggableItem for consistency with get()
-        wrapped_items = [TaggableItem(item) for item in items]
+        wrapped_items = [wrap_taggable_item(item) for item in items]
         
         return ListResult(
             items=wrapped_items,
@@ -75,8 +190,7 @@ class DatabaseItemStore(Generic[T]):
         
     def add(self, item: T):
         item = unwrap_taggable_item(item)
-        item = strip_source_fields(item)
-        data = json.dumps(item.model_dump(mode="python"), ensure_ascii=False)
+        data = dump_json_without_source(item)
 
         with self.engine.begin() as conn:
             conn.execute(
@@ -87,6 +201,8 @@ class DatabaseItemStore(Generic[T]):
                 """),
                 {"name": item.name, "item_type": self.item_type, "data": data}
             )
+            self._write_tags(conn, item.name, item)
+        self.events.notify_write(item.name)
             
     def delete(self, name: str):
         with self.engine.begin() as conn:
@@ -94,32 +210,181 @@ class DatabaseItemStore(Generic[T]):
                 text("DELETE FROM items WHERE name=:name AND item_type=:item_type"),
                 {"name": name, "item_type": self.item_type}
             )
+            conn.execute(
+                text("DELETE FROM item_tags WHERE item_type = :item_type AND name = :name"),
+                {"name": name, "item_type": self.item_type}
+            )
+        self.events.notify_write(name)
             
     def update(self, item: T):
         item = unwrap_taggable_item(item)
-        item = strip_source_fields(item)
-        data = json.dumps(item.model_dump(mode="python"), ensure_ascii=False)
+        data = dump_json_without_source(item)
         
         with self.engine.begin() as conn:
-            conn.execute(
+            result = conn.execute(
                 text("UPDATE items SET data=:data WHERE name=:name AND item_type=:item_type"),
                 {"name": item.name, "item_type": self.item_type, "data": data}
             )
+            if result.rowcount:
+                self._write_tags(conn, item.name, item)
+        self.events.notify_write(item.name)
+
+    def _prepare(self, items: Iterable[T]) -> List[T]:
+        # 同じ名前が複数ある場合は後のものを使う
+        prepared = {}
+        for item in items:
+            item = unwrap_taggable_item(item)
+            prepared[item.name] = item
+        return list(prepared.values())
+
+    def _rows(self, items: List[T]) -> List[dict]:
+        return [
+            {
+                "name": item.name,
+                "item_type": self.item_type,
+                "data": dump_json_without_source(item),
+            }
+            for item in items
+        ]
+
+    def add_many(self, items: Iterable[T]):
+        """複数のアイテムを1つのトランザクションで追加する（既にある場合は上書き）"""
+        items = self._prepare(items)
+        if not items:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("""
+                    INSERT INTO items (name, item_type, data)
+                    VALUES (:name, :item_type, :data)
+                    ON CONFLICT(name, item_type) DO UPDATE SET data=excluded.data
+                """),
+                self._rows(items)
+            )
+            self._write_tags_many(conn, items)
+        for item in items:
+            self.events.notify_write(item.name)
+
+    def update_many(self, items: Iterable[T]):
+        """既にある複数のアイテムを1つのトランザクションで更新する"""
+        items = self._prepare(items)
+        if not items:
+            return
+        with self.engine.begin() as conn:
+            existing = set()
+            for chunk in _chunks([item.name for item in items]):
+                existing.update(
+                    row[0] for row in conn.execute(
+                        text("SELECT name FROM items WHERE item_type = :item_type AND name IN :names").bindparams(
+                            bindparam("names", expanding=True)
+                        ),
+                        {"item_type": self.item_type, "names": chunk}
+                    )
+                )
+            updated = [item for item in items if item.name in existing]
+            if updated:
+                conn.execute(
+                    text("UPDATE items SET data=:data WHERE name=:name AND item_type=:item_type"),
+                    self._rows(updated)
+                )
+                self._write_tags_many(conn, updated)
+        for item in items:
+            self.events.notify_write(item.name)
+
+    def delete_many(self, names: Iterable[str]):
+        """複数のアイテムを1つのトランザクションで削除する"""
+        names = list(dict.fromkeys(names))
+        if not names:
+            return
+        with self.engine.begin() as conn:
+            for chunk in _chunks(names):
+                params = {"item_type": self.item_type, "names": chunk}
+                for table in ("items", "item_tags"):
+                    conn.execute(
+                        text(f"DELETE FROM {table} WHERE item_type = :item_type AND name IN :names").bindparams(
+                            bindparam("names", expanding=True)
+                        ),
+                        params
+                    )
+        for name in names:
+            self.events.notify_write(name)
+
+    def find_by_tags(
+        self,
+        all: Optional[Iterable[str]] = None,
+        any: Optional[Iterable[str]] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> ListResult[T]:
+        """タグで絞り込んだアイテムを名前順で取得する
+
+        Args:
+            all: すべて持っている必要があるタグのタイトル
+            any: いずれかを持っている必要があるタグのタイトル
+        """
+        self.events.record_read()
+        if limit > 20:
+            limit = 20  # 最大20件に制限
+
+        required = sorted(set(all or ()))
+        optional = sorted(set(any or ()))
+        conditions = []
+        params: dict[str, Any] = {"item_type": self.item_type, "limit": limit, "offset": offset}
+        bind = []
+        if required:
+            conditions.append("""
+                AND name IN (
+                    SELECT name FROM item_tags
+                    WHERE item_type = :item_type AND tag IN :all_tags
+                    GROUP BY name HAVING COUNT(*) = :all_count
+                )
+            """)
+            params["all_tags"] = required
+            params["all_count"] = len(required)
+            bind.append(bindparam("all_tags", expanding=True))
+        if optional:
+            conditions.append("""
+                AND name IN (
+                    SELECT name FROM item_tags
+                    WHERE item_type = :item_type AND tag IN :any_tags
+                )
+            """)
+            params["any_tags"] = optional
+            bind.append(bindparam("any_tags", expanding=True))
+        where = "WHERE item_type = :item_type " + " ".join(conditions)
+
+        with self.engine.connect() as conn:
+            count_params = {key: value for key, value in params.items() if key not in ("limit", "offset")}
+            total_count = conn.execute(
+                text(f"SELECT COUNT(*) FROM items {where}").bindparams(*bind), count_params
+            ).scalar() or 0
+            rows = conn.execute(
+                text(f"SELECT data FROM items {where} ORDER BY name LIMIT :limit OFFSET :offset").bindparams(*bind),
+                params
+            ).fetchall()
+
+        self.bytes_read += sum(len(row[0]) for row in rows)
+        items = [wrap_taggable_item(self.item_cls.model_validate(json.loads(row[0]))) for row in rows]
+        return ListResult(items=items, total_count=total_count, limit=limit, offset=offset)
         
     def map(self) -> dict[str, T]:
+        self.events.record_read()
         with self.engine.connect() as conn:
             rows = conn.execute(
                 text("SELECT name, data FROM items WHERE item_type = :item_type"),
                 {"item_type": self.item_type}
             ).fetchall()
         
+        self.bytes_read += sum(len(row[1]) for row in rows)
         # Wrap items with TaggableItem for consistency with get()
         return {
-            row[0]: TaggableItem(self.item_cls.model_validate(json.loads(row[1])))
+            row[0]: wrap_taggable_item(self.item_cls.model_validate(json.loads(row[1])))
             for row in rows
         }
         
     def get_many(self, names: List[str]) -> List[T]:
+        for name in names:
+            self.events.record_read(name)
         if not names:
             return []
             
@@ -134,6 +399,7 @@ class DatabaseItemStore(Generic[T]):
                 params
             ).fetchall()
         
+        self.bytes_read += sum(len(row[1]) for row in rows)
         items_dict = {
             row[0]: self.item_cls.model_validate(json.loads(row[1]))
             for row in rows
@@ -141,4 +407,4 @@ class DatabaseItemStore(Generic[T]):
         
         # Wrap items with TaggableItem for consistency with get()
         # 渡された順序でアイテムを返す
-        return [TaggableItem(items_dict[name]) for name in names if name in items_dict]
\ No newline at end of file
+        return [wrap_taggable_item(items_dict[name]) for name in names if name in items_dict]
\ No newline at end of file
@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Iterator, Optional, Set, Tuple
+
+# (StoreEvents, アイテム名) の組。アイテム名が None の場合はストア全体を表す
+Dependency = Tuple["StoreEvents", Optional[str]]
+WriteListener = Callable[["StoreEvents", Optional[str]], None]
+
+_dependencies: ContextVar[Optional[Set[Dependency]]] = ContextVar(
+    "sonolus_store_dependencies", default=None
+)
+
+
+class StoreEvents:
+    """アイテムストアの読み込み・書き込みを通知するイベントハブ"""
+
+    def __init__(self, item_cls) -> None:
+        self.item_cls = item_cls
+        self.revision: int = 0
+        self._listeners: list[WriteListener] = []
+        self._lock = Lock()
+
+    def subscribe(self, listener: WriteListener) -> None:
+        """書き込み時に呼ばれるリスナーを登録する"""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def unsubscribe(self, listener: WriteListener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def record_read(self, name: Optional[str] = None) -> None:
+        """現在のリクエストが読んだアイテムを記録する（name=None はストア全体）"""
+        dependencies = _dependencies.get()
+        if dependencies is not None:
+            dependencies.add((self, name))
+
+    def notify_write(self, name: Optional[str] = None) -> None:
+        """アイテムの追加・更新・削除をリスナーへ通知する"""
+        with self._lock:
+            self.revision += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(self, name)
+
+
+@contextmanager
+def record_dependencies() -> Iterator[Set[Dependency]]:
+    """ブロック内で読み込まれたアイテムを収集する"""
+    dependencies: Set[Dependency] = set()
+    token = _dependencies.set(dependencies)
+    try:
+        yield dependencies
+    finally:
+        _dependencies.reset(token)
+
+
+def get_store_events(store) -> Optional[StoreEvents]:
+    """ストアの StoreEvents を返す（独自ストアなどで存在しない場合は None）"""
+    events = getattr(store, "events", None)
+    return events if isinstance(events, StoreEvents) else None
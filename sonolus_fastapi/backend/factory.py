@@ -1,22 +1,29 @@
 from .backend import StorageBackend
-from .memory import MemoryItemStore
+from .memory import DEFAULT_CACHE_SIZE, MemoryItemStore
 from .json import JsonItemStore
 from .database import DatabaseItemStore
-from typing import TypeVar, Any, Type, Union
+from .instrumented import instrument_store
+from typing import TYPE_CHECKING, Optional, TypeVar, Any, Type, Union
+
+if TYPE_CHECKING:
+    from sonolus_fastapi.utils.metrics import SonolusMetrics
 
 T = TypeVar("T")
 
 class StoreFactory:
     """Factory for creating item stores with different backends."""
     
-    def __init__(self, backend: StorageBackend, **options: Any) -> None:
+    def __init__(self, backend: StorageBackend, metrics: Optional["SonolusMetrics"] = None, **options: Any) -> None:
         """Initialize StoreFactory.
         
         Args:
             backend: Storage backend type
-            **options: Backend-specific options (e.g., path for JSON, url for DATABASE)
+            metrics: If given, created stores are wrapped to record per-operation metrics
+            **options: Backend-specific options (e.g., path for JSON, url for DATABASE,
+                indexes={"level": ["rating"]}, compact=True / compact=["level"], cache_size=1024 for MEMORY)
         """
         self.backend: StorageBackend = backend
+        self.metrics = metrics
         self.options: dict[str, Any] = options
         
     def create(self, item_cls: Type[T]) -> Union[MemoryItemStore, "JsonItemStore", "DatabaseItemStore"]:
@@ -31,8 +38,24 @@ class StoreFactory:
         Raises:
             ValueError: If backend is not supported
         """
+        # LevelItem -> level
+        name = item_cls.__name__.removesuffix("Item").lower()
+        return instrument_store(self._create(item_cls), self.metrics, name, self.backend)
+
+    def _create(self, item_cls: Type[T]) -> Union[MemoryItemStore, "JsonItemStore", "DatabaseItemStore"]:
         if self.backend == StorageBackend.MEMORY:
-            return MemoryItemStore(item_cls)
+            # indexes={"level": ["rating", "title"]} のようにストアごとのソート済みインデックスを指定できる
+            # compact=True（全ストア）または compact=["level"] でアイテムをバイト列で保持する
+            name = item_cls.__name__.removesuffix("Item").lower()
+            compact = self.options.get("compact", False)
+            if not isinstance(compact, bool):
+                compact = name in compact
+            return MemoryItemStore(
+                item_cls,
+                indexes=self.options.get("indexes", {}).get(name, ()),
+                compact=compact,
+                cache_size=self.options.get("cache_size", DEFAULT_CACHE_SIZE),
+            )
         elif self.backend == StorageBackend.JSON:
             return JsonItemStore(item_cls, path=self.options.get("path", "./data"))
         elif self.backend == StorageBackend.DATABASE:
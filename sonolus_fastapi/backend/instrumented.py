@@ -0,0 +1,117 @@
+"""
+ストア操作の計測ラッパー
+
+`StoreFactory` / `CommunityCommentStore` / `LeaderboardRecordStore` に `metrics` を渡すと、
+作成されるストアがこのラッパーで包まれ、操作ごとのレイテンシ・呼び出し回数・読み込み件数・
+読み込みバイト数（`bytes_read` を持つストアのみ）が SonolusMetrics に記録されます。
+計測対象以外の属性はそのまま元のストアに委譲します。
+"""
+from __future__ import annotations
+
+from time import perf_counter
+from typing import Any, Callable, Generic, TypeVar
+
+from sonolus_fastapi.utils.metrics import SonolusMetrics
+
+T = TypeVar("T")
+
+# 計測するストアのメソッド
+OPERATIONS = frozenset({
+    "get",
+    "get_many",
+    "list",
+    "map",
+    "count",
+    "add",
+    "update",
+    "delete",
+    "add_many",
+    "update_many",
+    "delete_many",
+})
+
+
+def count_rows(result: Any) -> int:
+    """操作の戻り値から読み込んだ件数を数える"""
+    if result is None or isinstance(result, (bool, int)):
+        return 0
+    items = getattr(result, "items", None)
+    if isinstance(items, list):
+        return len(items)
+    if isinstance(result, (list, tuple, dict)):
+        return len(result)
+    return 1
+
+
+class InstrumentedStore(Generic[T]):
+    """ストアを包み、操作ごとの計測値を SonolusMetrics に記録するラッパー"""
+
+    __slots__ = ("_store", "_metrics", "_name", "_backend", "_methods")
+
+    def __init__(self, store: T, metrics: SonolusMetrics, name: str, backend: str):
+        object.__setattr__(self, "_store", store)
+        object.__setattr__(self, "_metrics", metrics)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_backend", backend)
+        object.__setattr__(self, "_methods", {})
+        metrics.register_cached_store(name, backend, store)
+
+    @property
+    def wrapped(self) -> T:
+        """包んでいる元のストア"""
+        return self._store
+
+    def __getattr__(self, attr: str) -> Any:
+        method = self._methods.get(attr)
+        if method is not None:
+            return method
+        value = getattr(self._store, attr)
+        if attr in OPERATIONS and callable(value):
+            method = self._methods[attr] = self._instrument(attr, value)
+            return method
+        return value
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        setattr(self._store, attr, value)
+
+    def __repr__(self) -> str:
+        return f"InstrumentedStore({self._store!r})"
+
+    def _instrument(self, operation: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        store = self._store
+        metrics = self._metrics
+        name = self._name
+        backend = self._backend
+
+        def instrumented(*args: Any, **kwargs: Any) -> Any:
+            bytes_before = getattr(store, "bytes_read", 0)
+            start = perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except Exception:
+                metrics.observe_store(name, backend, operation, perf_counter() - start, error=True)
+                raise
+            elapsed = perf_counter() - start
+            metrics.observe_store(
+                name,
+                backend,
+                operation,
+                elapsed,
+                rows=count_rows(result),
+                bytes_read=getattr(store, "bytes_read", 0) - bytes_before,
+            )
+            return result
+
+        instrumented.__name__ = operation
+        instrumented.__doc__ = method.__doc__
+        return instrumented
+
+
+def instrument_store(store: T, metrics: SonolusMetrics | None, name: str, backend: Any) -> T:
+    """`metrics` が指定されている場合にストアを計測ラッパーで包む"""
+    if metrics is None:
+        return store
+    return InstrumentedStore(store, metrics, name, getattr(backend, "value", str(backend)))  # type: ignore[return-value]
+
+
+__all__ = ["InstrumentedStore", "instrument_store", "count_rows"]
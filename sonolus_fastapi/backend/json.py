@@ -1,15 +1,20 @@
 import json
 import os
-from typing import TypeVar, Generic, Dict, List, Optional, Union
-from sonolus_fastapi.utils.source import strip_source_fields
-from sonolus_fastapi.utils.taggable_item import TaggableItem, unwrap_taggable_item
+from itertools import islice
+from typing import Iterable, TypeVar, Generic, Dict, List, Optional, Union
+from sonolus_fastapi.utils.source import dump_without_source
+from sonolus_fastapi.utils.taggable_item import TaggableItem, unwrap_taggable_item, wrap_taggable_item
+from .events import StoreEvents
 from .result import ListResult
+from .sorted_index import parse_order_by, sort_entry
+from .tag_index import TagIndex, page
 
 T = TypeVar("T")
 
 class JsonItemStore(Generic[T]):
     def __init__(self, item_cls, path: str = "./data"):
         self.item_cls = item_cls
+        self.events = StoreEvents(item_cls)
         self.path = path
         os.makedirs(self.path, exist_ok=True)
         
@@ -17,6 +22,7 @@ class JsonItemStore(Generic[T]):
         self._data: Dict[str, dict] = {}
         
         self._load()
+        self._tags = TagIndex(self._data.items())
         
     def _load(self):
         if os.path.exists(self.file):
@@ -28,26 +34,40 @@ class JsonItemStore(Generic[T]):
             json.dump(self._data, f, ensure_ascii=False, indent=2)
                 
     def get(self, name: str) -> Optional[Union[T, TaggableItem[T]]]:
+        self.events.record_read(name)
         raw = self._data.get(name)
         if raw is None:
             return None
         
         item = self.item_cls.model_validate(raw)
-        return TaggableItem(item)
+        return wrap_taggable_item(item)
     
-    def list(self, limit: int = 20, offset: int = 0) -> ListResult[T]:
+    def list(self, limit: int = 20, offset: int = 0, order_by: Optional[str] = None) -> ListResult[T]:
+        """アイテムを取得する
+
+        Args:
+            order_by: 並び替えるフィールド名（先頭に `-` で降順）
+        """
+        self.events.record_read()
         if limit > 20:
             limit = 20  # 最大20件に制限
         
-        all_items = [
-            self.item_cls.model_validate(v)
-            for v in self._data.values()
-        ]
-        total_count = len(all_items)
-        items = all_items[offset:offset + limit]
+        total_count = len(self._data)
+        if order_by is None:
+            page = list(islice(self._data.values(), offset, offset + limit))
+        else:
+            key, descending = parse_order_by(self.item_cls, order_by)
+            ordered = sorted(
+                self._data.items(),
+                key=lambda pair: sort_entry(pair[0], pair[1].get(key)),
+                reverse=descending,
+            )
+            page = [raw for _, raw in ordered[offset:offset + limit]]
+        # 返すページの分だけ検証する
+        items = [self.item_cls.model_validate(raw) for raw in page]
         
         # Wrap items with TaggableItem for consistency with get()
-        wrapped_items = [TaggableItem(item) for item in items]
+        wrapped_items = [wrap_taggable_item(item) for item in items]
         
         return ListResult(
             items=wrapped_items,
@@ -56,36 +76,102 @@ class JsonItemStore(Generic[T]):
             offset=offset
         )
         
+    def _put(self, name: str, raw: dict):
+        # TagIndex は名前ごとに挿入時のタグを覚えているので、古いアイテムを読まずに置き換えられる
+        self._tags.remove(name)
+        self._tags.insert(name, raw)
+        self._data[name] = raw
+
     def add(self, item: T):
         item = unwrap_taggable_item(item)
-        item = strip_source_fields(item)
-        self._data[item.name] = item.model_dump(mode="python")
+        self._put(item.name, dump_without_source(item))
         self._save()
+        self.events.notify_write(item.name)
         
     def delete(self, name: str):
         if name in self._data:
-            del self._data[name]
+            self._tags.remove(name, self._data.pop(name))
             self._save()
+            self.events.notify_write(name)
         else:
             pass
     
     def update(self, item: T):
         item = unwrap_taggable_item(item)
-        item = strip_source_fields(item)
-        self._data[item.name] = item.model_dump(mode="python")
+        self._put(item.name, dump_without_source(item))
         self._save()
+        self.events.notify_write(item.name)
+
+    def add_many(self, items: Iterable[T]):
+        """複数のアイテムを追加する（ファイルへの書き込みは1回だけ）"""
+        names = []
+        for item in items:
+            item = unwrap_taggable_item(item)
+            self._put(item.name, dump_without_source(item))
+            names.append(item.name)
+        if names:
+            self._save()
+        for name in names:
+            self.events.notify_write(name)
+
+    def update_many(self, items: Iterable[T]):
+        """複数のアイテムを更新する（ファイルへの書き込みは1回だけ）"""
+        self.add_many(items)
+
+    def delete_many(self, names: Iterable[str]):
+        """複数のアイテムを削除する（ファイルへの書き込みは1回だけ）"""
+        deleted = []
+        for name in names:
+            if name in self._data:
+                self._tags.remove(name, self._data.pop(name))
+                deleted.append(name)
+        if deleted:
+            self._save()
+        for name in deleted:
+            self.events.notify_write(name)
+
+    def find_by_tags(
+        self,
+        all: Optional[Iterable[str]] = None,
+        any: Optional[Iterable[str]] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> ListResult[T]:
+        """タグで絞り込んだアイテムを名前順で取得する
+
+        Args:
+            all: すべて持っている必要があるタグのタイトル
+            any: いずれかを持っている必要があるタグのタイトル
+        """
+        self.events.record_read()
+        if limit > 20:
+            limit = 20  # 最大20件に制限
+
+        names = self._tags.find(all or (), any or ())
+        if names is None:
+            names = set(self._data)
+        page_names, total_count = page(names, limit, offset)
+        return ListResult(
+            items=[wrap_taggable_item(self.item_cls.model_validate(self._data[name])) for name in page_names],
+            total_count=total_count,
+            limit=limit,
+            offset=offset
+        )
     
     def map(self) -> Dict[str, T]:
+        self.events.record_read()
         # Wrap items with TaggableItem for consistency with get()
         return {
-            name: TaggableItem(self.item_cls.model_validate(data))
+            name: wrap_taggable_item(self.item_cls.model_validate(data))
             for name, data in self._data.items()
         }
     
     def get_many(self, names: List[str]) -> List[T]:
+        for name in names:
+            self.events.record_read(name)
         result = []
         for name in names:
             if name in self._data:
                 # Wrap items with TaggableItem for consistency with get()
-                result.append(TaggableItem(self.item_cls.model_validate(self._data[name])))
+                result.append(wrap_taggable_item(self.item_cls.model_validate(self._data[name])))
         return result
\ No newline at end of file
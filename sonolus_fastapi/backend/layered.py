@@ -0,0 +1,128 @@
+"""
+copy-on-write 用の dict
+
+MemoryItemStore は書き込みごとにスナップショットのコピーを作るため、dict をそのままコピーすると
+1件の書き込みでも全件のコピーになります。`LayeredDict` は共有する読み取り専用の base と、
+コピーごとの小さな差分（更新・削除・追加）に分けて持ち、`copy()` では差分だけをコピーします。
+差分が大きくなったら（base の件数の平方根程度）、コピーのときに1つの dict にまとめ直します。
+
+順序は dict と同じで、既存のキーの更新は位置を変えず、新しいキー（削除後の再追加を含む）は末尾に並びます。
+"""
+from math import isqrt
+from typing import Any, Dict, Iterator, Mapping, Optional, Set, Tuple, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+_MISSING: Any = object()
+# 差分がこの件数を超えたら copy() でまとめ直す（base が小さいときの下限）
+MIN_OVERLAY = 64
+
+
+class LayeredDict(Mapping[K, V]):
+    """
+    base（変更しない dict）+ 差分で表した dict
+
+    書き込み（`__setitem__` / `pop`）は公開前のコピーに対してだけ行う。
+    """
+
+    __slots__ = ("_base", "_changed", "_deleted", "_appended")
+
+    def __init__(self, base: Optional[Dict[K, V]] = None):
+        self._base: Dict[K, V] = base if base is not None else {}
+        # base にあるキーの新しい値
+        self._changed: Dict[K, V] = {}
+        # base から削除したキー
+        self._deleted: Set[K] = set()
+        # base にない（または削除後に追加された）キー。末尾に並ぶ
+        self._appended: Dict[K, V] = {}
+
+    def _overlay_size(self) -> int:
+        return len(self._changed) + len(self._deleted) + len(self._appended)
+
+    def copy(self) -> "LayeredDict[K, V]":
+        """base を共有し、差分だけをコピーする"""
+        if self._overlay_size() > max(MIN_OVERLAY, isqrt(len(self._base)) * 2):
+            return LayeredDict(dict(self.items()))
+        layered = LayeredDict(self._base)
+        layered._changed = dict(self._changed)
+        layered._deleted = set(self._deleted)
+        layered._appended = dict(self._appended)
+        return layered
+
+    def get(self, key: K, default: Any = None) -> Any:
+        value = self._appended.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = self._changed.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if key in self._deleted:
+            return default
+        return self._base.get(key, default)
+
+    def __getitem__(self, key: K) -> V:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._base) - len(self._deleted) + len(self._appended)
+
+    def __iter__(self) -> Iterator[K]:
+        deleted = self._deleted
+        if deleted:
+            for key in self._base:
+                if key not in deleted:
+                    yield key
+        else:
+            yield from self._base
+        yield from self._appended
+
+    def items(self) -> Iterator[Tuple[K, V]]:  # type: ignore[override]
+        deleted = self._deleted
+        changed = self._changed
+        if not deleted and not changed:
+            yield from self._base.items()
+        else:
+            for key, value in self._base.items():
+                if key in deleted:
+                    continue
+                yield key, changed.get(key, value)
+        yield from self._appended.items()
+
+    def values(self) -> Iterator[V]:  # type: ignore[override]
+        for _, value in self.items():
+            yield value
+
+    def __setitem__(self, key: K, value: V) -> None:
+        if key in self._appended:
+            self._appended[key] = value
+        elif key in self._base and key not in self._deleted:
+            self._changed[key] = value
+        else:
+            self._appended[key] = value
+
+    def pop(self, key: K, default: Any = _MISSING) -> Any:
+        if key in self._appended:
+            return self._appended.pop(key)
+        if key in self._base and key not in self._deleted:
+            self._deleted.add(key)
+            value = self._changed.pop(key, _MISSING)
+            return self._base[key] if value is _MISSING else value
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    def __delitem__(self, key: K) -> None:
+        self.pop(key)
+
+    def __repr__(self) -> str:
+        return f"LayeredDict({dict(self.items())!r})"
+
+
+__all__ = ["LayeredDict"]
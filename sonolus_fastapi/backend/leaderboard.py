@@ -1,6 +1,7 @@
-from typing import Dict, Tuple, Union, Any
+from typing import TYPE_CHECKING, Dict, Optional, Tuple, Union, Any
 from sonolus_models import ItemType
 from .backend import StorageBackend
+from .instrumented import instrument_store
 from .leaderboard_memory import MemoryRecordStore
 from .leaderboard_json import JsonRecordStore
 from .leaderboard_database import (
@@ -9,20 +10,25 @@ from .leaderboard_database import (
     init_leaderboard_records_table,
 )
 
+if TYPE_CHECKING:
+    from sonolus_fastapi.utils.metrics import SonolusMetrics
+
 RecordStoreType = Union[MemoryRecordStore, JsonRecordStore, DatabaseRecordStore]
 
 
 class LeaderboardRecordStore:
     """アイテムごとのleaderboard recordsを管理する統合ストア"""
 
-    def __init__(self, backend: StorageBackend, **options: Any) -> None:
+    def __init__(self, backend: StorageBackend, metrics: Optional["SonolusMetrics"] = None, **options: Any) -> None:
         """Initialize LeaderboardRecordStore.
 
         Args:
             backend: Storage backend type
+            metrics: If given, record stores are wrapped to record per-operation metrics
             **options: Additional backend-specific options
         """
         self.backend: StorageBackend = backend
+        self.metrics = metrics
         self.options: dict[str, Any] = options
 
         # Memory バックエンドの場合、全データをここに保持
@@ -55,18 +61,23 @@ class LeaderboardRecordStore:
 
         if self.backend == StorageBackend.MEMORY:
             if key not in self._memory_data:
-                self._memory_data[key] = MemoryRecordStore(
-                    item_type, item_name, leaderboard_name
+                self._memory_data[key] = self._instrument(
+                    MemoryRecordStore(item_type, item_name, leaderboard_name), item_type
                 )
             return self._memory_data[key]
 
         # JSON/Database の場合、都度作成（軽量なので問題ない）
         if key not in self._stores:
-            self._stores[key] = self._create_store(
-                item_type, item_name, leaderboard_name
+            self._stores[key] = self._instrument(
+                self._create_store(item_type, item_name, leaderboard_name), item_type
             )
         return self._stores[key]
 
+    def _instrument(self, store: RecordStoreType, item_type: ItemType) -> RecordStoreType:
+        return instrument_store(
+            store, self.metrics, f"{item_type.name}_leaderboard_records", self.backend
+        )
+
     def _create_store(
         self, item_type: ItemType, item_name: str, leaderboard_name: str
     ) -> RecordStoreType:
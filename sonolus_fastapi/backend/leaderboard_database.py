@@ -73,6 +73,8 @@ class DatabaseRecordStore:
         self.engine = engine or get_shared_leaderboard_engine(
             url or "sqlite:///./data/database.db"
         )
+        # データベースから読み込んだ JSON の文字数（計測用）
+        self.bytes_read = 0
 
         if init_table:
             self._init_table()
@@ -102,6 +104,7 @@ class DatabaseRecordStore:
             if row is None:
                 return None
 
+            self.bytes_read += len(row[0])
             return ServerItemLeaderboardRecord.model_validate(json.loads(row[0]))
 
     def list(
@@ -146,6 +149,8 @@ class DatabaseRecordStore:
                 },
             ).fetchall()
 
+        self.bytes_read += sum(len(row[0]) for row in rows)
+
         items = [
             ServerItemLeaderboardRecord.model_validate(json.loads(row[0]))
             for row in rows
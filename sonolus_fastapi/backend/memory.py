@@ -1,60 +1,455 @@
-from typing import Generic, TypeVar, Dict, List, Optional, Union
-from sonolus_fastapi.utils.source import strip_source_fields
-from sonolus_fastapi.utils.taggable_item import TaggableItem, unwrap_taggable_item
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import islice
+from threading import Lock, RLock, local
+from typing import AbstractSet, Generic, Iterable, Iterator, TypeVar, Dict, List, Optional, Tuple, Union
+from sonolus_fastapi.utils.source import json_has_source, strip_source_fields
+from sonolus_fastapi.utils.taggable_item import TaggableItem, unwrap_taggable_item, wrap_taggable_item
+from sonolus_fastapi.utils.taggable_pydantic import trusted_input
+from .layered import LayeredDict
+from .events import StoreEvents
 from .result import ListResult
+from .sorted_index import SortedIndex, parse_order_by
+from .tag_index import TagIndex, page
 
 T = TypeVar("T")
 
+# compact モードでデコード済みのモデルを保持する件数
+DEFAULT_CACHE_SIZE = 1024
+
+
+class _Snapshot:
+    """
+    ある時点のストアの中身（公開後は変更しない）
+
+    読み取りは `self._state` を1回だけ参照して、その時点のスナップショットだけを見る。
+    書き込みはコピーに適用してから `self._state` を差し替える（copy-on-write）。
+    """
+
+    __slots__ = ("data", "indexes", "tags", "wrapped", "previous")
+
+    def __init__(
+        self,
+        data: LayeredDict[str, object],
+        indexes: Dict[str, SortedIndex],
+        tags: TagIndex,
+        previous: Optional[Tuple[Dict[str, TaggableItem], AbstractSet[str]]] = None,
+    ):
+        self.data = data
+        self.indexes = indexes
+        self.tags = tags
+        # name -> TaggableItem（`map()` で作成し、このスナップショットの読み取りで使い回す）
+        self.wrapped: Optional[Dict[str, TaggableItem]] = None
+        # 前のスナップショットのラッパーと、その後に書き込まれた名前（`wrapped` の作成時に再利用する）
+        self.previous = previous
+
+    def wrap_all(self) -> Dict[str, TaggableItem]:
+        """全アイテムのラッパーを返す（compact モードでは使わない）"""
+        wrapped = self.wrapped
+        if wrapped is None:
+            reused, changed = self.previous or ({}, frozenset())
+            wrapped = {}
+            for name, item in self.data.items():
+                wrapper = None if name in changed else reused.get(name)
+                wrapped[name] = wrapper if wrapper is not None else wrap_taggable_item(item)
+            self.wrapped = wrapped
+            self.previous = None
+        return wrapped
+
+    def wrap(self, item: object) -> TaggableItem:
+        wrapped = self.wrapped
+        if wrapped is not None:
+            wrapper = wrapped.get(item.name)
+            if wrapper is not None:
+                return wrapper
+        return wrap_taggable_item(item)
+
+
+class MemoryItemStoreBatch(Generic[T]):
+    """
+    `MemoryItemStore.batch()` でまとめて行う書き込み
+
+    スナップショットのコピーに書き込み、`with` ブロックを抜けたときに一度に公開する。
+    ブロック内で例外が発生した場合は何も反映されない。
+    """
+
+    def __init__(self, store: "MemoryItemStore[T]", base: _Snapshot):
+        self.store = store
+        self._base = base
+        # data / インデックスは差分だけをコピーする（1件の書き込みで全件をコピーしない）
+        self._data = base.data.copy()
+        self._indexes = {key: index.copy() for key, index in base.indexes.items()}
+        self._tags = base.tags.copy()
+        # 書き込まれた名前（公開後に書き込み順で通知する）
+        self.names: Dict[str, None] = {}
+
+    def put(self, item: T) -> None:
+        """TaggableItem を取り除いたアイテムを書き込む（source はここで取り除く）"""
+        if self.store.compact:
+            # 保持するバイト列を作る1回のダンプで source の有無も確かめる
+            value = item.model_dump_json().encode()
+            if json_has_source(value):
+                item = strip_source_fields(item)
+                value = item.model_dump_json().encode()
+        else:
+            # source がなければ渡されたインスタンスをそのまま保持する（コピーしない）
+            value = item = strip_source_fields(item)
+        name = item.name
+        # インデックスは名前ごとに挿入時のキーを覚えているので、古いアイテムを読まずに置き換えられる
+        for index in self._indexes.values():
+            index.insert(name, item)
+        self._tags.remove(name)
+        self._tags.insert(name, item)
+        self._data[name] = value
+        self.names[name] = None
+
+    def add(self, item: T) -> None:
+        self.put(unwrap_taggable_item(item))
+
+    def update(self, item: T) -> None:
+        self.put(unwrap_taggable_item(item))
+
+    def delete(self, name: str) -> None:
+        if self._data.pop(name, None) is not None:
+            for index in self._indexes.values():
+                index.remove(name)
+            self._tags.remove(name)
+        self.names[name] = None
+
+    def adopt_index(self, key: str, index: SortedIndex) -> None:
+        """batch の元のスナップショットから作られたインデックスに、この batch の書き込みを反映して引き継ぐ"""
+        index = index.copy()
+        for name in self.names:
+            value = self._data.get(name)
+            if value is None:
+                index.remove(name)
+            else:
+                index.insert(name, self.store._decode(value) if self.store.compact else value)
+        self._indexes[key] = index
+
+    def snapshot(self) -> _Snapshot:
+        base = self._base
+        previous = None
+        if not self.store.compact:
+            # 書き込まれていないアイテムのラッパーは次のスナップショットでも使える
+            if base.wrapped is not None:
+                previous = (base.wrapped, self.names.keys())
+            elif base.previous is not None:
+                previous = (base.previous[0], base.previous[1] | self.names.keys())
+            # 書き込みが多い場合は古いアイテムを保持し続けないように作り直す
+            if previous is not None and len(previous[1]) > max(len(self._data) // 4, 1024):
+                previous = None
+        return _Snapshot(self._data, self._indexes, self._tags, previous)
+
+
 class MemoryItemStore(Generic[T]):
-    def __init__(self, item_cls):
+    def __init__(self, item_cls, indexes: Iterable[str] = (), compact: bool = False, cache_size: int = DEFAULT_CACHE_SIZE):
+        """
+        読み取りはロックを取らず、書き込みは copy-on-write で新しいスナップショットに差し替えます。
+        そのため、別スレッドから書き込まれている間も `list()` / `map()` は一貫した内容を返します。
+        1件の書き込みでコピーするのは差分と触れた部分だけですが、多数の書き込みは `batch()` でまとめる方が速くなります。
+
+        通常モードでは、`add()` / `update()` に渡したアイテムは（source がなければ）コピーせずにストアが保持します。
+        渡した後にそのインスタンスを書き換えないでください。書き換えた場合は `update()` に渡し直すと反映されます。
+
+        Args:
+            indexes: 作成しておくソート済みインデックスのフィールド名
+            compact: True の場合、アイテムを JSON のバイト列で保持し、アクセス時にモデルへデコードする。
+                ネストした EngineItem などのコピーを持たないため、大きなカタログでメモリ使用量が大幅に減る
+            cache_size: compact モードでデコード済みのモデルを保持する件数（LRU、ここだけは短時間ロックを取る）
+        """
         self.item_cls = item_cls
-        self._data: Dict[str, T] = {}
-        
+        self.events = StoreEvents(item_cls)
+        self.compact = compact
+        # compact モードでは data は name -> JSON のバイト列
+        self._state = _Snapshot(LayeredDict(), {}, TagIndex())
+        self._write_lock = RLock()
+        # `self._state` の差し替えだけを守る短いロック（読み取り側のインデックスの公開と書き込みの公開）
+        self._publish_lock = Lock()
+        # スレッドごとの実行中の batch
+        self._local = local()
+        if compact:
+            # name -> (デコード元のバイト列, モデル)
+            self._decoded: "OrderedDict[str, Tuple[bytes, T]]" = OrderedDict()
+            self._cache_size = cache_size
+            self._cache_lock = Lock()
+            self.cache_hits = 0
+            self.cache_misses = 0
+        for key in indexes:
+            self.create_index(key)
+
+    @property
+    def _data(self) -> LayeredDict[str, Union[T, bytes]]:
+        return self._state.data
+
+    @property
+    def _indexes(self) -> Dict[str, SortedIndex]:
+        return self._state.indexes
+
+    @property
+    def _tags(self) -> TagIndex:
+        return self._state.tags
+
+    def create_index(self, key: str) -> SortedIndex:
+        """`list(order_by=key)` 用のソート済みインデックスを作成する（作成済みならそれを返す）"""
+        key, _ = parse_order_by(self.item_cls, key.lstrip("-"))
+        state = self._state
+        return state.indexes.get(key) or self._build_index(state, key)
+
+    def _build_index(self, state: _Snapshot, key: str) -> SortedIndex:
+        """
+        スナップショットからインデックスを作り、そのスナップショットがまだ最新なら追加して公開する
+
+        読み取りから呼ばれるので `_write_lock` は取らない（実行中の batch を待たない）。
+        公開できなかった場合も、作ったインデックスは `state` の内容として正しい。
+        """
+        index = SortedIndex(key, self._items(state))
+        # data / tags は変更しないので新しいスナップショットと共有できる
+        snapshot = _Snapshot(state.data, {**state.indexes, key: index}, state.tags, state.previous)
+        snapshot.wrapped = state.wrapped
+        with self._publish_lock:
+            if self._state is state:
+                self._state = snapshot
+        return index
+
+    @contextmanager
+    def batch(self) -> Iterator[MemoryItemStoreBatch[T]]:
+        """
+        複数の書き込みをまとめて一度に公開する
+
+            with store.batch() as batch:
+                batch.add(item)
+                batch.delete("old")
+
+        ブロック内で呼ばれた `store.add()` / `update()` / `delete()` も同じ batch に入る。
+        書き込みはブロックを抜けるまで読み取りに反映されない。
+        """
+        current = getattr(self._local, "batch", None)
+        if current is not None:
+            yield current
+            return
+        with self._write_lock:
+            batch = MemoryItemStoreBatch(self, self._state)
+            self._local.batch = batch
+            try:
+                yield batch
+            finally:
+                self._local.batch = None
+            self._publish(batch)
+        for name in batch.names:
+            self.events.notify_write(name)
+
+    def _publish(self, batch: MemoryItemStoreBatch[T]) -> None:
+        with self._publish_lock:
+            for key, index in self._state.indexes.items():
+                if key not in batch._indexes:
+                    # batch の間に読み取り側が作成したインデックス（batch の元のスナップショットから作られている）
+                    batch.adopt_index(key, index)
+            self._state = batch.snapshot()
+        if self.compact:
+            with self._cache_lock:
+                for name in batch.names:
+                    self._decoded.pop(name, None)
+
+    def _load(self, name: str, state: Optional[_Snapshot] = None) -> Optional[T]:
+        """アイテムを取得する（compact モードでは LRU を経由してデコードする）"""
+        raw = (state or self._state).data.get(name)
+        if raw is None or not self.compact:
+            return raw
+        with self._cache_lock:
+            cached = self._decoded.get(name)
+            # 別のスナップショットのバイト列からデコードしたものは使わない
+            if cached is not None and cached[0] is raw:
+                self._decoded.move_to_end(name)
+                self.cache_hits += 1
+                return cached[1]
+            self.cache_misses += 1
+        item = self._decode(raw)
+        if self._cache_size > 0:
+            with self._cache_lock:
+                self._decoded[name] = (raw, item)
+                self._decoded.move_to_end(name)
+                if len(self._decoded) > self._cache_size:
+                    self._decoded.popitem(last=False)
+        return item
+
+    def _decode(self, raw: bytes) -> T:
+        # 自分で書き込んだ JSON なので TaggableItem は含まれない
+        with trusted_input():
+            return self.item_cls.model_validate_json(raw)
+
+    def _items(self, state: _Snapshot):
+        """全アイテムの (name, モデル) を返す（compact モードでもキャッシュは汚さない）"""
+        if not self.compact:
+            return state.data.items()
+        return [(name, self._decode(raw)) for name, raw in state.data.items()]
+
     def get(self, name: str) -> Optional[Union[T, TaggableItem[T]]]:
-        item = self._data.get(name)
+        self.events.record_read(name)
+        state = self._state
+        item = self._load(name, state)
         if item is None:
             return None
-        return TaggableItem(item)
-    
-    def list(self, limit: int = 20, offset: int = 0) -> ListResult[T]:
+        return state.wrap(item)
+
+    def list(self, limit: int = 20, offset: int = 0, order_by: Optional[str] = None) -> ListResult[T]:
+        """アイテムを取得する
+
+        Args:
+            order_by: 並び替えるフィールド名（先頭に `-` で降順）。未作成のインデックスはここで作成される（書き込みのロックは取らない）
+        """
+        self.events.record_read()
         if limit > 20:
             limit = 20  # 最大20件に制限
-        
-        all_items = list(self._data.values())
-        total_count = len(all_items)
-        items = all_items[offset:offset + limit]
-        
+
+        state = self._state
+        total_count = len(state.data)
+        if order_by is None:
+            names = list(islice(state.data, offset, offset + limit))
+        else:
+            key, descending = parse_order_by(self.item_cls, order_by)
+            index = state.indexes.get(key) or self._build_index(state, key)
+            names = index.names(offset, limit, descending)
+        items = [self._load(name, state) for name in names]
+
         # Wrap items with TaggableItem for consistency with get()
-        wrapped_items = [TaggableItem(item) for item in items]
-        
+        wrapped_items = [state.wrap(item) for item in items]
+
         return ListResult(
             items=wrapped_items,
             total_count=total_count,
             limit=limit,
             offset=offset
         )
-    
+
     def add(self, item: T):
-        item = unwrap_taggable_item(item)
-        item = strip_source_fields(item)
-        self._data[item.name] = item
-    
+        with self.batch() as batch:
+            batch.add(item)
+
     def delete(self, name: str):
-        self._data.pop(name, None)
-    
+        with self.batch() as batch:
+            batch.delete(name)
+
     def update(self, item: T):
-        item = unwrap_taggable_item(item)
-        item = strip_source_fields(item)
-        self._data[item.name] = item
-    
+        with self.batch() as batch:
+            batch.update(item)
+
+    def add_many(self, items: Iterable[T]):
+        """複数のアイテムを1回の batch で追加する"""
+        with self.batch() as batch:
+            for item in items:
+                batch.add(item)
+
+    def update_many(self, items: Iterable[T]):
+        """複数のアイテムを1回の batch で更新する"""
+        with self.batch() as batch:
+            for item in items:
+                batch.update(item)
+
+    def delete_many(self, names: Iterable[str]):
+        """複数のアイテムを1回の batch で削除する"""
+        with self.batch() as batch:
+            for name in names:
+                batch.delete(name)
+
+    def export(self) -> Tuple[Dict[str, Union[T, bytes]], Dict[str, List[str]]]:
+        """
+        現在のスナップショットの中身（compact モードでは JSON のバイト列）とタグのタイトル -> 名前を返す
+
+        公開済みのスナップショットは変更されないので、ロックなしで読んだ内容を新しい dict で返す。
+        """
+        state = self._state
+        return dict(state.data.items()), state.tags.postings()
+
+    def restore(
+        self,
+        data: Dict[str, Union[T, bytes]],
+        tags: Optional[Dict[str, Iterable[str]]] = None,
+    ) -> None:
+        """
+        `export()` の結果で中身を置き換える（モデルの検証は行わない）
+
+        値は検証済みのモデルか、このストアが書き出した JSON のバイト列である必要がある。
+        compact モードと値の形式が異なる場合だけ変換する（タグはどちらの形式でも同じものを使える）。
+
+        Args:
+            tags: タグのタイトル -> 名前（省略した場合はアイテムから作り直す）
+        """
+        data = dict(data)
+        if self.compact:
+            for name, value in data.items():
+                if not isinstance(value, bytes):
+                    data[name] = unwrap_taggable_item(value).model_dump_json().encode()
+        else:
+            validate_json = self.item_cls.model_validate_json
+            # 自分で書き出した JSON なので TaggableItem は含まれない
+            with trusted_input():
+                for name, value in data.items():
+                    if isinstance(value, bytes):
+                        data[name] = validate_json(value)
+        with self._write_lock:
+            state = _Snapshot(LayeredDict(data), {}, TagIndex())
+            keys = list(self._state.indexes)
+            # compact モードではデコードが必要なので、作り直すものがある場合だけ1回デコードする
+            items = self._items(state) if keys or tags is None else ()
+            if tags is None:
+                state.tags = TagIndex(items)
+            else:
+                state.tags = TagIndex.from_postings(tags)
+            state.indexes = {key: SortedIndex(key, items) for key in keys}
+            with self._publish_lock:
+                self._state = state
+            if self.compact:
+                with self._cache_lock:
+                    self._decoded.clear()
+        self.events.notify_write()
+
+    def find_by_tags(
+        self,
+        all: Optional[Iterable[str]] = None,
+        any: Optional[Iterable[str]] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> ListResult[T]:
+        """タグで絞り込んだアイテムを名前順で取得する
+
+        Args:
+            all: すべて持っている必要があるタグのタイトル
+            any: いずれかを持っている必要があるタグのタイトル
+        """
+        self.events.record_read()
+        if limit > 20:
+            limit = 20  # 最大20件に制限
+
+        state = self._state
+        names = state.tags.find(all or (), any or ())
+        if names is None:
+            names = set(state.data)
+        page_names, total_count = page(names, limit, offset)
+        return ListResult(
+            items=[state.wrap(self._load(name, state)) for name in page_names],
+            total_count=total_count,
+            limit=limit,
+            offset=offset
+        )
+
     def map(self) -> Dict[str, T]:
+        self.events.record_read()
         # Wrap items with TaggableItem for consistency with get()
-        return {name: TaggableItem(item) for name, item in self._data.items()}
-    
+        state = self._state
+        if self.compact:
+            return {name: wrap_taggable_item(item) for name, item in self._items(state)}
+        # ラッパーはスナップショットごとに一度だけ作成する
+        return dict(state.wrap_all())
+
     def get_many(self, names: List[str]) -> List[T]:
+        for name in names:
+            self.events.record_read(name)
+        state = self._state
         result = []
         for name in names:
-            if name in self._data:
+            item = self._load(name, state)
+            if item is not None:
                 # Wrap items with TaggableItem for consistency with get()
-                result.append(TaggableItem(self._data[name]))
-        return result
\ No newline at end of file
+                result.append(state.wrap(item))
+        return result
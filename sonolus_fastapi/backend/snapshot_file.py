@@ -0,0 +1,183 @@
+"""
+メモリバックエンドのスナップショットファイル
+
+アイテム・コメント・リーダーボードのメモリストアの中身を1つのバイナリファイルに書き出し、
+起動時に復元します。
+
+- アイテムは JSON のバイト列で書き出す（compact モードのストアは保持しているバイト列をそのまま使う）
+- 通常のストアは復元時に信頼済みの入力として model_validate_json でデコードする
+  （TaggableItem の前処理を省き、GC を止めて行う。モデルを pickle するより速い）
+- compact モードのストアはバイト列をそのまま持つので、デコードしない
+- タグの転置インデックスも書き出すので、復元時にタグを作り直さない
+
+    write_snapshot(sonolus, "./data/memory.snapshot")
+    restore_snapshot(sonolus, "./data/memory.snapshot", use_mmap=True)
+
+pickle を使うため、自分で書き出した信頼できるファイルだけを読み込んでください。
+"""
+import gc
+import mmap
+import os
+import pickle
+import struct
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional
+
+from .backend import StorageBackend
+from .memory import MemoryItemStore
+
+if TYPE_CHECKING:
+    from sonolus_fastapi.index import Sonolus
+
+MAGIC = b"SONOLUS-SNAPSHOT"
+VERSION = 2
+_HEADER = struct.Struct("<16sI")
+
+# スナップショットに含めるアイテムストア（ItemStores の属性名）
+ITEM_STORES = ("post", "level", "engine", "skin", "background", "effect", "particle", "replay", "user")
+
+
+class SnapshotError(ValueError):
+    """スナップショットファイルが壊れている、または形式が異なる"""
+
+
+def _unwrap(store: Any) -> Any:
+    # InstrumentedStore で包まれている場合は元のストア
+    return getattr(store, "wrapped", store)
+
+
+def _memory_stores(container: Any) -> Optional[Dict[Any, Any]]:
+    """CommunityCommentStore / LeaderboardRecordStore のメモリストア（メモリバックエンド以外は None）"""
+    if container is None or container.backend != StorageBackend.MEMORY:
+        return None
+    return container._memory_data
+
+
+def collect_snapshot(sonolus: "Sonolus") -> Dict[str, Any]:
+    """書き出す内容を集める（各ストアについてその時点の一貫した中身になる）"""
+    items: Dict[str, Dict[str, Any]] = {}
+    stores = sonolus._items
+    if stores is not None:
+        for attr in ITEM_STORES:
+            store = _unwrap(getattr(stores, attr, None))
+            if isinstance(store, MemoryItemStore):
+                data, tags = store.export()
+                if not store.compact:
+                    data = {name: item.model_dump_json().encode() for name, item in data.items()}
+                items[attr] = {"data": data, "tags": tags}
+
+    payload: Dict[str, Any] = {"items": items}
+    for key, container in (
+        ("comments", getattr(sonolus, "community_comments", None)),
+        ("records", getattr(sonolus, "leaderboard_records", None)),
+    ):
+        memory = _memory_stores(container)
+        if memory is not None:
+            # dict のコピーは GIL の下で一度に行われる
+            payload[key] = {store_key: dict(store._data) for store_key, store in list(memory.items())}
+    return payload
+
+
+def write_snapshot(sonolus: "Sonolus", path: str) -> int:
+    """
+    スナップショットをファイルに書き出し、書き込んだバイト数を返す
+
+    一時ファイルに書いてから置き換えるので、途中で止まっても前のスナップショットは残る。
+    """
+    payload = pickle.dumps(collect_snapshot(sonolus), protocol=pickle.HIGHEST_PROTOCOL)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION))
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    return _HEADER.size + len(payload)
+
+
+def _check_header(buffer: Any) -> None:
+    if len(buffer) < _HEADER.size:
+        raise SnapshotError("snapshot file is truncated")
+    magic, version = _HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise SnapshotError("not a sonolus-fastapi snapshot file")
+    if version != VERSION:
+        raise SnapshotError(f"unsupported snapshot version {version} (expected {VERSION})")
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    # 大量のオブジェクトを作る間に循環参照の GC が何度も走ると、読み込みが数倍遅くなる
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def read_snapshot(path: str, use_mmap: bool = False) -> Dict[str, Any]:
+    """
+    スナップショットファイルを読み込む
+
+    Args:
+        use_mmap: ファイルをメモリマップし、読み込み用のバッファを確保せずにページキャッシュから直接復元する
+    """
+    with _gc_paused():
+        return _read(path, use_mmap)
+
+
+def _read(path: str, use_mmap: bool) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        if not use_mmap:
+            buffer = f.read()
+            _check_header(buffer)
+            return pickle.loads(memoryview(buffer)[_HEADER.size:])
+        if os.fstat(f.fileno()).st_size == 0:
+            raise SnapshotError("snapshot file is truncated")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            _check_header(mapped)
+            with memoryview(mapped) as view, view[_HEADER.size:] as body:
+                return pickle.loads(body)
+
+
+def apply_snapshot(sonolus: "Sonolus", payload: Dict[str, Any]) -> None:
+    """読み込んだ内容をメモリストアに反映する（スナップショットにないストアは変更しない）"""
+    stores = sonolus._items
+    if stores is not None:
+        for attr, entry in payload.get("items", {}).items():
+            store = _unwrap(getattr(stores, attr, None))
+            if isinstance(store, MemoryItemStore):
+                # 通常モードのストアはここでモデルにデコードする
+                with _gc_paused():
+                    store.restore(entry["data"], entry["tags"])
+
+    for key, container in (
+        ("comments", getattr(sonolus, "community_comments", None)),
+        ("records", getattr(sonolus, "leaderboard_records", None)),
+    ):
+        if key not in payload or _memory_stores(container) is None:
+            continue
+        for store_key, data in payload[key].items():
+            container.get_store(*store_key)._data = dict(data)
+
+
+def restore_snapshot(sonolus: "Sonolus", path: str, use_mmap: bool = False) -> bool:
+    """スナップショットファイルがあれば復元し、復元したかどうかを返す"""
+    if not os.path.exists(path):
+        return False
+    apply_snapshot(sonolus, read_snapshot(path, use_mmap=use_mmap))
+    return True
+
+
+__all__ = [
+    "SnapshotError",
+    "apply_snapshot",
+    "collect_snapshot",
+    "read_snapshot",
+    "restore_snapshot",
+    "write_snapshot",
+]
@@ -0,0 +1,173 @@
+"""
+アイテムストアの並び替え用インデックス
+
+`list(order_by="rating")` / `list(order_by="-time")` のように、フィールド名（先頭に `-` で降順）を指定します。
+値が None のアイテムは昇順で先頭に並びます（SQLite の NULL の並びと同じ）。
+同じ値のアイテムは名前順に並びます。
+"""
+from bisect import bisect_left, insort
+from types import UnionType
+from typing import Any, Iterable, List, Optional, Set, Tuple, Union, get_args, get_origin
+
+from .layered import LayeredDict
+
+Entry = Tuple[Any, ...]
+
+# チャンクの基準の大きさ（2倍を超えたら分割する）
+CHUNK_SIZE = 512
+
+
+def parse_order_by(item_cls: Any, order_by: str) -> Tuple[str, bool]:
+    """`order_by` を (フィールド名, 降順かどうか) に分解する
+
+    並び替えられるのは str / int / float / bool（とその Optional）のフィールドだけ。
+    """
+    descending = order_by.startswith("-")
+    key = order_by[1:] if descending else order_by
+    fields = getattr(item_cls, "model_fields", None)
+    if fields is not None:
+        if key not in fields:
+            raise ValueError(f"{item_cls.__name__} has no field '{key}' to order by")
+        if _scalar_kind(fields[key].annotation) is None:
+            raise ValueError(f"{item_cls.__name__} cannot be ordered by non-scalar field '{key}'")
+    return key, descending
+
+
+def _scalar_kind(annotation: Any) -> Optional[type]:
+    """互いに比較できる値の種類（str か数値）を返す。並び替えられない型なら None"""
+    if isinstance(annotation, type):
+        if issubclass(annotation, str):
+            return str
+        if issubclass(annotation, (int, float)):  # bool は int のサブクラス
+            return float
+        return None
+    if get_origin(annotation) in (Union, UnionType):
+        kinds = {_scalar_kind(arg) for arg in get_args(annotation) if arg is not type(None)}
+        return kinds.pop() if len(kinds) == 1 else None
+    return None
+
+
+def sort_entry(name: str, value: Any) -> Entry:
+    if value is None:
+        return (0, "", name)
+    return (1, value, name)
+
+
+class SortedIndex:
+    """
+    フィールドの値でソートされた (値, 名前) のリスト。書き込みごとに差分で更新する
+
+    名前ごとに挿入したときのエントリを覚えておき、削除はそれを使う。
+    ストアから取得したアイテムをその場で書き換えてから update() しても、古いエントリが残らない。
+
+    エントリは最大 `2 * CHUNK_SIZE` 件のソート済みチャンクに分けて持つ。
+    `copy()` はチャンクを共有し、書き込むときに触れたチャンクだけをコピーする（copy-on-write）。
+    """
+
+    __slots__ = ("key", "_chunks", "_maxes", "_owned", "_len", "_by_name")
+
+    def __init__(self, key: str, items: Iterable[Tuple[str, Any]] = ()):
+        self.key = key
+        by_name = {name: self._entry(name, item) for name, item in items}
+        entries = sorted(by_name.values())
+        self._by_name: LayeredDict[str, Entry] = LayeredDict(by_name)
+        self._chunks: List[List[Entry]] = [
+            entries[start:start + CHUNK_SIZE] for start in range(0, len(entries), CHUNK_SIZE)
+        ]
+        # チャンクごとの最大のエントリ
+        self._maxes: List[Entry] = [chunk[-1] for chunk in self._chunks]
+        # このインデックスだけが持っていて、その場で書き換えてよいチャンクの id
+        self._owned: Set[int] = {id(chunk) for chunk in self._chunks}
+        self._len = len(entries)
+
+    def _entry(self, name: str, item: Any) -> Entry:
+        return sort_entry(name, getattr(item, self.key, None))
+
+    def __len__(self) -> int:
+        return self._len
+
+    def copy(self) -> "SortedIndex":
+        """チャンクを共有するコピーを返す（元のインデックスは変更しない前提）"""
+        index = SortedIndex.__new__(SortedIndex)
+        index.key = self.key
+        index._chunks = list(self._chunks)
+        index._maxes = list(self._maxes)
+        index._owned = set()
+        index._len = self._len
+        index._by_name = self._by_name.copy()
+        return index
+
+    def _own(self, position: int) -> List[Entry]:
+        chunk = self._chunks[position]
+        if id(chunk) not in self._owned:
+            chunk = self._chunks[position] = list(chunk)
+            self._owned.add(id(chunk))
+        return chunk
+
+    def insert(self, name: str, item: Any) -> None:
+        self.remove(name)
+        entry = self._by_name[name] = self._entry(name, item)
+        self._len += 1
+        if not self._chunks:
+            chunk = [entry]
+            self._chunks.append(chunk)
+            self._maxes.append(entry)
+            self._owned.add(id(chunk))
+            return
+        position = min(bisect_left(self._maxes, entry), len(self._chunks) - 1)
+        chunk = self._own(position)
+        insort(chunk, entry)
+        self._maxes[position] = chunk[-1]
+        if len(chunk) > 2 * CHUNK_SIZE:
+            head, tail = chunk[:CHUNK_SIZE], chunk[CHUNK_SIZE:]
+            self._owned.discard(id(chunk))
+            self._chunks[position:position + 1] = [head, tail]
+            self._maxes[position:position + 1] = [head[-1], tail[-1]]
+            self._owned.update((id(head), id(tail)))
+
+    def remove(self, name: str, item: Any = None) -> None:
+        """名前のエントリを削除する（`item` は互換のために受け取るだけで使わない）"""
+        entry = self._by_name.pop(name, None)
+        if entry is None:
+            return
+        position = bisect_left(self._maxes, entry)
+        if position == len(self._chunks):
+            return
+        index = bisect_left(self._chunks[position], entry)
+        if index == len(self._chunks[position]) or self._chunks[position][index] != entry:
+            return
+        chunk = self._own(position)
+        del chunk[index]
+        self._len -= 1
+        if chunk:
+            self._maxes[position] = chunk[-1]
+        else:
+            self._owned.discard(id(chunk))
+            del self._chunks[position]
+            del self._maxes[position]
+
+    def _slice(self, start: int, stop: int) -> List[Entry]:
+        """並び順で start 件目から stop 件目の手前までのエントリ"""
+        result: List[Entry] = []
+        for chunk in self._chunks:
+            if start >= len(chunk):
+                start -= len(chunk)
+                stop -= len(chunk)
+                continue
+            result.extend(chunk[start:stop])
+            stop -= len(chunk)
+            if stop <= 0:
+                break
+            start = 0
+        return result
+
+    def names(self, offset: int, limit: int, descending: bool = False) -> List[str]:
+        """並び順で offset 件目から limit 件の名前を返す"""
+        if not descending:
+            return [entry[2] for entry in self._slice(offset, offset + limit)]
+        end = max(0, self._len - offset)
+        start = max(0, end - limit)
+        return [entry[2] for entry in reversed(self._slice(start, end))]
+
+
+__all__ = ["SortedIndex", "parse_order_by", "sort_entry"]
@@ -0,0 +1,162 @@
+"""
+アイテムストアのタグ転置インデックス
+
+タグのタイトル -> アイテム名の集合を保持し、書き込みごとに差分で更新します。
+`find(all=[...], any=[...])` は all の集合を小さい順に積集合を取り、any の和集合で絞り込みます。
+"""
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .layered import LayeredDict
+
+
+def tag_titles(tags: Optional[Iterable[Any]]) -> Set[str]:
+    """Tag（モデルまたは dict）のリストからタイトルの集合を作る"""
+    titles: Set[str] = set()
+    for tag in tags or ():
+        title = tag.get("title") if isinstance(tag, dict) else getattr(tag, "title", None)
+        if title is not None:
+            # SonolusText は StrEnum なので str() で値になる
+            titles.add(str(title))
+    return titles
+
+
+def item_tag_titles(item: Any) -> Set[str]:
+    """アイテム（モデルまたは dict）のタグタイトルの集合を返す"""
+    tags = item.get("tags") if isinstance(item, dict) else getattr(item, "tags", None)
+    return tag_titles(tags)
+
+
+class TagIndex:
+    """
+    タグのタイトル -> アイテム名の集合
+
+    アイテムごとに挿入したときのタイトルを覚えておき、削除はそれを使う。
+    ストアから取得したアイテムのタグをその場で書き換えてから update() しても、古いタグに残らない。
+
+    `copy()` は差分だけをコピーし（LayeredDict）、タグごとの集合は書き込むときに触れたものだけをコピーする。
+    """
+
+    __slots__ = ("_postings", "_mine", "_titles")
+
+    def __init__(self, items: Iterable[Tuple[str, Any]] = ()):
+        self._postings: LayeredDict[str, Set[str]] = LayeredDict()
+        # このインデックスだけが持っていて、その場で書き換えてよいタグ（copy() 元と共有していない）
+        self._mine: Set[str] = set()
+        # アイテム名 -> 挿入したときのタグのタイトル
+        self._titles: LayeredDict[str, FrozenSet[str]] = LayeredDict()
+        for name, item in items:
+            self.insert(name, item)
+
+    def copy(self) -> "TagIndex":
+        """タグごとの集合は書き込まれるまで共有するコピーを返す（元のインデックスは変更しない前提）"""
+        index = TagIndex()
+        index._postings = self._postings.copy()
+        index._titles = self._titles.copy()
+        return index
+
+    @classmethod
+    def from_postings(cls, postings: Dict[str, Iterable[str]]) -> "TagIndex":
+        """`postings()` の結果から作成する（アイテムを読まずに済む）"""
+        index = cls()
+        built: Dict[str, Set[str]] = {}
+        titles: Dict[str, Set[str]] = {}
+        for title, names in postings.items():
+            names = set(names)
+            if not names:
+                continue
+            built[title] = names
+            for name in names:
+                titles.setdefault(name, set()).add(title)
+        index._postings = LayeredDict(built)
+        index._mine = set(built)
+        index._titles = LayeredDict({name: frozenset(values) for name, values in titles.items()})
+        return index
+
+    def postings(self) -> Dict[str, List[str]]:
+        """タグのタイトル -> アイテム名のリスト"""
+        return {title: list(names) for title, names in self._postings.items()}
+
+    def _owned(self, title: str) -> Optional[Set[str]]:
+        names = self._postings.get(title)
+        if names is not None and title not in self._mine:
+            names = self._postings[title] = set(names)
+            self._mine.add(title)
+        return names
+
+    def insert(self, name: str, item: Any) -> None:
+        """アイテムのタグを追加する（置き換える場合は先に `remove(name)` を呼ぶ）"""
+        titles = item_tag_titles(item)
+        if titles:
+            self._titles[name] = self._titles.get(name, frozenset()) | titles
+        for title in titles:
+            names = self._owned(title)
+            if names is None:
+                self._postings[title] = {name}
+                self._mine.add(title)
+            else:
+                names.add(name)
+
+    def remove(self, name: str, item: Any = None) -> None:
+        """アイテムをすべてのタグから削除する（`item` は互換のために受け取るだけで使わない）"""
+        for title in self._titles.pop(name, ()):
+            names = self._owned(title)
+            if names is None:
+                continue
+            names.discard(name)
+            if not names:
+                self._postings.pop(title)
+                self._mine.discard(title)
+
+    def tags(self) -> Dict[str, int]:
+        """タグごとのアイテム数を返す"""
+        return {title: len(names) for title, names in self._postings.items()}
+
+    def find(self, all: Iterable[str] = (), any: Iterable[str] = ()) -> Optional[Set[str]]:
+        """
+        条件に一致するアイテム名の集合を返す
+
+        all / any のどちらも指定されていない場合は None（絞り込みなし）を返す。
+        """
+        required = set(all)
+        optional = set(any)
+        if not required and not optional:
+            return None
+
+        postings = self._postings
+        result: Optional[Set[str]] = None
+        if required:
+            lists = sorted((postings.get(title, set()) for title in required), key=len)
+            result = set(lists[0])
+            for names in lists[1:]:
+                if not result:
+                    break
+                result &= names
+
+        if optional:
+            if result is None:
+                result = set()
+                for title in optional:
+                    result |= postings.get(title, set())
+            else:
+                result = {
+                    name for name in result
+                    if _any_of(name, optional, postings)
+                }
+        return result
+
+
+def _any_of(name: str, titles: Iterable[str], postings: Mapping[str, Set[str]]) -> bool:
+    for title in titles:
+        names = postings.get(title)
+        if names is not None and name in names:
+            return True
+    return False
+
+
+def page(names: Set[str], limit: int, offset: int) -> Tuple[List[str], int]:
+    """名前順に並べたページと総数を返す"""
+    ordered = sorted(names)
+    return ordered[offset:offset + limit], len(ordered)
+
+
+__all__ = ["TagIndex", "item_tag_titles", "page", "tag_titles"]
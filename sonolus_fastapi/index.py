@@ -1,7 +1,14 @@
-from fastapi import FastAPI, Request, APIRouter
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Request, APIRouter, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, List, Dict, Any, Literal
+from pydantic import ValidationError
+from functools import partial
+from types import MappingProxyType
+from typing import Optional, List, Dict, Any, Literal, Mapping
 from sonolus_models import (
     BackgroundItem,
     EffectItem,
@@ -14,6 +21,7 @@ from sonolus_models import (
     ReplayItem
 )
 from .backend import StorageBackend, StoreFactory
+from .backend.memory import DEFAULT_CACHE_SIZE
 from sonolus_models import ServerForm
 from .search.registry import SearchRegistry
 from sonolus_models import ItemType
@@ -21,10 +29,15 @@ from .utils.item_namespace import ItemNamespace
 from .utils.server_namespace import ServerNamespace
 from .utils.room_namespace import RoomNamespace
 from .utils.pack import set_pack_memory
-from .utils.context import SonolusContext
+from .utils.context import SonolusContext, OptionParser, compile_option_parser, parse_options
 from .utils.query import Query
 from .utils.session import SessionStore, MemorySessionStore
 from .utils.source import override_source_fields
+from .utils.response_cache import ResponseCache
+from .utils.metrics import SonolusMetrics
+from .utils.profiler import RequestProfiler
+from .utils.timing import StageTimings, timed
+from .utils.version_middleware import SonolusVersionMiddleware
 from .router.sonolus_api import SonolusApi
 from typing import TYPE_CHECKING
 
@@ -35,6 +48,10 @@ if TYPE_CHECKING:
     from .backend.community_accessor import ItemCommentAccessor
     from .backend.leaderboard_accessor import ItemLeaderboardAccessor
 
+
+logger = logging.getLogger(__name__)
+
+
 class Sonolus:
     Kind = Literal["info", "list", "detail", "actions", "upload", "result_info", "result_submit", "result_upload"]
     
@@ -51,6 +68,18 @@ class Sonolus:
         app: Optional[FastAPI] = None,
         router: Optional[APIRouter] = None,
         target: Optional[FastAPI | APIRouter] = None,
+        compiled_serializer: bool = True,
+        fast_json: bool = False,
+        single_flight: bool = False,
+        metrics: bool = False,
+        server_timing: bool = False,
+        response_cache_max_bytes: int = 64 * 1024 * 1024,
+        etag: bool = True,
+        cache_control: Optional[Dict[str, str]] = None,
+        snapshot_path: Optional[str] = None,
+        snapshot_interval: Optional[float] = None,
+        snapshot_mmap: bool = False,
+        catalog_path: Optional[str] = None,
         **backend_options,
     ):
         """
@@ -69,6 +98,18 @@ class Sonolus:
             engine_search: エンジン検索フォーム Engine search form
             enable_cors: CORSを有効にするかどうか Whether to enable CORS
             enable_itemstores: アイテムストアを有効にするかどうか。Falseの場合、独自のOrmモデルを使用できます。Whether to enable item stores. If False, you can use a custom ORM model.
+            compiled_serializer: レスポンスモデルごとにコンパイルされたシリアライザーを使うかどうか。Falseの場合は従来の処理を使います。Whether to use the per-response-model compiled serializer. If False, the previous path is used.
+            fast_json: pydantic-coreの`to_json`でレスポンスを書き出すかどうか Whether to encode responses with pydantic-core's `to_json` instead of the stdlib json module
+            single_flight: 同時に届いた同一のinfo/list/detailリクエストでハンドラーの実行を1回にまとめるかどうか Whether identical concurrent info/list/detail requests share one handler execution and one serialized result
+            metrics: ハンドラーごとのレイテンシ・エラー数・レスポンスサイズとストア操作を記録し、/sonolus/_metrics でPrometheus形式で公開するかどうか Whether to record per-handler latency, errors and response sizes plus store operations and expose them on /sonolus/_metrics in Prometheus text format
+            server_timing: コンテキスト作成・クエリ解析・ハンドラー・検証・シリアライズ・エンコードの各段階の所要時間をServer-Timingヘッダーで返し、`stage_timings`に集計するかどうか Whether to time each request stage (context, query, handler, validate, serialize, encode), send it as a Server-Timing header and aggregate it in `stage_timings`
+            response_cache_max_bytes: `cache=True` を指定したハンドラーのレスポンスキャッシュの上限バイト数 Maximum size in bytes of the response cache used by handlers registered with `cache=True`
+            etag: GETルートのレスポンスにETagを付与し、If-None-Matchが一致する場合は304を返すかどうか Whether GET routes send an ETag and answer 304 when If-None-Match matches
+            cache_control: ハンドラーの種類ごとのCache-Controlヘッダー（例: {"server_info": "public, max-age=60", "detail": "no-cache"}） Cache-Control header per handler kind (server_info, info, list, detail, result_info, community_info, community_comments, leaderboard_detail, leaderboard_records, leaderboard_record_detail)
+            snapshot_path: メモリバックエンドのスナップショットファイルのパス。起動時にあれば JSON の再構築より高速に復元し、アプリの終了時に書き出します Path of the memory backend snapshot file. It is restored on startup, faster than a rebuild from JSON, if it exists and written when the app shuts down
+            snapshot_interval: スナップショットを定期的に書き出す間隔（秒） Interval in seconds between scheduled snapshot writes
+            snapshot_mmap: スナップショットをメモリマップして読み込むかどうか Whether to memory-map the snapshot file when restoring it
+            catalog_path: 指定した場合、`load()` はパックを読み取り専用のカタログファイルにまとめ、各ワーカーはそれをメモリマップして共有します If given, `load()` packs the loaded items into a read-only catalog file that every worker memory-maps and shares
         """
         if target is not None and router is not None and target is not router:
             raise ValueError("'target' and 'router' cannot be used together unless they point to the same object")
@@ -78,30 +119,54 @@ class Sonolus:
         self.port = port
         self.address = address
         self.dev = dev
+        self.etag = etag
+        self.cache_control: Dict[str, str] = dict(cache_control or {})
         self.version = version
         self._enable_cors = enable_cors
         self._attached_targets: set[int] = set()
         self._version_header_middleware_apps: set[int] = set()
+        self._snapshot_lifespan_apps: set[int] = set()
         self._cors_apps: set[int] = set()
         self._enable_itemstores = enable_itemstores
         
+        # ストアの操作も記録するため、ストアより先に作成する
+        self.metrics: Optional[SonolusMetrics] = SonolusMetrics() if metrics else None
+
         # アイテムストアの初期化
         self._items: Optional[ItemStores] = None
         if enable_itemstores:
-            factory = StoreFactory(backend, **backend_options)
+            factory = StoreFactory(backend, metrics=self.metrics, **backend_options)
             
             # コメントストアを作成
             from .backend import CommunityCommentStore, LeaderboardRecordStore
-            self.community_comments = CommunityCommentStore(backend, **backend_options)
-            self.leaderboard_records = LeaderboardRecordStore(backend, **backend_options)
+            self.community_comments = CommunityCommentStore(backend, metrics=self.metrics, **backend_options)
+            self.leaderboard_records = LeaderboardRecordStore(backend, metrics=self.metrics, **backend_options)
             
             self._items = ItemStores(factory, self.community_comments, self.leaderboard_records)
-        
-        self._handlers: dict[ItemType, dict[str, object]] = {}
-        self._server_handlers: dict[str, object] = {}
+
+        self.catalog_path = catalog_path
+        self._catalog_sources: List[str] = []
+        # カタログのストアがワーカーごとに保持するデコード済みアイテムの件数
+        self._catalog_cache_size: int = backend_options.get("cache_size", DEFAULT_CACHE_SIZE)
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._snapshot_lock = threading.Lock()
+        # スナップショットから復元した場合は True（パックの読み込みなどを省略する判断に使える）
+        self.snapshot_restored = False
+        if snapshot_path is not None:
+            if backend != StorageBackend.MEMORY or not enable_itemstores:
+                raise ValueError("'snapshot_path' requires item stores with StorageBackend.MEMORY")
+            self.snapshot_restored = self.restore_snapshot(use_mmap=snapshot_mmap)
+        
+        # (item_type, kind, filter_key) をキーにしたフラットなディスパッチテーブル
+        self._handlers: dict[tuple[Any, str, str | None], object] = {}
+        self._filtered_kinds: set[tuple[Any, str]] = set()
+        self._dispatch: Mapping[tuple[Any, str, str | None], object] = MappingProxyType({})
+        self._dispatch_fallback: Mapping[tuple[Any, str], object] = MappingProxyType({})
         self._repository_paths: List[str] = []
         self._configuration_options: List[str] = []  # オプションのクエリ名を保存
         self._configuration_option_types: Dict[str, str] = {}  # オプションの型を保存
+        self._option_parsers: Dict[str, OptionParser] = {}  # オプションごとのパーサー
         
         self.server = ServerNamespace(self)
         self.room = RoomNamespace(self)
@@ -116,12 +181,25 @@ class Sonolus:
         self.user = ItemNamespace(self, ItemType.user)
 
         self.session_store = session_store or MemorySessionStore()
+        self.response_cache = ResponseCache(max_bytes=response_cache_max_bytes)
+        self.stage_timings: Optional[StageTimings] = StageTimings() if server_timing else None
+        # 開発モードでは /sonolus/_debug/profile でリクエストをプロファイルできる
+        self.profiler: Optional[RequestProfiler] = RequestProfiler() if dev else None
         self.search = SearchRegistry()
         
         # リポジトリファイルを提供するカスタムエンドポイントを先に追加
         self._setup_repository_handler()
         
-        self.api = SonolusApi(self, router=self.router)
+        self.api = SonolusApi(
+            self,
+            router=self.router,
+            compiled_serializer=compiled_serializer,
+            fast_json=fast_json,
+            single_flight=single_flight,
+            metrics=self.metrics,
+            stage_timings=self.stage_timings,
+            profiler=self.profiler,
+        )
 
         # デフォルトでは内部FastAPIに登録（従来互換）
         self.attach(self.app, enable_cors=enable_cors)
@@ -156,21 +234,74 @@ class Sonolus:
             cors_enabled = self._enable_cors if enable_cors is None else enable_cors
             if cors_enabled:
                 self._setup_cors(target)
+            if self.snapshot_path is not None:
+                self._setup_snapshot_lifespan(target)
 
-    def _setup_version_middleware(self, app: FastAPI):
+    def _setup_snapshot_lifespan(self, app: FastAPI):
+        """アプリの lifespan で定期的なスナップショットと終了時のスナップショットを書き出す（アプリごとに1回）"""
         app_id = id(app)
-        if app_id in self._version_header_middleware_apps:
+        if app_id in self._snapshot_lifespan_apps:
             return
+        self._snapshot_lifespan_apps.add(app_id)
+        original = app.router.lifespan_context
+
+        @asynccontextmanager
+        async def lifespan(lifespan_app):
+            async with original(lifespan_app) as state:
+                task = None
+                if self.snapshot_interval:
+                    task = asyncio.create_task(self._snapshot_loop(self.snapshot_interval))
+                try:
+                    yield state
+                finally:
+                    if task is not None:
+                        task.cancel()
+                        with suppress(asyncio.CancelledError):
+                            await task
+                    await asyncio.to_thread(self.save_snapshot)
+
+        app.router.lifespan_context = lifespan
+
+    async def _snapshot_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.save_snapshot)
+            except Exception as e:
+                # 書き出しに失敗しても次の周期で再試行する
+                logger.exception("Failed to write snapshot to %s: %s", self.snapshot_path, e)
+
+    def save_snapshot(self, path: Optional[str] = None) -> int:
+        """
+        メモリストアの中身をスナップショットファイルに書き出し、書き込んだバイト数を返します。
+        Write the memory stores to the snapshot file and return the number of bytes written.
+        """
+        from .backend.snapshot_file import write_snapshot
+
+        path = path or self.snapshot_path
+        if path is None:
+            raise ValueError("No snapshot path given. Pass 'path' or 'snapshot_path' to the Sonolus constructor.")
+        with self._snapshot_lock:
+            return write_snapshot(self, path)
 
-        @app.middleware('http')
-        async def sonolus_version_middleware(request: Request, call_next):
-            response = await call_next(request)
+    def restore_snapshot(self, path: Optional[str] = None, use_mmap: bool = False) -> bool:
+        """
+        スナップショットファイルがあればメモリストアに復元し、復元したかどうかを返します。
+        Restore the memory stores from the snapshot file if it exists and return whether it was restored.
+        """
+        from .backend.snapshot_file import restore_snapshot
 
-            if request.url.path.startswith('/sonolus'):
-                response.headers['Sonolus-Version'] = self.version
+        path = path or self.snapshot_path
+        if path is None:
+            raise ValueError("No snapshot path given. Pass 'path' or 'snapshot_path' to the Sonolus constructor.")
+        return restore_snapshot(self, path, use_mmap=use_mmap)
 
-            return response
+    def _setup_version_middleware(self, app: FastAPI):
+        app_id = id(app)
+        if app_id in self._version_header_middleware_apps:
+            return
 
+        app.add_middleware(SonolusVersionMiddleware, version=self.version, prefix='/sonolus')
         self._version_header_middleware_apps.add(app_id)
 
     def _setup_cors(self, app: FastAPI):
@@ -202,52 +333,34 @@ class Sonolus:
         return override_source_fields(value, self.resolve_address(request))
             
     def build_context(self, request: Request, request_body: Any = None) -> SonolusContext:
-        # 設定されたオプションの値をクエリパラメータから取得し、型変換を行う
-        options = {}
-        for option_query in self._configuration_options:
-            if option_query in request.query_params:
-                raw_value = request.query_params.get(option_query)
-                option_type = self._configuration_option_types.get(option_query)
-                
-                # 型に応じて変換
-                if option_type == "toggle":
-                    # toggleは "0" / "1" の文字列なのでbooleanに変換
-                    options[option_query] = raw_value == "1" or raw_value.lower() == "true"
-                elif option_type == "slider":
-                    # sliderは数値なのでint/floatに変換を試行
-                    try:
-                        if '.' in raw_value:
-                            options[option_query] = float(raw_value)
-                        else:
-                            options[option_query] = int(raw_value)
-                    except ValueError:
-                        options[option_query] = raw_value  # 変換失敗時は文字列のまま
-                else:
-                    # その他（text, textArea, select, file等）は文字列のまま
-                    options[option_query] = raw_value
-        
-        return SonolusContext(
-            user_session=request.headers.get("Sonolus-Session"),
-            request=request_body,
-            localization=request.query_params.get("localization"),
-            options=options if options else None,
-            is_dev=self.dev
-        )
+        # オプションの値はハンドラーが ctx.options を参照したときに初めて変換する
+        with timed("context"):
+            query_params = request.query_params
+            parsers = self._option_parsers
+            options_loader = None
+            if parsers:
+                options_loader = partial(parse_options, query_params, parsers)
+
+            return SonolusContext(
+                user_session=request.headers.get("Sonolus-Session"),
+                request=request_body,
+                localization=query_params.get("localization"),
+                is_dev=self.dev,
+                options_loader=options_loader,
+            )
         
     def build_query(self, item_type, request):
-        key = item_type.value
-        form = self.search.get_form(key)
-        model = self.search.get_query_model(key)
-
-        raw = {
-            k: v[0] if isinstance(v, list) else v
-            for k, v in request.query_params.multi_items()
-        }
+        # SearchRegistry のキーは単数形（level, skin ...）なので ItemType の name を使う
+        with timed("query"):
+            parser = self.search.get_query_parser(item_type.name)
+            if parser is None:
+                return dict(request.query_params.multi_items())
 
-        if model is None:
-            return raw
-
-        return model.model_validate(raw)
+            try:
+                return parser.parse(request.query_params)
+            except ValidationError as e:
+                # slider に数値以外が渡された、必須のオプションがないなど（500 ではなくクライアントのエラーにする）
+                raise HTTPException(400, f"Invalid query: {str(e)}")
 
     def _register_handler(self, item_type: ItemType, kind: Kind, descriptor: object, filter_key: str | None = None):
         """ハンドラーを登録する
@@ -258,35 +371,34 @@ class Sonolus:
             descriptor: ハンドラーディスクリプタ
             filter_key: フィルターキー（info_type, list_typeなど）。指定なしの場合はNone
         """
-        if item_type not in self._handlers:
-            self._handlers[item_type] = {}
-        
-        # filter_key が指定されている場合、内部では辞書構造にする
-        if filter_key is not None:
-            # 既に kind が登録されていない場合、辞書を作成
-            if kind not in self._handlers[item_type]:
-                self._handlers[item_type][kind] = {}
-            # filter_key に対応するハンドラーを設定
-            if not isinstance(self._handlers[item_type][kind], dict):
-                # 既存のハンドラーがある場合、None キーで保存
-                old_descriptor = self._handlers[item_type][kind]
-                self._handlers[item_type][kind] = {None: old_descriptor}
-            self._handlers[item_type][kind][filter_key] = descriptor
-        else:
-            # filter_key がない場合は通常通り
-            self._handlers[item_type][kind] = descriptor
+        self._set_handler(item_type, kind, filter_key, descriptor)
         
     def _register_server_handler(self, kind: str, descriptor: object):
-        self._server_handlers[kind] = descriptor
+        self._set_handler(None, kind, None, descriptor)
     
     def _register_community_handler(self, item_type: ItemType, kind: str, descriptor: object):
-        self._handlers.setdefault(item_type, {}).setdefault("community", {})[kind] = descriptor
+        self._set_handler(item_type, f"community_{kind}", None, descriptor)
     
     def _register_leaderboard_handler(self, item_type: ItemType, kind: str, descriptor: object):
-        self._handlers.setdefault(item_type, {}).setdefault("leaderboard", {})[kind] = descriptor
+        self._set_handler(item_type, f"leaderboard_{kind}", None, descriptor)
     
     def _register_room_handler(self, kind: str, descriptor: object):
-        self._handlers.setdefault("room", {})[kind] = descriptor
+        self._set_handler("room", kind, None, descriptor)
+
+    def _set_handler(self, item_type: Any, kind: str, filter_key: str | None, descriptor: object):
+        """ディスパッチテーブルを更新し、読み取り専用のフラットなマップを作り直す"""
+        self._handlers[(item_type, kind, filter_key)] = descriptor
+        if filter_key is not None:
+            self._filtered_kinds.add((item_type, kind))
+
+        # フィルターキー付きのハンドラーがない種類は、未知の filter_key でもデフォルトを返す（従来互換）
+        fallback = {
+            (key_item_type, key_kind): handler
+            for (key_item_type, key_kind, key_filter), handler in self._handlers.items()
+            if key_filter is None and (key_item_type, key_kind) not in self._filtered_kinds
+        }
+        self._dispatch = MappingProxyType(dict(self._handlers))
+        self._dispatch_fallback = MappingProxyType(fallback)
         
     def get_handler(self, item_type: ItemType, kind: Kind, filter_key: str | None = None):
         """ハンドラーを取得する
@@ -299,35 +411,22 @@ class Sonolus:
         Returns:
             ハンドラーディスクリプタ、または存在しない場合はNone
         """
-        handler = self._handlers.get(item_type, {}).get(kind)
-        
-        if handler is None:
-            return None
-        
-        # ハンドラーが辞書の場合、filter_key で検索
-        if isinstance(handler, dict):
-            if filter_key is not None and filter_key in handler:
-                return handler[filter_key]
-            # filter_key が指定されていない場合、デフォルト（None）を返す
-            elif filter_key is None and None in handler:
-                return handler[None]
-            else:
-                return None
-        
-        # ハンドラーが辞書でない場合は直接返す（backward compatibility）
+        handler = self._dispatch.get((item_type, kind, filter_key))
+        if handler is None and filter_key is not None:
+            return self._dispatch_fallback.get((item_type, kind))
         return handler
         
     def get_server_handler(self, kind: str):
-        return self._server_handlers.get(kind)
+        return self._dispatch.get((None, kind, None))
     
     def get_community_handler(self, item_type: ItemType, kind: str):
-        return self._handlers.get(item_type, {}).get("community", {}).get(kind)
+        return self._dispatch.get((item_type, f"community_{kind}", None))
     
     def get_leaderboard_handler(self, item_type: ItemType, kind: str):
-        return self._handlers.get(item_type, {}).get("leaderboard", {}).get(kind)
+        return self._dispatch.get((item_type, f"leaderboard_{kind}", None))
     
     def get_room_handler(self, kind: str):
-        return self._handlers.get("room", {}).get(kind)
+        return self._dispatch.get(("room", kind, None))
     
     def register_configuration_options(self, options: List):
         """Configuration optionsを登録し、クエリ名を保存"""
@@ -338,6 +437,9 @@ class Sonolus:
                     # オプションの型を保存
                     if hasattr(option, 'type'):
                         self._configuration_option_types[option.query] = option.type
+                    self._option_parsers[option.query] = compile_option_parser(
+                        self._configuration_option_types.get(option.query)
+                    )
     
     def _setup_repository_handler(self):
         """リポジトリファイルを提供するハンドラーをセットアップ"""
@@ -360,7 +462,9 @@ class Sonolus:
     def load(self, path: str | List[str]):
         """
         Sonolus packでパックされたものを読み込みます。
+        `catalog_path` を指定した場合は、読み込んだパックを読み取り専用のカタログにまとめ、そのストアを使います。
         Load a pack packed with Sonolus pack.
+        With `catalog_path`, the loaded packs are served from a read-only catalog shared by all workers.
         """
         if not self._enable_itemstores or self._items is None:
             raise RuntimeError(
@@ -372,10 +476,21 @@ class Sonolus:
         
         # pathが配列の場合は各パスに対して再帰的にloadを呼び出す
         if isinstance(path, list):
+            if self.catalog_path is None:
+                for p in path:
+                    self.load(p)
+                return
+            # カタログは全パスを読み込んでから1回だけ作成する
             for p in path:
-                self.load(p)
+                self._add_catalog_source(p)
+            self._load_catalog()
             return
         
+        if self.catalog_path is not None:
+            self._add_catalog_source(path)
+            self._load_catalog()
+            return
+
         repository_path = os.path.join(path, 'repository')
         db_path = os.path.join(path, 'db.json')
 
@@ -386,6 +501,57 @@ class Sonolus:
         
         if repository_path not in self._repository_paths:
             self._repository_paths.append(repository_path)
+
+    def _add_catalog_source(self, path: str):
+        import os
+
+        repository_path = os.path.join(path, 'repository')
+        db_path = os.path.abspath(os.path.join(path, 'db.json'))
+
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"db.json not found in pack path: {path}")
+
+        if db_path not in self._catalog_sources:
+            self._catalog_sources.append(db_path)
+        if repository_path not in self._repository_paths:
+            self._repository_paths.append(repository_path)
+
+    def _load_catalog(self):
+        """
+        読み込んだパックのカタログを（内容が変わっていれば作り直してから）メモリマップし、
+        パックに含まれる種類のアイテムストアをカタログのストアに置き換える
+        """
+        import json
+        import os
+        from .backend.catalog import Catalog, CatalogItemStore, read_fingerprint, write_catalog
+        from .backend.events import get_store_events
+        from .backend.instrumented import instrument_store
+        from .utils.pack import read_pack_items
+
+        # db.json の更新を検知するため、パスとサイズ・更新時刻を fingerprint にする
+        fingerprint = json.dumps([
+            [source, os.stat(source).st_size, os.stat(source).st_mtime_ns]
+            for source in self._catalog_sources
+        ])
+        # 他のワーカーが作成済みなら読み込むだけ（同時に作成しても置き換えはアトミック）
+        if read_fingerprint(self.catalog_path) != fingerprint:
+            sections: Dict[str, list] = {}
+            for source in self._catalog_sources:
+                for name, items in read_pack_items(source).items():
+                    sections.setdefault(name, []).extend(items)
+            write_catalog(self.catalog_path, sections, fingerprint)
+
+        catalog = Catalog(self.catalog_path)
+        stores = {}
+        for name, section in catalog.sections.items():
+            store = CatalogItemStore(getattr(self.items, name).item_cls, section, cache_size=self._catalog_cache_size)
+            stores[name] = instrument_store(store, self.metrics, name, "catalog")
+        # 置き換える前のストアを読んだレスポンスのキャッシュなどが残らないように、ストア全体の書き込みとして通知する
+        replaced = [get_store_events(getattr(self.items, name)) for name in stores]
+        self.items.override(**stores)
+        for events in replaced:
+            if events is not None:
+                events.notify_write()
     
     def add(self, path: str | List[str]):
         """
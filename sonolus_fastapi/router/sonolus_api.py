@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Request, HTTPException, FastAPI
-from typing import TYPE_CHECKING, Any, Optional, TypeVar, Union
+from fastapi import APIRouter, Request, HTTPException, FastAPI, Response, Query
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional, TypeVar, Union
 from sonolus_models import SonolusSignaturePublicKey
 from sonolus_models.items import ItemType
 from typing import Literal
+import functools
 import json
 import base64
 import time as time_module
@@ -10,7 +11,15 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
 from cryptography.hazmat.backends import default_backend
-from sonolus_fastapi.utils.taggable_item import unwrap_taggable_item
+from sonolus_fastapi.backend.events import record_dependencies
+from sonolus_fastapi.utils.etag import compute_etag, derive_etag, etag_matches
+from sonolus_fastapi.utils.json_response import get_json_encoder
+from sonolus_fastapi.utils.metrics import SonolusMetrics
+from sonolus_fastapi.utils.profiler import ProfileFormat, ProfilerBusyError, RequestProfiler
+from sonolus_fastapi.utils.response_serializer import get_response_serializer
+from sonolus_fastapi.utils.single_flight import SingleFlight
+from sonolus_fastapi.utils.source import SOURCE_PLACEHOLDER, override_source_fields, render_source_template
+from sonolus_fastapi.utils.timing import StageTimings, start_timer, stop_timer, timed
 
 T = TypeVar('T')
 
@@ -24,9 +33,42 @@ class SonolusApi:
         y="Hxzi9DHrlJ4CVSJVRnydxFWBZAgkFxZXbyxPSa8SJQw"
     )
     
-    def __init__(self, sonolus: "Sonolus", router: APIRouter | None = None):
+    def __init__(
+        self,
+        sonolus: "Sonolus",
+        router: APIRouter | None = None,
+        compiled_serializer: bool = True,
+        fast_json: bool = False,
+        single_flight: bool = False,
+        metrics: SonolusMetrics | None = None,
+        stage_timings: StageTimings | None = None,
+        profiler: RequestProfiler | None = None,
+    ):
+        """
+        Args:
+            sonolus: Sonolusインスタンス
+            router: ルートを登録するAPIRouter
+            compiled_serializer: レスポンスモデルごとにコンパイルされたシリアライザーを使うかどうか。
+                Falseの場合は従来の検証・シリアライズ処理を使います（比較用）。
+            fast_json: pydantic-core の `to_json` で
+                レスポンスを書き出すかどうか。Falseの場合は標準ライブラリの json を使います。
+            single_flight: 同時に届いた同一の info / list / detail リクエストで、
+                ハンドラーの実行とシリアライズを1回にまとめるかどうか。
+            metrics: 指定した場合、ハンドラーごとのレイテンシ等を記録し /sonolus/_metrics で公開します。
+            stage_timings: 指定した場合、処理段階ごとの所要時間を Server-Timing ヘッダーで返し、集計します。
+            profiler: 指定した場合、/sonolus/_debug/profile で次の N 件のリクエストをプロファイルできます。
+        """
         self.sonolus = sonolus
         self.router = router or APIRouter(prefix="/sonolus")
+        self.compiled_serializer = compiled_serializer
+        self.fast_json = fast_json
+        self.encode_json = get_json_encoder(fast_json)
+        self._not_found_bodies: dict[str, bytes] = {}
+        self.single_flight = single_flight
+        self._single_flight = SingleFlight()
+        self.metrics = metrics
+        self.stage_timings = stage_timings
+        self.profiler = profiler
         self._register_routes()
 
     def register(self, target: FastAPI | APIRouter):
@@ -37,45 +79,94 @@ class SonolusApi:
     # -------------------------
 
     def _register_routes(self):
+        # Debug (/{item_type}/{name} より先に登録する)
+        if self.profiler is not None:
+            self.router.get('/_debug/profile', include_in_schema=False)(self._debug_profile)
+
         # -------------------------
         # Sonolus Basic API
         # -------------------------
 
-        self.router.post('/authenticate')(self._authenticate)
-        self.router.get('/info')(self._server_info)
-        self.router.get("/{item_type}/info")(self._info)
-        self.router.get("/{item_type}/list")(self._list)
+        self.router.post('/authenticate', response_model=None)(self._route(self._authenticate))
+        self.router.get('/info', response_model=None)(self._route(self._server_info))
+        self.router.get("/{item_type}/info", response_model=None)(self._route(self._info))
+        self.router.get("/{item_type}/list", response_model=None)(self._route(self._list))
         
         # Result API (only for levels) - Must be before generic routes
-        self.router.get("/{item_type}/result/info")(self._result_info)
-        self.router.post("/{item_type}/result/submit")(self._result_submit)
-        self.router.post("/{item_type}/result/upload")(self._result_upload)
+        self.router.get("/{item_type}/result/info", response_model=None)(self._route(self._result_info))
+        self.router.post("/{item_type}/result/submit", response_model=None)(self._route(self._result_submit))
+        self.router.post("/{item_type}/result/upload", response_model=None)(self._route(self._result_upload))
 
         # Rooms Create API (only for rooms) - Must be before generic routes
-        self.router.post("/{item_type}/create")(self._room_create)
+        self.router.post("/{item_type}/create", response_model=None)(self._route(self._room_create))
         
         # Generic item routes
-        self.router.get("/{item_type}/{name}")(self._detail)
-        self.router.post("/{item_type}/{name}/submit")(self._actions)
-        self.router.post("/{item_type}/{name}/upload")(self._upload)
+        self.router.get("/{item_type}/{name}", response_model=None)(self._route(self._detail))
+        self.router.post("/{item_type}/{name}/submit", response_model=None)(self._route(self._actions))
+        self.router.post("/{item_type}/{name}/upload", response_model=None)(self._route(self._upload))
 
         # -------------------------
         # Sonolus Extended API
         # -------------------------
 
         # Community API
-        self.router.get("/{item_type}/{name}/community/info")(self._community_info)
-        self.router.get("/{item_type}/{name}/community/comments/list")(self._community_comments)
-        self.router.post("/{item_type}/{name}/community/submit")(self._community_actions)
-        self.router.post("/{item_type}/{name}/community/upload")(self._community_upload)
-        self.router.post("/{item_type}/{name}/community/comments/{comment_name}/submit")(self._community_comment_actions)
-        self.router.post("/{item_type}/{name}/community/comments/{comment_name}/upload")(self._community_comment_upload)
+        self.router.get("/{item_type}/{name}/community/info", response_model=None)(self._route(self._community_info))
+        self.router.get("/{item_type}/{name}/community/comments/list", response_model=None)(self._route(self._community_comments))
+        self.router.post("/{item_type}/{name}/community/submit", response_model=None)(self._route(self._community_actions))
+        self.router.post("/{item_type}/{name}/community/upload", response_model=None)(self._route(self._community_upload))
+        self.router.post("/{item_type}/{name}/community/comments/{comment_name}/submit", response_model=None)(self._route(self._community_comment_actions))
+        self.router.post("/{item_type}/{name}/community/comments/{comment_name}/upload", response_model=None)(self._route(self._community_comment_upload))
 
         # Leaderboard API
-        self.router.get("/{item_type}/{name}/leaderboards/{leaderboard_name}")(self._leaderboard_detail)
-        self.router.get("/{item_type}/{name}/leaderboards/{leaderboard_name}/records/list")(self._leaderboard_records)
-        self.router.get("/{item_type}/{name}/leaderboards/{leaderboard_name}/records/{record_name}")(self._leaderboard_record_detail)
-
+        self.router.get("/{item_type}/{name}/leaderboards/{leaderboard_name}", response_model=None)(self._route(self._leaderboard_detail))
+        self.router.get("/{item_type}/{name}/leaderboards/{leaderboard_name}/records/list", response_model=None)(self._route(self._leaderboard_records))
+        self.router.get("/{item_type}/{name}/leaderboards/{leaderboard_name}/records/{record_name}", response_model=None)(self._route(self._leaderboard_record_detail))
+
+        # Metrics
+        if self.metrics is not None:
+            self.router.get('/_metrics', include_in_schema=False)(self._metrics)
+
+
+    def _route(self, endpoint: Callable[..., Awaitable[Response]]) -> Callable[..., Awaitable[Response]]:
+        """メトリクス・段階計測・プロファイラーが有効な場合、エンドポイントを計測用にラップする"""
+        metrics = self.metrics
+        stage_timings = self.stage_timings
+        profiler = self.profiler
+        if metrics is None and stage_timings is None and profiler is None:
+            return endpoint
+
+        kind = endpoint.__name__.lstrip("_")
+
+        @functools.wraps(endpoint)
+        async def instrumented(*args, **kwargs):
+            item_type = kwargs.get("item_type")
+            item_type = item_type.value if isinstance(item_type, ItemType) else ""
+            status, size = 500, 0
+            timer = token = None
+            if stage_timings is not None:
+                timer, token = start_timer()
+            session = profiler.begin() if profiler is not None else None
+            start = time_module.perf_counter()
+            try:
+                response = await endpoint(*args, **kwargs)
+                status, size = response.status_code, len(response.body)
+                if timer is not None:
+                    response.headers["Server-Timing"] = timer.server_timing(time_module.perf_counter() - start)
+                return response
+            except HTTPException as e:
+                status = e.status_code
+                raise
+            finally:
+                elapsed = time_module.perf_counter() - start
+                if metrics is not None:
+                    metrics.observe(kind, item_type, elapsed, status, size)
+                if timer is not None:
+                    stop_timer(token)
+                    stage_timings.record(kind, timer, elapsed)
+                if session is not None:
+                    session.release()
+
+        return instrumented
 
     # -------------------------
     # utility methods
@@ -153,38 +244,179 @@ class SonolusApi:
             raise HTTPException(400, f"Invalid request body: {str(e)}")
 
     def _remove_none_from_lists(self, obj: Any) -> Any:
-        """再帰的にリスト内のNone値を除去し、TaggableItemをアンラップする
+        """再帰的にリスト内のNone値を除去する
+
+        `model_dump(mode="json")` の結果に対して呼ばれるので、TaggableItem は含まれない。
         
         Args:
             obj: 処理するオブジェクト（dict, list, or other）
             
         Returns:
-            Noneが除去され、TaggableItemがアンラップされた同じ型のオブジェクト
+            Noneが除去された同じ型のオブジェクト
         """
         if isinstance(obj, dict):
             return {k: self._remove_none_from_lists(v) for k, v in obj.items()}
         elif isinstance(obj, list):
             return [self._remove_none_from_lists(item) for item in obj if item is not None]
         else:
-            # TaggableItem をアンラップ
-            return unwrap_taggable_item(obj)
+            return obj
     
-    def _build_response(self, handler: Any, result: Any, request: Request) -> dict[str, Any]:
+    def _build_response(
+        self,
+        handler: Any,
+        result: Any,
+        request: Request,
+        source: str | None = None,
+    ) -> dict[str, Any]:
         """Build response by applying source fields and validating with response model.
         
         Args:
             handler: Handler descriptor with response_model
             result: Raw result from handler
             request: FastAPI request object
+            source: Value written to `source` fields (defaults to the resolved address)
             
         Returns:
             Validated response dict ready for JSON serialization
         """
-        result = self.sonolus.apply_response_source(result, request)
-        validated = handler.response_model.model_validate(result)
-        validated = self.sonolus.apply_response_source(validated, request)
-        response_dict = validated.model_dump(exclude_none=True, mode='json', by_alias=True)
-        return self._remove_none_from_lists(response_dict)
+        if source is None:
+            source = self.sonolus.resolve_address(request)
+
+        if self.compiled_serializer:
+            serializer = get_response_serializer(handler.response_model)
+            with timed("validate"):
+                validated = serializer.validate(result)
+            with timed("serialize"):
+                return serializer.dump(validated, source)
+
+        with timed("source"):
+            result = override_source_fields(result, source)
+        with timed("validate"):
+            validated = handler.response_model.model_validate(result)
+        with timed("source"):
+            validated = override_source_fields(validated, source)
+        with timed("serialize"):
+            response_dict = validated.model_dump(exclude_none=True, mode='json', by_alias=True)
+            return self._remove_none_from_lists(response_dict)
+
+    async def _cached_response(
+        self,
+        handler: Any,
+        request: Request,
+        item_type: ItemType,
+        kind: str,
+        filter_key: str | None,
+        call: Callable[[], Awaitable[Any]],
+        name: str | None = None,
+    ) -> Response:
+        """
+        キャッシュ済みのレスポンスを返すか、ハンドラーを実行してキャッシュする
+
+        キャッシュには `source` をプレースホルダーにしたバイト列を保存し、
+        送信時にリクエストごとのアドレスへ置き換える（ホスト名が違ってもモデルを再検証しない）。
+        single_flight が有効な場合、同じキーで実行中のハンドラーの結果を共有する。
+        """
+        policy = getattr(handler, "cache_policy", None)
+        anonymous = not request.headers.get("Sonolus-Session")
+        use_cache = policy is not None and (anonymous or not policy.anonymous_only)
+        use_flight = self.single_flight and anonymous
+        address = self.sonolus.resolve_address(request)
+        if address is None or not (use_cache or use_flight):
+            return self._get_response(handler, await call(), request, kind)
+
+        key = (
+            item_type.value,
+            kind,
+            filter_key,
+            name,
+            tuple(sorted(request.query_params.multi_items())),
+        )
+        cache_key = key if use_cache else None
+        entry = self.sonolus.response_cache.get(key) if use_cache else None
+        if entry is not None:
+            template, etag = entry.body, entry.etag
+        elif use_flight:
+            template, etag = await self._single_flight.do(
+                key, lambda: self._render_template(handler, request, call, cache_key)
+            )
+        else:
+            template, etag = await self._render_template(handler, request, call, cache_key)
+
+        with timed("source"):
+            body = render_source_template(template, address)
+        if etag is not None:
+            etag = derive_etag(etag, address)
+        return self._conditional_response(request, kind, body, etag)
+
+    async def _render_template(
+        self,
+        handler: Any,
+        request: Request,
+        call: Callable[[], Awaitable[Any]],
+        cache_key: tuple | None,
+    ) -> tuple[bytes, str | None]:
+        """ハンドラーを実行し、`source` をプレースホルダーにした JSON バイト列と ETag を返す"""
+        cache = self.sonolus.response_cache
+        generation = cache.generation
+        with record_dependencies() as dependencies:
+            result = await call()
+        response_dict = self._build_response(handler, result, request, source=SOURCE_PLACEHOLDER)
+        with timed("encode"):
+            template = self.encode_json(response_dict)
+        etag = compute_etag(template) if self.sonolus.etag else None
+        if cache_key is not None:
+            cache.put(
+                cache_key,
+                template,
+                dependencies,
+                ttl=handler.cache_policy.ttl,
+                generation=generation,
+                etag=etag,
+            )
+        return template, etag
+
+    def _handler_not_found(self, detail: str) -> Response:
+        """未登録のハンドラーに対する 404 を事前にエンコードしたボディで返す"""
+        body = self._not_found_bodies.get(detail)
+        if body is None:
+            body = self._not_found_bodies[detail] = self.encode_json({"detail": detail})
+        return Response(content=body, status_code=404, media_type="application/json")
+
+    def _render_response(self, handler: Any, result: Any, request: Request) -> Response:
+        """`jsonable_encoder` を通さずにレスポンスを JSON バイト列として書き出す"""
+        response_dict = self._build_response(handler, result, request)
+        with timed("encode"):
+            body = self.encode_json(response_dict)
+        return Response(content=body, media_type="application/json")
+
+    def _get_response(self, handler: Any, result: Any, request: Request, kind: str) -> Response:
+        """GET ルート用に ETag / Cache-Control 付きのレスポンスを作成する"""
+        response_dict = self._build_response(handler, result, request)
+        with timed("encode"):
+            body = self.encode_json(response_dict)
+        return self._conditional_response(request, kind, body)
+
+    def _conditional_response(
+        self,
+        request: Request,
+        kind: str,
+        body: bytes,
+        etag: str | None = None,
+    ) -> Response:
+        """If-None-Match が ETag に一致する場合は 304 を返す"""
+        headers = {}
+        cache_control = self.sonolus.cache_control.get(kind)
+        if cache_control:
+            headers["Cache-Control"] = cache_control
+
+        if self.sonolus.etag:
+            etag = etag or compute_etag(body)
+            headers["ETag"] = etag
+            if_none_match = request.headers.get("if-none-match")
+            if if_none_match is not None and etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers=headers)
+
+        return Response(content=body, media_type="application/json", headers=headers)
     
 
     # -------------------------
@@ -192,7 +424,29 @@ class SonolusApi:
     # -------------------------
     
 
-    async def _authenticate(self, request: Request) -> dict[str, Any]:
+    async def _metrics(self) -> Response:
+        """Expose handler metrics in Prometheus text format."""
+        return Response(
+            content=self.metrics.render_prometheus(),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+    async def _debug_profile(
+        self,
+        requests: int = Query(100, ge=1, le=100000),
+        format: ProfileFormat = "pstats",
+        timeout: float = Query(60.0, gt=0),
+        sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+        limit: int = Query(80, ge=1),
+    ) -> Response:
+        """Profile the next `requests` Sonolus requests and return an aggregated report."""
+        try:
+            report = await self.profiler.profile(requests, format, timeout, sort=sort, limit=limit)
+        except ProfilerBusyError as e:
+            raise HTTPException(409, str(e))
+        return Response(content=report, media_type="text/plain; charset=utf-8")
+
+    async def _authenticate(self, request: Request) -> Response:
         """Handle server authentication."""
         from sonolus_models import ServerAuthenticateRequest
         
@@ -229,71 +483,79 @@ class SonolusApi:
         
         handler = self.sonolus.get_server_handler("authenticate")
         if handler is None:
-            raise HTTPException(404, "authenticate handler not implemented")
+            return self._handler_not_found("authenticate handler not implemented")
         
-        result = await handler.call(ctx)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx)
+        return self._render_response(handler, result, request)
     
     
-    async def _server_info(self, request: Request) -> dict[str, Any]:
+    async def _server_info(self, request: Request) -> Response:
         """Get server information."""
         ctx = self.sonolus.build_context(request)
         
         handler = self.sonolus.get_server_handler("server_info")
         if handler is None:
-            raise HTTPException(404, "server info handler not implemented")
+            return self._handler_not_found("server info handler not implemented")
         
-        result = await handler.call(ctx)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx)
+        return self._get_response(handler, result, request, "server_info")
     
 
-    async def _info(self, item_type: ItemType, request: Request) -> dict[str, Any]:
+    async def _info(self, item_type: ItemType, request: Request) -> Response:
         """Get item type information."""
-        ctx = self.sonolus.build_context(request)
-        
         # クエリパラメータから type を取得（info_type用）
         info_type = request.query_params.get("type")
         
         handler = self.sonolus.get_handler(item_type, "info", filter_key=info_type)
         if handler is None:
-            raise HTTPException(404, "info handler not implemented")
+            return self._handler_not_found("info handler not implemented")
         
-        result = await handler.call(ctx)
-        return self._build_response(handler, result, request)
+        async def call():
+            ctx = self.sonolus.build_context(request)
+            with timed("handler"):
+                return await handler.call(ctx)
+
+        return await self._cached_response(handler, request, item_type, "info", info_type, call)
     
 
-    async def _list(self, item_type: ItemType, request: Request) -> dict[str, Any]:
+    async def _list(self, item_type: ItemType, request: Request) -> Response:
         """Get list of items."""
-        ctx = self.sonolus.build_context(request)
-        query = self.sonolus.build_query(item_type, request)
-        
         # クエリパラメータから type を取得（list_type用）
         list_type = request.query_params.get("type")
 
         handler = self.sonolus.get_handler(item_type, "list", filter_key=list_type)
         if handler is None:
-            raise HTTPException(404, "list handler not implemented")
+            return self._handler_not_found("list handler not implemented")
         
-        result = await handler.call(ctx, query)
-        return self._build_response(handler, result, request)
+        async def call():
+            ctx = self.sonolus.build_context(request)
+            query = self.sonolus.build_query(item_type, request)
+            with timed("handler"):
+                return await handler.call(ctx, query)
+
+        return await self._cached_response(handler, request, item_type, "list", list_type, call)
     
 
-    async def _detail(self, item_type: ItemType, name: str, request: Request) -> dict[str, Any]:
+    async def _detail(self, item_type: ItemType, name: str, request: Request) -> Response:
         """Get item detail."""
-        ctx = self.sonolus.build_context(request)
-        
         # クエリパラメータから type を取得（detail_type用）
         detail_type = request.query_params.get("type")
 
         handler = self.sonolus.get_handler(item_type, "detail", filter_key=detail_type)
         if handler is None:
-            raise HTTPException(404, "detail handler not implemented")
+            return self._handler_not_found("detail handler not implemented")
+
+        async def call():
+            ctx = self.sonolus.build_context(request)
+            with timed("handler"):
+                return await handler.call(ctx, name)
 
-        result = await handler.call(ctx, name)
-        return self._build_response(handler, result, request)
+        return await self._cached_response(handler, request, item_type, "detail", detail_type, call, name)
     
 
-    async def _actions(self, item_type: ItemType, name: str, request: Request) -> dict[str, Any]:
+    async def _actions(self, item_type: ItemType, name: str, request: Request) -> Response:
         """Handle item actions."""
         ctx = self.sonolus.build_context(request)
         action_request = await self._parse_request_body(request)
@@ -303,12 +565,13 @@ class SonolusApi:
 
         handler = self.sonolus.get_handler(item_type, "actions", filter_key=action_type)
         if handler is None:
-            raise HTTPException(404, "actions handler not implemented")
+            return self._handler_not_found("actions handler not implemented")
 
-        result = await handler.call(ctx, name, action_request)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx, name, action_request)
+        return self._render_response(handler, result, request)
     
-    async def _upload(self, item_type: ItemType, name: str, request: Request) -> dict[str, Any]:
+    async def _upload(self, item_type: ItemType, name: str, request: Request) -> Response:
         """Handle item upload."""
         from fastapi import File, UploadFile, Form
         from typing import List
@@ -327,12 +590,13 @@ class SonolusApi:
         
         handler = self.sonolus.get_handler(item_type, "upload", filter_key=upload_type)
         if handler is None:
-            raise HTTPException(404, "upload handler not implemented")
+            return self._handler_not_found("upload handler not implemented")
         
-        result = await handler.call(ctx, name, upload_key, files)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx, name, upload_key, files)
+        return self._render_response(handler, result, request)
     
-    async def _result_info(self, item_type: ItemType, request: Request) -> dict[str, Any]:
+    async def _result_info(self, item_type: ItemType, request: Request) -> Response:
         """Get result information (levels only)."""
         # result info is only available for levels
         if item_type != ItemType.level:
@@ -345,12 +609,13 @@ class SonolusApi:
         
         handler = self.sonolus.get_handler(item_type, "result_info", filter_key=result_type)
         if handler is None:
-            raise HTTPException(404, "result info handler not implemented")
+            return self._handler_not_found("result info handler not implemented")
         
-        result = await handler.call(ctx)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx)
+        return self._get_response(handler, result, request, "result_info")
     
-    async def _result_submit(self, item_type: ItemType, request: Request) -> dict[str, Any]:
+    async def _result_submit(self, item_type: ItemType, request: Request) -> Response:
         """Submit result (levels only)."""
         # result submit is only available for levels
         if item_type != ItemType.level:
@@ -388,12 +653,13 @@ class SonolusApi:
         
         handler = self.sonolus.get_handler(item_type, "result_submit", filter_key=result_type)
         if handler is None:
-            raise HTTPException(404, "result submit handler not implemented")
+            return self._handler_not_found("result submit handler not implemented")
         
-        result = await handler.call(ctx, submit_request)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx, submit_request)
+        return self._render_response(handler, result, request)
     
-    async def _result_upload(self, item_type: ItemType, request: Request) -> dict[str, Any]:
+    async def _result_upload(self, item_type: ItemType, request: Request) -> Response:
         """Upload result (levels only)."""
         # result upload is only available for levels
         if item_type != ItemType.level:
@@ -416,12 +682,13 @@ class SonolusApi:
         
         handler = self.sonolus.get_handler(item_type, "result_upload", filter_key=result_type)
         if handler is None:
-            raise HTTPException(404, "result upload handler not implemented")
+            return self._handler_not_found("result upload handler not implemented")
         
-        result = await handler.call(ctx, upload_key, files)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx, upload_key, files)
+        return self._render_response(handler, result, request)
 
-    async def _room_create(self, item_type: ItemType, request: Request) -> dict[str, Any]:
+    async def _room_create(self, item_type: ItemType, request: Request) -> Response:
         """Create a room (rooms only)."""
         from sonolus_models import ServerCreateRoomRequest
         if item_type != ItemType.room:
@@ -439,50 +706,54 @@ class SonolusApi:
         
         handler = self.sonolus.get_room_handler("create")
         if handler is None:
-            raise HTTPException(404, "room create handler not implemented")
+            return self._handler_not_found("room create handler not implemented")
         
-        result = await handler.call(ctx)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx)
+        return self._render_response(handler, result, request)
 
-    async def _community_info(self, item_type: ItemType, name: str, request: Request) -> dict[str, Any]:
+    async def _community_info(self, item_type: ItemType, name: str, request: Request) -> Response:
         """Get community information for an item."""
         ctx = self.sonolus.build_context(request)
 
         handler = self.sonolus.get_community_handler(item_type, "info")
         if handler is None:
-            raise HTTPException(404, "community info handler not implemented")
+            return self._handler_not_found("community info handler not implemented")
 
-        result = await handler.call(ctx, name)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx, name)
+        return self._get_response(handler, result, request, "community_info")
     
 
-    async def _community_comments(self, item_type: ItemType, name: str, request: Request) -> dict[str, Any]:
+    async def _community_comments(self, item_type: ItemType, name: str, request: Request) -> Response:
         """Get community comments for an item."""
         ctx = self.sonolus.build_context(request)
         query = self.sonolus.build_query(item_type, request)
 
         handler = self.sonolus.get_community_handler(item_type, "comments")
         if handler is None:
-            raise HTTPException(404, "community comments handler not implemented")
+            return self._handler_not_found("community comments handler not implemented")
 
-        result = await handler.call(ctx, name, query)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx, name, query)
+        return self._get_response(handler, result, request, "community_comments")
     
 
-    async def _community_actions(self, item_type: ItemType, name: str, request: Request) -> dict[str, Any]:
+    async def _community_actions(self, item_type: ItemType, name: str, request: Request) -> Response:
         """Handle community actions for an item."""
         ctx = self.sonolus.build_context(request)
         action_request = await self._parse_request_body(request)
 
         handler = self.sonolus.get_community_handler(item_type, "actions")
         if handler is None:
-            raise HTTPException(404, "community actions handler not implemented")
+            return self._handler_not_found("community actions handler not implemented")
 
-        result = await handler.call(ctx, name, action_request)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx, name, action_request)
+        return self._render_response(handler, result, request)
     
 
-    async def _community_upload(self, item_type: ItemType, name: str, request: Request) -> dict[str, Any]:
+    async def _community_upload(self, item_type: ItemType, name: str, request: Request) -> Response:
         """Handle community upload for an item."""
         from fastapi import File, UploadFile, Form
         from typing import List
@@ -498,26 +769,28 @@ class SonolusApi:
         
         handler = self.sonolus.get_community_handler(item_type, "upload")
         if handler is None:
-            raise HTTPException(404, "community upload handler not implemented")
+            return self._handler_not_found("community upload handler not implemented")
         
-        result = await handler.call(ctx, name, upload_key, files)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx, name, upload_key, files)
+        return self._render_response(handler, result, request)
     
 
-    async def _community_comment_actions(self, item_type: ItemType, name: str, comment_name: str, request: Request) -> dict[str, Any]:
+    async def _community_comment_actions(self, item_type: ItemType, name: str, comment_name: str, request: Request) -> Response:
         """Handle community comment actions."""
         ctx = self.sonolus.build_context(request)
         action_request = await self._parse_request_body(request)
 
         handler = self.sonolus.get_community_handler(item_type, "comment_actions")
         if handler is None:
-            raise HTTPException(404, "community comment actions handler not implemented")
+            return self._handler_not_found("community comment actions handler not implemented")
 
-        result = await handler.call(ctx, name, comment_name, action_request)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx, name, comment_name, action_request)
+        return self._render_response(handler, result, request)
     
 
-    async def _community_comment_upload(self, item_type: ItemType, name: str, comment_name: str, request: Request) -> dict[str, Any]:
+    async def _community_comment_upload(self, item_type: ItemType, name: str, comment_name: str, request: Request) -> Response:
         """Handle community comment upload."""
         from fastapi import File, UploadFile, Form
         from typing import List
@@ -533,41 +806,45 @@ class SonolusApi:
         
         handler = self.sonolus.get_community_handler(item_type, "comment_upload")
         if handler is None:
-            raise HTTPException(404, "community comment upload handler not implemented")
+            return self._handler_not_found("community comment upload handler not implemented")
         
-        result = await handler.call(ctx, name, comment_name, upload_key, files)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx, name, comment_name, upload_key, files)
+        return self._render_response(handler, result, request)
 
-    async def _leaderboard_detail(self, item_type: ItemType, name: str, leaderboard_name: str, request: Request) -> dict[str, Any]:
+    async def _leaderboard_detail(self, item_type: ItemType, name: str, leaderboard_name: str, request: Request) -> Response:
         """Get leaderboard details."""
         ctx = self.sonolus.build_context(request)
 
         handler = self.sonolus.get_leaderboard_handler(item_type, "detail")
         if handler is None:
-            raise HTTPException(404, "leaderboard detail handler not implemented")
+            return self._handler_not_found("leaderboard detail handler not implemented")
 
-        result = await handler.call(ctx, name, leaderboard_name)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx, name, leaderboard_name)
+        return self._get_response(handler, result, request, "leaderboard_detail")
 
-    async def _leaderboard_records(self, item_type: ItemType, name: str, leaderboard_name: str, request: Request) -> dict[str, Any]:
+    async def _leaderboard_records(self, item_type: ItemType, name: str, leaderboard_name: str, request: Request) -> Response:
         """Get leaderboard records."""
         ctx = self.sonolus.build_context(request)
         query = self.sonolus.build_query(item_type, request)
 
         handler = self.sonolus.get_leaderboard_handler(item_type, "records")
         if handler is None:
-            raise HTTPException(404, "leaderboard records handler not implemented")
+            return self._handler_not_found("leaderboard records handler not implemented")
 
-        result = await handler.call(ctx, name, leaderboard_name, query)
-        return self._build_response(handler, result, request)
+        with timed("handler"):
+            result = await handler.call(ctx, name, leaderboard_name, query)
+        return self._get_response(handler, result, request, "leaderboard_records")
 
-    async def _leaderboard_record_detail(self, item_type: ItemType, name: str, leaderboard_name: str, record_name: str, request: Request) -> dict[str, Any]:
+    async def _leaderboard_record_detail(self, item_type: ItemType, name: str, leaderboard_name: str, record_name: str, request: Request) -> Response:
         """Get leaderboard record details."""
         ctx = self.sonolus.build_context(request)
 
         handler = self.sonolus.get_leaderboard_handler(item_type, "record_detail")
         if handler is None:
-            raise HTTPException(404, "leaderboard record detail handler not implemented")
+            return self._handler_not_found("leaderboard record detail handler not implemented")
 
-        result = await handler.call(ctx, name, leaderboard_name, record_name)
-        return self._build_response(handler, result, request)
\ No newline at end of file
+        with timed("handler"):
+            result = await handler.call(ctx, name, leaderboard_name, record_name)
+        return self._get_response(handler, result, request, "leaderboard_record_detail")
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, create_model
+from pydantic import BaseModel, ConfigDict, Field, create_model
 from typing import Optional, Type, List
 from sonolus_models import ServerForm
 
@@ -38,11 +38,12 @@ def create_query_model(name: str, form: ServerForm) -> Type[BaseModel]:
 
         # def_フィールドの値を正しく取得
         # Pydanticのaliasに対応するため、直接アクセスする
-        default = opt.def_
+        default = getattr(opt, "def_", None)  # collectionItem には def がない
 
         fields[opt.query] = (
             py_type,
             Field(default=default, description=str(opt.name)),
         )
 
-    return create_model(name, **fields)
+    # type / page / localization などフォーム外のクエリも属性として参照できるようにする
+    return create_model(name, __config__=ConfigDict(extra="allow"), **fields)
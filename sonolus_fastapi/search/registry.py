@@ -1,8 +1,9 @@
 from dataclasses import dataclass
-from typing import Optional, Dict, Type
+from typing import Optional, Dict, Tuple, Type
 from pydantic import BaseModel
 from sonolus_models import ServerForm
 from .query_model import create_query_model
+from .query_parser import QueryParser
 
 @dataclass
 class SearchRegistry:
@@ -17,9 +18,11 @@ class SearchRegistry:
     replay: Optional[ServerForm] = None
 
     _models: Dict[str, Type[BaseModel]] = None
+    _parsers: Dict[str, Tuple[ServerForm, QueryParser]] = None
 
     def __post_init__(self):
         self._models = {}
+        self._parsers = {}
 
     def get_form(self, key: str) -> Optional[ServerForm]:
         return getattr(self, key, None)
@@ -35,3 +38,21 @@ class SearchRegistry:
         model = create_query_model(f"{key.capitalize()}SearchQuery", form)
         self._models[key] = model
         return model
+
+
+    def get_query_parser(self, key: str) -> Optional[QueryParser]:
+        form = self.get_form(key)
+        if form is None:
+            return None
+
+        # フォームが差し替えられた場合はパーサーを作り直す
+        entry = self._parsers.get(key)
+        if entry is not None:
+            if entry[0] is form:
+                return entry[1]
+            self._models.pop(key, None)
+
+        model = self.get_query_model(key)
+        parser = QueryParser(model, form)
+        self._parsers[key] = (form, parser)
+        return parser
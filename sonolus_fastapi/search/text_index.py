@@ -0,0 +1,248 @@
+"""
+キーワード検索用の n-gram 全文インデックス
+
+title / subtitle / author / description を NFKC 正規化・casefold した上で
+1文字と2文字の n-gram に分割して転置インデックスを作ります（空白で区切らない日本語のタイトルにも対応）。
+検索時は各キーワードの n-gram の posting list を小さい順に積集合を取って候補を絞り、
+部分文字列として含まれるかを確認してから、フィールドの重みでスコア付けします。
+posting list はどのフィールドに含まれるかのビットマスクを持つので、2文字以下のキーワードは文字列を確認せずにスコア付けできます。
+
+    index = build_text_index(sonolus.items.level)
+    names, total = index.search(query.keywords, limit=20, offset=0)
+    items = sonolus.items.level.get_many(names)
+    # ListResult が必要な場合は utils.query_executor.search_items(store, query, index, limit, offset)
+
+`build_text_index` で作成したインデックスはストアの StoreEvents を購読し、書き込みごとに差分で更新されます。
+"""
+import unicodedata
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+DEFAULT_FIELDS: Tuple[str, ...] = ("title", "subtitle", "author", "description")
+DEFAULT_WEIGHTS: Mapping[str, float] = {"title": 4.0, "subtitle": 2.0, "author": 2.0, "description": 1.0}
+# タイトルがキーワードで始まる場合の加点
+PREFIX_BONUS = 1.0
+# 並び替え済みの検索結果を保持するキーワード数（書き込みがあると破棄する）
+RESULT_CACHE_SIZE = 64
+
+
+def normalize_text(value: Any) -> str:
+    """全角・半角や大文字・小文字の違いをなくす"""
+    if value is None:
+        return ""
+    return unicodedata.normalize("NFKC", str(value)).casefold()
+
+
+def split_keywords(keywords: str) -> List[str]:
+    return [term for term in normalize_text(keywords).split() if term]
+
+
+def text_grams(text: str) -> Set[str]:
+    """テキストの 1-gram と 2-gram の集合"""
+    grams: Set[str] = set()
+    for chunk in text.split():
+        grams.update(chunk)
+        grams.update(chunk[index:index + 2] for index in range(len(chunk) - 1))
+    return grams
+
+
+def term_grams(term: str) -> Set[str]:
+    """キーワード1語の検索に使う n-gram（1文字なら 1-gram、それ以外は 2-gram）"""
+    if len(term) == 1:
+        return {term}
+    return {term[index:index + 2] for index in range(len(term) - 1)}
+
+
+class TextIndex:
+    """アイテム名をキーにした n-gram 転置インデックス"""
+
+    def __init__(
+        self,
+        fields: Iterable[str] = DEFAULT_FIELDS,
+        weights: Optional[Mapping[str, float]] = None,
+        cache_size: int = RESULT_CACHE_SIZE,
+    ):
+        self.fields = tuple(fields)
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.weights = tuple(weights.get(field, 1.0) for field in self.fields)
+        # フィールドのビットマスク -> 重みの合計
+        self._mask_weights = tuple(
+            sum(weight for bit, weight in enumerate(self.weights) if mask >> bit & 1)
+            for mask in range(1 << len(self.fields))
+        )
+        self._ids: Dict[str, int] = {}
+        self._names: List[Optional[str]] = []
+        # 削除されたアイテムの id（再利用する）
+        self._free: List[int] = []
+        # id -> (正規化したフィールドの値, n-gram の集合)
+        self._docs: Dict[int, Tuple[Tuple[str, ...], FrozenSet[str]]] = {}
+        # n-gram -> {id: 含まれるフィールドのビットマスク}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._results: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def add(self, name: str, item: Any) -> None:
+        """アイテムを追加する（既にある場合は置き換える）"""
+        texts = tuple(normalize_text(getattr(item, field, None)) for field in self.fields)
+        masks: Dict[str, int] = {}
+        for bit, text in enumerate(texts):
+            for gram in text_grams(text):
+                masks[gram] = masks.get(gram, 0) | 1 << bit
+        with self._lock:
+            self._results.clear()
+            self._remove(name)
+            if self._free:
+                doc_id = self._free.pop()
+                self._names[doc_id] = name
+            else:
+                doc_id = len(self._names)
+                self._names.append(name)
+            self._ids[name] = doc_id
+            self._docs[doc_id] = (texts, frozenset(masks))
+            postings = self._postings
+            for gram, mask in masks.items():
+                ids = postings.get(gram)
+                if ids is None:
+                    postings[gram] = {doc_id: mask}
+                else:
+                    ids[doc_id] = mask
+
+    def remove(self, name: str) -> None:
+        with self._lock:
+            self._results.clear()
+            self._remove(name)
+
+    def _remove(self, name: str) -> None:
+        doc_id = self._ids.pop(name, None)
+        if doc_id is None:
+            return
+        self._names[doc_id] = None
+        self._free.append(doc_id)
+        _, grams = self._docs.pop(doc_id)
+        for gram in grams:
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.pop(doc_id, None)
+                if not ids:
+                    del self._postings[gram]
+
+    def rebuild(self, items: Mapping[str, Any]) -> None:
+        """インデックスを作り直す"""
+        with self._lock:
+            self._ids.clear()
+            self._names.clear()
+            self._free.clear()
+            self._docs.clear()
+            self._postings.clear()
+            self._results.clear()
+            for name, item in items.items():
+                self.add(name, item)
+
+    def _candidates(self, terms: List[str]) -> Optional[Iterable[int]]:
+        postings = self._postings
+        lists = []
+        for term in terms:
+            for gram in term_grams(term):
+                ids = postings.get(gram)
+                if ids is None:
+                    return None
+                lists.append(ids)
+        lists.sort(key=len)
+        candidates = lists[0].keys()
+        for ids in lists[1:]:
+            candidates = candidates & ids.keys()
+            if not candidates:
+                return None
+        return candidates
+
+    def _score(self, doc_id: int, terms: List[str]) -> float:
+        texts = self._docs[doc_id][0]
+        score = 0.0
+        for term in terms:
+            if len(term) <= 2:
+                # 1-gram / 2-gram はそのままフィールドのビットマスクが引ける
+                matched = self._mask_weights[self._postings[term][doc_id]]
+            else:
+                matched = 0.0
+                for text, weight in zip(texts, self.weights):
+                    if term in text:
+                        matched += weight
+            if not matched:
+                return 0.0
+            score += matched
+        if texts and self.fields[0] == "title" and texts[0].startswith(terms[0]):
+            score += PREFIX_BONUS
+        return score
+
+    def rank(self, keywords: str) -> List[Tuple[float, str]]:
+        """キーワードをすべて含むアイテムの (スコア, 名前) を返す（順不同）"""
+        terms = split_keywords(keywords)
+        if not terms:
+            return []
+        with self._lock:
+            candidates = self._candidates(terms)
+            if candidates is None:
+                return []
+            names = self._names
+            score = self._score
+            ranked = []
+            for doc_id in candidates:
+                value = score(doc_id, terms)
+                if value:
+                    ranked.append((value, names[doc_id]))
+        return ranked
+
+    def search(self, keywords: str, limit: int = 20, offset: int = 0) -> Tuple[List[str], int]:
+        """スコアの高い順（同点は名前順）に offset 件目から limit 件の名前と、一致した総数を返す"""
+        key = " ".join(split_keywords(keywords))
+        with self._lock:
+            names = self._results.get(key)
+            if names is None:
+                ranked = self.rank(key)
+                ranked.sort(key=lambda entry: (-entry[0], entry[1]))
+                names = [name for _, name in ranked]
+                if self._cache_size > 0:
+                    self._results[key] = names
+                    if len(self._results) > self._cache_size:
+                        self._results.popitem(last=False)
+            else:
+                self._results.move_to_end(key)
+        return names[offset:offset + limit], len(names)
+
+
+def build_text_index(
+    store: Any,
+    fields: Iterable[str] = DEFAULT_FIELDS,
+    weights: Optional[Mapping[str, float]] = None,
+) -> TextIndex:
+    """ストアの全アイテムからインデックスを作成し、ストアへの書き込みに追従させる"""
+    from sonolus_fastapi.backend.events import get_store_events
+
+    index = TextIndex(fields, weights)
+    index.rebuild(store.map())
+
+    events = get_store_events(store)
+    if events is not None:
+        def on_write(_events: Any, name: Optional[str]) -> None:
+            if name is None:
+                index.rebuild(store.map())
+                return
+            item = store.get(name)
+            if item is None:
+                index.remove(name)
+            else:
+                index.add(name, item)
+
+        events.subscribe(on_write)
+    return index
+
+
+__all__ = ["TextIndex", "build_text_index", "normalize_text", "DEFAULT_FIELDS"]
@@ -1,15 +1,104 @@
-from pydantic import BaseModel
-from typing import Optional, TypeVar, Generic, Dict, Union
-from sonolus_models import ServerOption
+from typing import Any, Callable, Dict, Generic, Mapping, Optional, TypeVar, Union
 
 T = TypeVar('T')
 
 # サーバーオプションの値として想定される型
 OptionValue = Union[str, int, float, bool]
+OptionParser = Callable[[str], OptionValue]
 
-class SonolusContext(BaseModel, Generic[T]):
-    user_session: Optional[str] = None
-    request: Optional[T] = None
-    localization: Optional[str] = None
-    options: Optional[Dict[str, OptionValue]] = None
-    is_dev: bool = False
\ No newline at end of file
+
+def _parse_toggle(raw_value: str) -> bool:
+    # toggleは "0" / "1" の文字列なのでbooleanに変換
+    return raw_value == "1" or raw_value.lower() == "true"
+
+
+def _parse_slider(raw_value: str) -> OptionValue:
+    # sliderは数値なのでint/floatに変換を試行
+    try:
+        if '.' in raw_value:
+            return float(raw_value)
+        return int(raw_value)
+    except ValueError:
+        return raw_value  # 変換失敗時は文字列のまま
+
+
+def _parse_text(raw_value: str) -> str:
+    # その他（text, textArea, select, file等）は文字列のまま
+    return raw_value
+
+
+_OPTION_PARSERS: Dict[str, OptionParser] = {
+    "toggle": _parse_toggle,
+    "slider": _parse_slider,
+}
+
+
+def compile_option_parser(option_type: Optional[str]) -> OptionParser:
+    """オプションの型に対応するパーサーを返す"""
+    return _OPTION_PARSERS.get(option_type, _parse_text)
+
+
+def parse_options(
+    query_params: Mapping[str, str],
+    parsers: Mapping[str, OptionParser],
+) -> Optional[Dict[str, OptionValue]]:
+    """クエリパラメータから設定されたオプションの値を取り出して変換する"""
+    options = {
+        query: parser(query_params[query])
+        for query, parser in parsers.items()
+        if query in query_params
+    }
+    return options or None
+
+
+class SonolusContext(Generic[T]):
+    """
+    ハンドラーに渡されるリクエストコンテキスト
+
+    `options` は最初にアクセスされたときに `options_loader` から読み込まれます。
+    """
+
+    __slots__ = ("user_session", "request", "localization", "is_dev", "_options", "_options_loader")
+
+    def __init__(
+        self,
+        user_session: Optional[str] = None,
+        request: Optional[T] = None,
+        localization: Optional[str] = None,
+        options: Optional[Dict[str, OptionValue]] = None,
+        is_dev: bool = False,
+        options_loader: Optional[Callable[[], Optional[Dict[str, OptionValue]]]] = None,
+    ):
+        self.user_session = user_session
+        self.request = request
+        self.localization = localization
+        self.is_dev = is_dev
+        self._options = options
+        self._options_loader = options_loader
+
+    @property
+    def options(self) -> Optional[Dict[str, OptionValue]]:
+        loader = self._options_loader
+        if loader is not None:
+            self._options = loader()
+            self._options_loader = None
+        return self._options
+
+    @options.setter
+    def options(self, value: Optional[Dict[str, OptionValue]]) -> None:
+        self._options = value
+        self._options_loader = None
+
+    def model_dump(self) -> Dict[str, Any]:
+        """以前の pydantic モデルと同じ形の dict を返す"""
+        return {
+            "user_session": self.user_session,
+            "request": self.request,
+            "localization": self.localization,
+            "options": self.options,
+            "is_dev": self.is_dev,
+        }
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{key}={value!r}" for key, value in self.model_dump().items())
+        return f"{type(self).__name__}({fields})"
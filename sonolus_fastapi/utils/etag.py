@@ -0,0 +1,30 @@
+import hashlib
+
+
+def compute_etag(body: bytes) -> str:
+    """レスポンスボディから強い ETag を計算する"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def derive_etag(etag: str, salt: str) -> str:
+    """既存の ETag と追加の値（送信先アドレスなど）から新しい ETag を作る"""
+    return compute_etag(f"{etag}\x00{salt}".encode("utf-8"))
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match ヘッダーが ETag に一致するかを判定する（弱い比較）"""
+    if_none_match = if_none_match.strip()
+    if if_none_match == "*":
+        return True
+
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+__all__ = ["compute_etag", "derive_etag", "etag_matches"]
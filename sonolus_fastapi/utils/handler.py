@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from .context import SonolusContext
 from .query import Query
+from .response_cache import CachePolicy
 from typing import Callable, Awaitable, Generic, TypeVar, Any
 from pydantic import BaseModel
 
@@ -30,27 +31,42 @@ class ServerInfoHandlerDescriptor(Generic[T]):
         return await self.fn(ctx)
 
 class InfoHandlerDescriptor(Generic[T]):
-    def __init__(self, fn: InfoFn[T], response_model: type[T], info_type: str | None = None):
+    def __init__(
+        self,
+        fn: InfoFn[T],
+        response_model: type[T],
+        info_type: str | None = None,
+        cache_policy: CachePolicy | None = None,
+    ):
         self.fn = fn
         self.response_model = response_model
         self.info_type = info_type
+        self.cache_policy = cache_policy
 
     async def call(self, ctx: Ctx) -> T:
         return await self.fn(ctx)
 
 class ListHandlerDescriptor(Generic[T]):
-    def __init__(self, fn: ListFn[T], response_model: type[T], list_type: str | None = None):
+    def __init__(
+        self,
+        fn: ListFn[T],
+        response_model: type[T],
+        list_type: str | None = None,
+        cache_policy: CachePolicy | None = None,
+    ):
         self.fn = fn
         self.response_model = response_model
         self.list_type = list_type
+        self.cache_policy = cache_policy
 
     async def call(self, ctx: Ctx, query: Query) -> T:
         return await self.fn(ctx, query)
 
 class DetailHandlerDescriptor(Generic[T]):
-    def __init__(self, fn: DetailFn[T], response_model: type[T]):
+    def __init__(self, fn: DetailFn[T], response_model: type[T], cache_policy: CachePolicy | None = None):
         self.fn = fn
         self.response_model = response_model
+        self.cache_policy = cache_policy
 
     async def call(self, ctx: Ctx, name: str) -> T:
         return await self.fn(ctx, name)
@@ -8,6 +8,7 @@ from .handler import (
     ListHandlerDescriptor,
     DetailHandlerDescriptor,
 )
+from .response_cache import CachePolicy, resolve_cache_policy
 
 if TYPE_CHECKING:
     from sonolus_fastapi.index import Sonolus
@@ -19,9 +20,16 @@ class InfoSlot(Generic[T]):
         self.sonolus = sonolus
         self.item_type = item_type
 
-    def __call__(self, response_model: type[T], info_type: str | None = None):
+    def __call__(
+        self,
+        response_model: type[T],
+        info_type: str | None = None,
+        cache: bool | CachePolicy = False,
+    ):
+        cache_policy = resolve_cache_policy(cache)
+
         def decorator(fn):
-            desc = InfoHandlerDescriptor(fn, response_model, info_type=info_type)
+            desc = InfoHandlerDescriptor(fn, response_model, info_type=info_type, cache_policy=cache_policy)
             self.sonolus._register_handler(self.item_type, "info", desc, filter_key=info_type)
             return fn
         return decorator
@@ -31,9 +39,16 @@ class ListSlot(Generic[T]):
         self.sonolus = sonolus
         self.item_type = item_type
 
-    def __call__(self, response_model: type[T], list_type: str | None = None):
+    def __call__(
+        self,
+        response_model: type[T],
+        list_type: str | None = None,
+        cache: bool | CachePolicy = False,
+    ):
+        cache_policy = resolve_cache_policy(cache)
+
         def decorator(fn):
-            desc = ListHandlerDescriptor(fn, response_model, list_type=list_type)
+            desc = ListHandlerDescriptor(fn, response_model, list_type=list_type, cache_policy=cache_policy)
             self.sonolus._register_handler(self.item_type, "list", desc, filter_key=list_type)
             return fn
         return decorator
@@ -43,9 +58,16 @@ class DetailSlot(Generic[T]):
         self.sonolus = sonolus
         self.item_type = item_type
 
-    def __call__(self, response_model: type[T], detail_type: str | None = None):
+    def __call__(
+        self,
+        response_model: type[T],
+        detail_type: str | None = None,
+        cache: bool | CachePolicy = False,
+    ):
+        cache_policy = resolve_cache_policy(cache)
+
         def decorator(fn):
-            desc = DetailHandlerDescriptor(fn, response_model)
+            desc = DetailHandlerDescriptor(fn, response_model, cache_policy=cache_policy)
             self.sonolus._register_handler(self.item_type, "detail", desc, filter_key=detail_type)
             return fn
         return decorator
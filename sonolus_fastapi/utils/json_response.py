@@ -0,0 +1,57 @@
+"""
+Sonolus ルート用の JSON エンコーダー
+
+`encode_json` は Starlette の JSONResponse と同じ標準ライブラリの出力、
+`encode_json_fast` は pydantic-core の `to_json` を使います。
+どちらも NaN / Infinity は JSON にできないので ValueError を送出します。
+（orjson は NaN を null にしてしまい区別できないため使いません）
+"""
+import json
+from typing import Any, Callable
+
+from pydantic_core import to_json
+from starlette.responses import JSONResponse
+
+
+
+def encode_json(content: Any) -> bytes:
+    """Starlette の JSONResponse と同じ形式で JSON バイト列にエンコードする"""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def encode_json_fast(content: Any) -> bytes:
+    """pydantic-core で JSON バイト列にエンコードする（NaN / Infinity は `encode_json` と同じく ValueError）"""
+    body = to_json(content, inf_nan_mode="constants")
+    # 文字列中に含まれているだけのこともあるので、見つかった場合だけパースして値として出力されたかを確かめる
+    if b"NaN" in body or b"Infinity" in body:
+        json.loads(body, parse_constant=_reject_constant)
+    return body
+
+
+def _reject_constant(constant: str) -> Any:
+    raise ValueError(f"Out of range float values are not JSON compliant: {constant}")
+
+
+def get_json_encoder(fast: bool) -> Callable[[Any], bytes]:
+    return encode_json_fast if fast else encode_json
+
+
+class SonolusJSONResponse(JSONResponse):
+    """
+    `encode_json_fast` で書き出す JSONResponse
+
+    ルートから直接返した場合だけ `jsonable_encoder` を通らない（`response_class` に指定しても、
+    dict を返すルートでは FastAPI が先に `jsonable_encoder` を実行する）。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return encode_json_fast(content)
+
+
+__all__ = ["SonolusJSONResponse", "encode_json", "encode_json_fast", "get_json_encoder"]
@@ -0,0 +1,303 @@
+"""
+Sonolus ハンドラーのメトリクス
+
+レイテンシ・レスポンスサイズのヒストグラムとステータスごとのリクエスト数、
+ストア操作ごとのレイテンシ・読み込み件数・バイト数を
+スレッドごとのシャードに記録し、Prometheus のテキスト形式で出力します。
+記録時はロックを取らず、各スレッドは自分のシャードだけを書き換えます。
+"""
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+DEFAULT_SIZE_BUCKETS: Tuple[float, ...] = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+)
+
+Labels = Tuple[str, str]
+# (store, backend, operation)
+StoreLabels = Tuple[str, str, str]
+
+
+class _Series:
+    """(kind, item_type) ごとの記録"""
+
+    __slots__ = ("latency", "latency_sum", "sizes", "size_sum", "count", "errors", "statuses")
+
+    def __init__(self, latency_buckets: int, size_buckets: int):
+        # 最後の要素は +Inf
+        self.latency: List[int] = [0] * (latency_buckets + 1)
+        self.latency_sum = 0.0
+        self.sizes: List[int] = [0] * (size_buckets + 1)
+        self.size_sum = 0
+        self.count = 0
+        self.errors = 0
+        self.statuses: Dict[int, int] = {}
+
+    def merge(self, other: "_Series") -> None:
+        for index, value in enumerate(other.latency):
+            self.latency[index] += value
+        for index, value in enumerate(other.sizes):
+            self.sizes[index] += value
+        self.latency_sum += other.latency_sum
+        self.size_sum += other.size_sum
+        self.count += other.count
+        self.errors += other.errors
+        for status, value in list(other.statuses.items()):
+            self.statuses[status] = self.statuses.get(status, 0) + value
+
+
+class _StoreSeries:
+    """(store, backend, operation) ごとの記録"""
+
+    __slots__ = ("latency", "latency_sum", "count", "errors", "rows", "bytes_read")
+
+    def __init__(self, latency_buckets: int):
+        self.latency: List[int] = [0] * (latency_buckets + 1)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes_read = 0
+
+    def merge(self, other: "_StoreSeries") -> None:
+        for index, value in enumerate(other.latency):
+            self.latency[index] += value
+        self.latency_sum += other.latency_sum
+        self.count += other.count
+        self.errors += other.errors
+        self.rows += other.rows
+        self.bytes_read += other.bytes_read
+
+
+class SonolusMetrics:
+    """
+    ハンドラーの種類・アイテムタイプごとのメトリクス
+
+    使用例:
+        sonolus = Sonolus(metrics=True)
+        # GET /sonolus/_metrics で Prometheus 形式のテキストを返す
+    """
+
+    def __init__(
+        self,
+        latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+        size_buckets: Sequence[float] = DEFAULT_SIZE_BUCKETS,
+    ):
+        self.latency_buckets = tuple(latency_buckets)
+        self.size_buckets = tuple(size_buckets)
+        self._local = threading.local()
+        self._shards: List[Dict[Labels, _Series]] = []
+        self._store_shards: List[Dict[StoreLabels, _StoreSeries]] = []
+        # キャッシュのヒット数を持つストア（`cache_hits` / `cache_misses` 属性）
+        self._cached_stores: List[Tuple[Tuple[str, str], Any]] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict[Labels, _Series]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _store_shard(self) -> Dict[StoreLabels, _StoreSeries]:
+        shard = getattr(self._local, "store_shard", None)
+        if shard is None:
+            shard = self._local.store_shard = {}
+            with self._lock:
+                self._store_shards.append(shard)
+        return shard
+
+    def observe(self, kind: str, item_type: str, seconds: float, status: int, size: int) -> None:
+        """1リクエスト分の記録を追加する"""
+        shard = self._shard()
+        labels = (kind, item_type)
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = _Series(len(self.latency_buckets), len(self.size_buckets))
+
+        series.latency[bisect_left(self.latency_buckets, seconds)] += 1
+        series.latency_sum += seconds
+        series.sizes[bisect_left(self.size_buckets, size)] += 1
+        series.size_sum += size
+        series.count += 1
+        if status >= 500:
+            series.errors += 1
+        series.statuses[status] = series.statuses.get(status, 0) + 1
+
+    def observe_store(
+        self,
+        store: str,
+        backend: str,
+        operation: str,
+        seconds: float,
+        rows: int = 0,
+        bytes_read: int = 0,
+        error: bool = False,
+    ) -> None:
+        """ストア操作1回分の記録を追加する"""
+        shard = self._store_shard()
+        labels = (store, backend, operation)
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = _StoreSeries(len(self.latency_buckets))
+
+        series.latency[bisect_left(self.latency_buckets, seconds)] += 1
+        series.latency_sum += seconds
+        series.count += 1
+        series.rows += rows
+        series.bytes_read += bytes_read
+        if error:
+            series.errors += 1
+
+    def register_cached_store(self, store: str, backend: str, instance: Any) -> None:
+        """`cache_hits` / `cache_misses` を持つストアを出力対象に加える"""
+        if hasattr(instance, "cache_hits") and hasattr(instance, "cache_misses"):
+            with self._lock:
+                self._cached_stores.append(((store, backend), instance))
+
+    def snapshot(self) -> Dict[Labels, _Series]:
+        """全シャードを集計した記録を返す"""
+        with self._lock:
+            shards = list(self._shards)
+        merged: Dict[Labels, _Series] = {}
+        for shard in shards:
+            for labels, series in list(shard.items()):
+                target = merged.get(labels)
+                if target is None:
+                    target = merged[labels] = _Series(len(self.latency_buckets), len(self.size_buckets))
+                target.merge(series)
+        return merged
+
+    def store_snapshot(self) -> Dict[StoreLabels, _StoreSeries]:
+        """全シャードを集計したストア操作の記録を返す"""
+        with self._lock:
+            shards = list(self._store_shards)
+        merged: Dict[StoreLabels, _StoreSeries] = {}
+        for shard in shards:
+            for labels, series in list(shard.items()):
+                target = merged.get(labels)
+                if target is None:
+                    target = merged[labels] = _StoreSeries(len(self.latency_buckets))
+                target.merge(series)
+        return merged
+
+    def cache_snapshot(self) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """ストアごとのキャッシュの (hits, misses) を返す"""
+        with self._lock:
+            stores = list(self._cached_stores)
+        result: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        for labels, instance in stores:
+            hits, misses = result.get(labels, (0, 0))
+            result[labels] = (hits + instance.cache_hits, misses + instance.cache_misses)
+        return result
+
+    def render_prometheus(self) -> str:
+        """Prometheus のテキスト形式（0.0.4）で出力する"""
+        snapshot = sorted(self.snapshot().items())
+        lines: List[str] = []
+
+        lines.append("# HELP sonolus_request_duration_seconds Sonolus handler latency in seconds.")
+        lines.append("# TYPE sonolus_request_duration_seconds histogram")
+        for labels, series in snapshot:
+            _histogram_lines(
+                lines, "sonolus_request_duration_seconds", labels,
+                self.latency_buckets, series.latency, series.latency_sum, series.count,
+            )
+
+        lines.append("# HELP sonolus_response_size_bytes Sonolus response body size in bytes.")
+        lines.append("# TYPE sonolus_response_size_bytes histogram")
+        for labels, series in snapshot:
+            _histogram_lines(
+                lines, "sonolus_response_size_bytes", labels,
+                self.size_buckets, series.sizes, series.size_sum, series.count,
+            )
+
+        lines.append("# HELP sonolus_requests_total Sonolus requests by status code.")
+        lines.append("# TYPE sonolus_requests_total counter")
+        for labels, series in snapshot:
+            for status, value in sorted(series.statuses.items()):
+                lines.append(f"sonolus_requests_total{{{_format_labels(labels)},status=\"{status}\"}} {value}")
+
+        lines.append("# HELP sonolus_handler_errors_total Sonolus requests that failed with a server error.")
+        lines.append("# TYPE sonolus_handler_errors_total counter")
+        for labels, series in snapshot:
+            lines.append(f"sonolus_handler_errors_total{{{_format_labels(labels)}}} {series.errors}")
+
+        stores = sorted(self.store_snapshot().items())
+        if stores:
+            lines.append("# HELP sonolus_store_operation_duration_seconds Store operation latency in seconds.")
+            lines.append("# TYPE sonolus_store_operation_duration_seconds histogram")
+            for labels, series in stores:
+                _histogram_lines(
+                    lines, "sonolus_store_operation_duration_seconds", labels,
+                    self.latency_buckets, series.latency, series.latency_sum, series.count,
+                    _format_store_labels,
+                )
+            for name, help_text, attr in (
+                ("sonolus_store_rows_read_total", "Rows returned by store operations.", "rows"),
+                ("sonolus_store_bytes_read_total", "Serialized bytes read from storage by store operations.", "bytes_read"),
+                ("sonolus_store_errors_total", "Store operations that raised an exception.", "errors"),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, series in stores:
+                    lines.append(f"{name}{{{_format_store_labels(labels)}}} {getattr(series, attr)}")
+
+        caches = sorted(self.cache_snapshot().items())
+        if caches:
+            lines.append("# HELP sonolus_store_cache_requests_total Store cache lookups by result.")
+            lines.append("# TYPE sonolus_store_cache_requests_total counter")
+            for (store, backend), (hits, misses) in caches:
+                label_text = f'store="{_escape(store)}",backend="{_escape(backend)}"'
+                lines.append(f'sonolus_store_cache_requests_total{{{label_text},result="hit"}} {hits}')
+                lines.append(f'sonolus_store_cache_requests_total{{{label_text},result="miss"}} {misses}')
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Labels) -> str:
+    kind, item_type = labels
+    return f'kind="{_escape(kind)}",item_type="{_escape(item_type)}"'
+
+
+def _format_store_labels(labels: StoreLabels) -> str:
+    store, backend, operation = labels
+    return f'store="{_escape(store)}",backend="{_escape(backend)}",operation="{_escape(operation)}"'
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram_lines(
+    lines: List[str],
+    name: str,
+    labels: Tuple[str, ...],
+    buckets: Iterable[float],
+    counts: List[int],
+    total: float,
+    count: int,
+    format_labels: Any = _format_labels,
+) -> None:
+    label_text = format_labels(labels)
+    cumulative = 0
+    for bound, value in zip(buckets, counts):
+        cumulative += value
+        lines.append(f'{name}_bucket{{{label_text},le="{_format_number(bound)}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {count}')
+    lines.append(f"{name}_sum{{{label_text}}} {_format_number(total)}")
+    lines.append(f"{name}_count{{{label_text}}} {count}")
+
+
+__all__ = ["SonolusMetrics", "DEFAULT_LATENCY_BUCKETS", "DEFAULT_SIZE_BUCKETS"]
@@ -1,5 +1,5 @@
 import json
-from typing import TYPE_CHECKING, Tuple, List
+from typing import TYPE_CHECKING, Dict, Tuple, List
 from sonolus_models import BackgroundItem
 from sonolus_models import EffectItem
 from sonolus_models import ParticleItem
@@ -83,22 +83,33 @@ def pack_2_ItemModel(pack: PackModel) -> Tuple[List[BackgroundItem], List[Effect
     return background_items, effect_items, particle_items, skin_items
 
 
-def set_pack_memory(db_path: str, sonolus: "Sonolus") -> None:
+def read_pack_items(db_path: str) -> Dict[str, list]:
     """
-    パックのjsonデータをメモリにセットします。
+    パックの db.json を読み込み、ストア名（background など）-> アイテムのリストを返します。
     """
     with open(db_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
 
     pack = PackModel.parse_obj(data)
     background_items, effect_items, particle_items, skin_items = pack_2_ItemModel(pack)
+    return {
+        "background": background_items,
+        "effect": effect_items,
+        "particle": particle_items,
+        "skin": skin_items,
+    }
 
-    for item in background_items:
-        sonolus.items.background.add(item)
-    for item in effect_items:
-        sonolus.items.effect.add(item)
-    for item in particle_items:
-        sonolus.items.particle.add(item)
-    for item in skin_items:
-        sonolus.items.skin.add(item)
-    
\ No newline at end of file
+
+def set_pack_memory(db_path: str, sonolus: "Sonolus") -> None:
+    """
+    パックのjsonデータをメモリにセットします。
+    """
+    # ストアごとに1回の書き込みでまとめて追加する（add_many のない独自のストアは1件ずつ追加する）
+    for name, items in read_pack_items(db_path).items():
+        store = getattr(sonolus.items, name)
+        add_many = getattr(store, "add_many", None)
+        if add_many is not None:
+            add_many(items)
+        else:
+            for item in items:
+                store.add(item)
@@ -0,0 +1,181 @@
+"""
+開発モード用のリクエストプロファイラー
+
+`GET /sonolus/_debug/profile?requests=N` を呼ぶと、その後に届いた N 件の Sonolus リクエストを
+プロファイルし、集計したレポートを返します。
+
+- `format=pstats`: cProfile の結果を pstats のテキストで返します。
+  プロファイル中のリクエストが1件以上処理されている間、イベントループのスレッドを計測します。
+- `format=collapsed`: 別スレッドで `sys._current_frames()` を一定間隔でサンプリングし、
+  flamegraph.pl / speedscope 用の collapsed stacks を返します（スレッドプールで動く同期処理も含む）。
+"""
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from typing import Literal, Optional
+
+ProfileFormat = Literal["pstats", "collapsed"]
+
+# 待機中のスレッドとみなすスタック末尾のモジュール
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "base_events.py")
+
+
+class ProfilerBusyError(RuntimeError):
+    """プロファイルが既に実行中"""
+
+
+class _Sampler:
+    """`sys._current_frames()` を定期的に読み、スタックごとの出現回数を数える"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.sampling = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sonolus-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.sampling.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stopped.is_set():
+            self.sampling.wait()
+            if self._stopped.is_set():
+                break
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or frame.f_code.co_filename.endswith(_IDLE_FILES):
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+            self._stopped.wait(self.interval)
+
+    def report(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileSession:
+    """N 件のリクエストを対象にした1回分のプロファイル"""
+
+    def __init__(self, requests: int, format: ProfileFormat = "pstats", interval: float = 0.001):
+        self.requests = requests
+        self.format = format
+        self.claimed = 0
+        self.completed = 0
+        self.active = 0
+        self.finished = asyncio.Event()
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_Sampler] = None
+        if format == "collapsed":
+            self._sampler = _Sampler(interval)
+            self._sampler.start()
+        else:
+            self._profile = cProfile.Profile()
+
+    def claim(self) -> bool:
+        if self.claimed >= self.requests:
+            return False
+        self.claimed += 1
+        if self.active == 0:
+            self._resume()
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self.completed += 1
+        if self.active == 0:
+            self._pause()
+        if self.completed >= self.requests:
+            self.finished.set()
+
+    def _resume(self) -> None:
+        if self._profile is not None:
+            self._profile.enable()
+        else:
+            self._sampler.sampling.set()
+
+    def _pause(self) -> None:
+        if self._profile is not None:
+            self._profile.disable()
+        else:
+            self._sampler.sampling.clear()
+
+    def close(self) -> None:
+        if self.active:
+            self._pause()
+        if self._sampler is not None:
+            self._sampler.stop()
+
+    def report(self, sort: str = "cumulative", limit: int = 80) -> str:
+        header = f"# profiled {self.completed} of {self.requests} requests\n"
+        if self._sampler is not None:
+            return header + f"# {self._sampler.samples} samples\n" + self._sampler.report()
+        if self.completed == 0:
+            return header
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats(sort).print_stats(limit)
+        return header + stream.getvalue()
+
+
+class RequestProfiler:
+    """
+    Sonolus ルートのリクエストをプロファイルする（同時に実行できるのは1回のみ）
+
+    使用例:
+        sonolus = Sonolus(dev=True)
+        # GET /sonolus/_debug/profile?requests=200&format=collapsed
+    """
+
+    def __init__(self) -> None:
+        self.session: Optional[ProfileSession] = None
+
+    def begin(self) -> Optional[ProfileSession]:
+        """プロファイル中であればリクエストを対象に加え、そのセッションを返す"""
+        session = self.session
+        if session is None or not session.claim():
+            return None
+        return session
+
+    async def profile(
+        self,
+        requests: int,
+        format: ProfileFormat = "pstats",
+        timeout: float = 60.0,
+        sort: str = "cumulative",
+        limit: int = 80,
+    ) -> str:
+        """次の `requests` 件（または `timeout` 秒まで）をプロファイルしてレポートを返す"""
+        if self.session is not None:
+            raise ProfilerBusyError("a profile is already running")
+        session = self.session = ProfileSession(requests, format)
+        try:
+            await asyncio.wait_for(session.finished.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.session = None
+            session.close()
+        return session.report(sort=sort, limit=limit)
+
+
+__all__ = ["ProfileSession", "ProfilerBusyError", "RequestProfiler"]
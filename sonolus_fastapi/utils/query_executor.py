@@ -1,10 +1,19 @@
-from typing import Any, TypeVar
+from typing import TYPE_CHECKING, Any, TypeVar
 from .query import Query
+from sonolus_fastapi.backend.result import ListResult
+from sonolus_fastapi.search.text_index import DEFAULT_FIELDS, normalize_text, split_keywords
+
+if TYPE_CHECKING:
+    from sonolus_fastapi.search.text_index import TextIndex
 
 T = TypeVar('T')
 
 def apply_query(items: list[Any], query: Query) -> list[Any]:
     """Apply query filters to items list.
+
+    Keywords are matched against title, subtitle, author and description
+    (NFKC-normalized, case-insensitive); every keyword must appear in one of them.
+    This scans every item; with a TextIndex use `search_items` instead.
     
     Args:
         items: List of items to filter
@@ -13,12 +22,46 @@ def apply_query(items: list[Any], query: Query) -> list[Any]:
     Returns:
         Filtered list of items
     """
-    if hasattr(query, "keywords") and query.keywords:
-        items = [
-            i for i in items
-            if query.keywords.lower() in i.title.lower()
-        ]
-    return items
+    keywords = getattr(query, "keywords", None)
+    if not keywords:
+        return items
+
+    terms = split_keywords(keywords)
+    return [item for item in items if _matches(item, terms)]
+
+
+def search_items(store: Any, query: Query, index: "TextIndex", limit: int = 20, offset: int = 0) -> ListResult[Any]:
+    """Search a store through its TextIndex and fetch only the requested page.
+
+    Matches are returned in ranked order (see `TextIndex.search`). Only the names on
+    the page are read from the store, so the cost does not grow with the store size.
+    Without keywords this is `store.list(limit, offset)`.
+
+    Args:
+        store: Item store the index was built from (see `build_text_index`)
+        query: Query object containing filter parameters
+        index: TextIndex of the store
+        limit: Number of items per page (at most 20, as in `store.list`)
+        offset: Number of matches to skip
+    """
+    if limit > 20:
+        limit = 20  # 最大20件に制限
+    keywords = getattr(query, "keywords", None)
+    if not keywords:
+        return store.list(limit=limit, offset=offset)
+
+    names, total_count = index.search(keywords, limit=limit, offset=offset)
+    return ListResult(
+        items=store.get_many(names),
+        total_count=total_count,
+        limit=limit,
+        offset=offset
+    )
+
+
+def _matches(item: Any, terms: list[str]) -> bool:
+    texts = [normalize_text(getattr(item, field, None)) for field in DEFAULT_FIELDS]
+    return all(any(term in text for text in texts) for term in terms)
 
 def paginate(items: list[T], page: int = 1, page_size: int = 20) -> list[T]:
     """Paginate a list of items.
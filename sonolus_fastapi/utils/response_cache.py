@@ -0,0 +1,195 @@
+"""
+シリアライズ済みレスポンスのキャッシュ
+
+info / list / detail ハンドラーのレスポンスを JSON バイト列のまま保持し、
+ハンドラー実行中に読み込まれたアイテムストアへ書き込みがあった時点で破棄します。
+"""
+from __future__ import annotations
+
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Union
+
+from sonolus_fastapi.backend.events import Dependency, StoreEvents
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    ハンドラーごとのキャッシュ設定
+
+    Args:
+        ttl: キャッシュの有効期限（秒）。None の場合はストアへの書き込みまで保持する
+        anonymous_only: True の場合、Sonolus-Session ヘッダー付きのリクエストはキャッシュしない
+    """
+    ttl: Optional[float] = None
+    anonymous_only: bool = True
+
+
+def resolve_cache_policy(cache: Union[bool, CachePolicy, None]) -> Optional[CachePolicy]:
+    """スロットの `cache=` 引数を CachePolicy に変換する"""
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return CachePolicy()
+    if isinstance(cache, CachePolicy):
+        return cache
+    raise TypeError(f"cache must be bool or CachePolicy, got {type(cache).__name__}")
+
+
+class CachedResponse:
+    __slots__ = ("body", "dependencies", "expires_at", "etag")
+
+    def __init__(
+        self,
+        body: bytes,
+        dependencies: frozenset,
+        expires_at: Optional[float],
+        etag: Optional[str] = None,
+    ):
+        self.body = body
+        self.dependencies = dependencies
+        self.expires_at = expires_at
+        self.etag = etag
+
+
+class ResponseCache:
+    """
+    バイト数で上限を設けた LRU キャッシュ
+
+    エントリはハンドラー実行中に読み込まれた (ストア, アイテム名) に紐づけられ、
+    そのアイテム（またはストア全体）への書き込みで破棄されます。
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._index: Dict[Dependency, Set[Hashable]] = {}
+        self._subscribed: "weakref.WeakSet[StoreEvents]" = weakref.WeakSet()
+        self._generation = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def generation(self) -> int:
+        """無効化が発生するたびに増えるカウンター"""
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(
+        self,
+        key: Hashable,
+        body: bytes,
+        dependencies: Iterable[Dependency],
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+        etag: Optional[str] = None,
+    ) -> bool:
+        """
+        レスポンスを保存する
+
+        `generation` を渡した場合、その後に無効化が発生していれば保存しない
+        （ハンドラー実行中の書き込みで古い内容が残るのを防ぐ）
+        """
+        if len(body) > self.max_bytes:
+            return False
+
+        dependencies = frozenset(dependencies)
+        for events, _ in dependencies:
+            self._subscribe(events)
+
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CachedResponse(body, dependencies, expires_at, etag)
+            self.size += len(body)
+            for dependency in dependencies:
+                self._index.setdefault(dependency, set()).add(key)
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, events: StoreEvents, name: Optional[str] = None) -> None:
+        """ストアへの書き込み時に呼ばれ、依存するエントリを破棄する"""
+        with self._lock:
+            self._generation += 1
+            keys: Set[Hashable] = set()
+            keys.update(self._index.get((events, None), ()))
+            if name is not None:
+                keys.update(self._index.get((events, name), ()))
+            else:
+                for (dep_events, _), dep_keys in self._index.items():
+                    if dep_events is events:
+                        keys.update(dep_keys)
+            for key in keys:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._index.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _subscribe(self, events: StoreEvents) -> None:
+        # ストアの差し替え（ItemStores.override）にも対応できるよう、
+        # 依存として初めて現れた時点で購読する
+        if events in self._subscribed:
+            return
+        with self._lock:
+            if events in self._subscribed:
+                return
+            self._subscribed.add(events)
+        events.subscribe(self.invalidate)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= len(entry.body)
+        for dependency in entry.dependencies:
+            keys = self._index.get(dependency)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[dependency]
+
+
+__all__ = ["CachePolicy", "CachedResponse", "ResponseCache", "resolve_cache_policy"]
@@ -0,0 +1,209 @@
+"""
+レスポンスモデルごとにコンパイルされるシリアライザー
+
+`response_model.model_validate` → `model_dump(mode="json")` の後、
+モデルツリーとダンプ結果を一度だけ並行に走査して、
+`source` の上書き・リスト内 `None` の除去・TaggableItem のアンラップを同時に行います。
+"""
+from __future__ import annotations
+
+import enum
+import types
+from threading import RLock
+from typing import Annotated, Any, Literal, TypeVar, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+from .taggable_item import TaggableItem
+
+_LEAF_TYPES = (str, bytes, int, float, bool, type(None))
+
+
+class _ModelPlan:
+    """モデルクラスごとの走査計画"""
+
+    __slots__ = ("source_key", "fields", "needs_visit")
+
+    def __init__(self) -> None:
+        # `source` フィールドのダンプ時のキー（存在しない場合は None）
+        self.source_key: str | None = None
+        # 走査が必要なフィールドの (属性名, ダンプ時のキー)
+        self.fields: tuple[tuple[str, str], ...] = ()
+        # 再帰的なモデルのコンパイル中は保守的に True としておく
+        self.needs_visit: bool = True
+
+
+_PLANS: dict[type, _ModelPlan] = {}
+_PLANS_LOCK = RLock()
+# コンパイル途中の計画（再帰的なモデル参照用）
+_COMPILING: dict[type, _ModelPlan] = {}
+
+
+def _dump_key(name: str, field: Any) -> str:
+    return field.serialization_alias or field.alias or name
+
+
+def _annotation_needs_visit(annotation: Any) -> bool:
+    """アノテーションの値がダンプ後に走査を必要とするかを判定する"""
+    if annotation is None or annotation is type(None):
+        return False
+    if annotation is Any or annotation is object or isinstance(annotation, TypeVar):
+        return True
+
+    origin = get_origin(annotation)
+    if origin is None:
+        if isinstance(annotation, type):
+            if issubclass(annotation, BaseModel):
+                return _plan_for(annotation).needs_visit
+            if issubclass(annotation, (enum.Enum, *_LEAF_TYPES)):
+                return False
+        # 不明な型は保守的に走査する
+        return True
+
+    if origin is Literal:
+        return False
+    if origin is Annotated:
+        return _annotation_needs_visit(get_args(annotation)[0])
+    if origin is Union or origin is types.UnionType:
+        return any(_annotation_needs_visit(arg) for arg in get_args(annotation))
+    # list / tuple / set / dict などのコンテナはリスト内 None の除去が必要
+    return True
+
+
+def _plan_for(model_cls: type[BaseModel]) -> _ModelPlan:
+    plan = _PLANS.get(model_cls)
+    if plan is not None:
+        return plan
+
+    with _PLANS_LOCK:
+        plan = _PLANS.get(model_cls) or _COMPILING.get(model_cls)
+        if plan is not None:
+            return plan
+
+        plan = _ModelPlan()
+        _COMPILING[model_cls] = plan
+        try:
+            fields = []
+            for name, field in model_cls.model_fields.items():
+                key = _dump_key(name, field)
+                if name == "source" or key == "source":
+                    plan.source_key = key
+                    continue
+                if _annotation_needs_visit(field.annotation):
+                    fields.append((name, key))
+            for name, field in model_cls.model_computed_fields.items():
+                if _annotation_needs_visit(field.return_type):
+                    fields.append((name, field.alias or name))
+
+            plan.fields = tuple(fields)
+            plan.needs_visit = (
+                plan.source_key is not None
+                or bool(plan.fields)
+                or model_cls.model_config.get("extra") == "allow"
+            )
+        finally:
+            del _COMPILING[model_cls]
+        _PLANS[model_cls] = plan
+        return plan
+
+
+def _visit_plain(data: Any, source: str | None) -> Any:
+    """対応するモデルが分からないダンプ結果を走査する（従来の処理と同じ）"""
+    if isinstance(data, dict):
+        result = {key: _visit_plain(item, source) for key, item in data.items()}
+        if source is not None and "source" in result:
+            result["source"] = source
+        return result
+    if isinstance(data, list):
+        return [_visit_plain(item, source) for item in data if item is not None]
+    return data
+
+
+def _visit(value: Any, data: Any, source: str | None) -> Any:
+    """モデルの値とそのダンプ結果を並行に走査する"""
+    if isinstance(value, TaggableItem):
+        value = object.__getattribute__(value, "_item")
+
+    if isinstance(value, BaseModel):
+        plan = _plan_for(type(value))
+        if not plan.needs_visit or not isinstance(data, dict):
+            return data
+        if plan.source_key is not None and source is not None:
+            data[plan.source_key] = source
+        for name, key in plan.fields:
+            item = data.get(key)
+            if item is None or isinstance(item, _LEAF_TYPES):
+                continue
+            data[key] = _visit(getattr(value, name), item, source)
+        extra = value.__pydantic_extra__
+        if extra:
+            for key in extra:
+                if key in data:
+                    data[key] = _visit_plain(data[key], source)
+        return data
+
+    if isinstance(data, list):
+        if isinstance(value, (list, tuple)) and len(value) == len(data):
+            return [
+                _visit(item_value, item, source)
+                for item_value, item in zip(value, data)
+                if item is not None
+            ]
+        return _visit_plain(data, source)
+
+    if isinstance(data, dict):
+        if isinstance(value, dict) and len(value) == len(data):
+            for item_value, (key, item) in zip(value.values(), data.items()):
+                if item is not None and not isinstance(item, _LEAF_TYPES):
+                    data[key] = _visit(item_value, item, source)
+            if source is not None and "source" in data:
+                data["source"] = source
+            return data
+        return _visit_plain(data, source)
+
+    return data
+
+
+class ResponseSerializer:
+    """
+    レスポンスモデル1つに対してコンパイルされたシリアライザー。
+
+    使用例:
+        serializer = get_response_serializer(ServerItemList)
+        body = serializer(result, source="https://example.com")
+    """
+
+    __slots__ = ("response_model", "_plan")
+
+    def __init__(self, response_model: type[BaseModel]):
+        self.response_model = response_model
+        self._plan = _plan_for(response_model)
+
+    def validate(self, result: Any) -> BaseModel:
+        """ハンドラーの戻り値をレスポンスモデルで検証する"""
+        if isinstance(result, TaggableItem):
+            result = object.__getattribute__(result, "_item")
+        return self.response_model.model_validate(result)
+
+    def dump(self, validated: BaseModel, source: str | None) -> dict[str, Any]:
+        """検証済みモデルを JSON 互換の dict に変換する"""
+        data = validated.model_dump(exclude_none=True, mode="json", by_alias=True)
+        return _visit(validated, data, source)
+
+    def __call__(self, result: Any, source: str | None) -> dict[str, Any]:
+        return self.dump(self.validate(result), source)
+
+
+_SERIALIZERS: dict[type, ResponseSerializer] = {}
+
+
+def get_response_serializer(response_model: type[BaseModel]) -> ResponseSerializer:
+    """`response_model` ごとにキャッシュされたシリアライザーを返す"""
+    serializer = _SERIALIZERS.get(response_model)
+    if serializer is None:
+        serializer = ResponseSerializer(response_model)
+        _SERIALIZERS[response_model] = serializer
+    return serializer
+
+
+__all__ = ["ResponseSerializer", "get_response_serializer"]
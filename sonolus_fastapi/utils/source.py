@@ -1,17 +1,111 @@
 from __future__ import annotations
 
-from typing import Any
+import enum
+import json
+import re
+import secrets
+from functools import lru_cache
+from typing import Any, Literal, TypeVar, get_args, get_origin
 
 from pydantic import BaseModel
 
+# シリアライズ済みのバイト列に埋め込み、送信時にアドレスへ置き換えるためのプレースホルダー
+SOURCE_PLACEHOLDER = f"__sonolus_source_{secrets.token_hex(8)}__"
+_SOURCE_PLACEHOLDER_JSON = json.dumps(SOURCE_PLACEHOLDER).encode("utf-8")
+# null 以外の値を持つ `source` キー（pydantic-core の出力には空白が入らない）
+_SOURCE_KEY = re.compile(r'"source":(?!null)')
+_SOURCE_KEY_BYTES = re.compile(rb'"source":(?!null)')
+
 
 def strip_source_fields(value: Any) -> Any:
-    """`source` フィールドを再帰的に除去したコピーを返す。"""
+    """`source` フィールドを再帰的に除去したコピーを返す。
+
+    モデルに `source` が設定されていない場合は、コピーせずにそのまま返す。
+    """
     if isinstance(value, BaseModel):
+        if not has_source_fields(value):
+            return value
         return value.__class__.model_validate(_strip_source_fields_from_python(value.model_dump(mode="python")))
     return _strip_source_fields_from_python(value)
 
 
+def has_source_fields(value: Any) -> bool:
+    """`source` が設定されているフィールド（dict の場合は `source` キー）があるかを返す。"""
+    if isinstance(value, BaseModel):
+        has_source, children = _source_plan(type(value))
+        if has_source and getattr(value, "source", None) is not None:
+            return True
+        for name in children:
+            child = getattr(value, name, None)
+            if child is not None and has_source_fields(child):
+                return True
+        extra = value.__pydantic_extra__
+        return bool(extra) and ("source" in extra or any(has_source_fields(item) for item in extra.values()))
+    if isinstance(value, (list, tuple)):
+        return any(has_source_fields(item) for item in value)
+    if isinstance(value, dict):
+        return "source" in value or any(has_source_fields(item) for item in value.values())
+    return False
+
+
+def dump_without_source(value: BaseModel, mode: str = "python") -> dict[str, Any]:
+    """`source` を除いた `model_dump` の結果を返す（モデルの再検証はしない）。"""
+    data = value.model_dump(mode=mode)
+    if has_source_fields(value):
+        data = _strip_source_fields_from_python(data)
+    return data
+
+
+def json_has_source(raw: str | bytes) -> bool:
+    """シリアライズ済みの JSON に null 以外の `source` キーがあるかを返す。
+
+    文字列の中の `"` は `\\"` にエスケープされるので、キーとしての `"source":` だけに一致する。
+    モデルを Python でたどる `has_source_fields` より速い。
+    """
+    if isinstance(raw, bytes):
+        return _SOURCE_KEY_BYTES.search(raw) is not None
+    return _SOURCE_KEY.search(raw) is not None
+
+
+def dump_json_without_source(value: BaseModel) -> str:
+    """`source` を除いた JSON 文字列を返す（`source` がなければ pydantic-core の出力をそのまま使う）。"""
+    raw = value.model_dump_json()
+    if not json_has_source(raw):
+        return raw
+    return json.dumps(_strip_source_fields_from_python(value.model_dump(mode="json")), ensure_ascii=False)
+
+
+@lru_cache(maxsize=None)
+def _source_plan(model_cls: type[BaseModel]) -> tuple[bool, tuple[str, ...]]:
+    """モデルクラスごとの (`source` フィールドを持つか, モデルや dict を含みうるフィールド)"""
+    children = tuple(
+        name
+        for name, field in model_cls.model_fields.items()
+        if name != "source" and _may_contain_source(field.annotation)
+    )
+    return "source" in model_cls.model_fields, children
+
+
+def _may_contain_source(annotation: Any) -> bool:
+    if annotation is None or annotation is type(None):
+        return False
+    if annotation is Any or annotation is object or isinstance(annotation, TypeVar):
+        return True
+    origin = get_origin(annotation)
+    if origin is None:
+        if isinstance(annotation, type):
+            if issubclass(annotation, BaseModel):
+                return True
+            return issubclass(annotation, dict)
+        # 前方参照など判定できない型は保守的に扱う
+        return not isinstance(annotation, enum.Enum)
+    if origin is Literal:
+        return False
+    if isinstance(origin, type) and issubclass(origin, dict):
+        return True
+    return any(_may_contain_source(arg) for arg in get_args(annotation) if arg is not Ellipsis)
+
+
 
 def override_source_fields(value: Any, source: str | None) -> Any:
     """`source` フィールドを再帰的に上書きしたコピーを返す。"""
@@ -24,6 +118,17 @@ def override_source_fields(value: Any, source: str | None) -> Any:
 
 
 
+def render_source_template(body: bytes, source: str) -> bytes:
+    """JSON バイト列内の `source` プレースホルダーを `source` に置き換える。"""
+    return body.replace(_SOURCE_PLACEHOLDER_JSON, _encode_source(source))
+
+
+@lru_cache(maxsize=64)
+def _encode_source(source: str) -> bytes:
+    return json.dumps(source, ensure_ascii=False).encode("utf-8")
+
+
+
 def _strip_source_fields_from_python(value: Any) -> Any:
     if isinstance(value, dict):
         return {
@@ -5,6 +5,7 @@ from typing import TypeVar, Generic, List, Any, Union, Optional, get_args, get_o
 from pydantic import BaseModel
 from pydantic_core import core_schema, ValidationError
 import sys
+from operator import attrgetter
 
 T = TypeVar("T", bound=BaseModel)
 
@@ -19,8 +20,14 @@ class TaggableItem(Generic[T]):
         new_item = item.with_tags(["tag1", "tag2"])
         # または既存タグに追加
         new_item = item.add_tags(["tag3"])
+
+    ラッパーは `_item` だけを持つスロットのオブジェクトです。ストアからは
+    `wrap_taggable_item` で作成され、モデルのフィールドをプロパティとして持つ
+    サブクラスになります（`__getattr__` を経由しない分だけ属性アクセスが速い）。
     """
 
+    __slots__ = ("_item",)
+
     def __init__(self, item: T):
         """
         アイテムをラップします。
@@ -28,51 +35,7 @@ class TaggableItem(Generic[T]):
         Args:
             item: Pydanticモデルのアイテム
         """
-        object.__setattr__(self, "_item", item)
-
-    def __getattr__(self, name: str) -> Any:
-        """
-        属性アクセスを内部アイテムに委譲します。
-        これにより、TaggableItem を透過的にアクセス可能にします。
-        
-        Args:
-            name: 属性名
-            
-        Returns:
-            内部アイテムの属性値
-            
-        Raises:
-            AttributeError: 属性が見つからない場合
-        """
-        if name in ("_item", "with_tags", "add_tags", "remove_tags", "clear_tags"):
-            return object.__getattribute__(self, name)
-        
-        item = object.__getattribute__(self, "_item")
-        return getattr(item, name)
-
-    def __setattr__(self, name: str, value: Any) -> None:
-        """
-        属性設定を内部アイテムに委譲します。
-        
-        Args:
-            name: 属性名
-            value: 設定する値
-        """
-        if name == "_item":
-            object.__setattr__(self, name, value)
-        else:
-            item = object.__getattribute__(self, "_item")
-            setattr(item, name, value)
-
-    def __repr__(self) -> str:
-        """文字列表現を返す"""
-        item = object.__getattribute__(self, "_item")
-        return f"TaggableItem({item!r})"
-
-    def __str__(self) -> str:
-        """文字列表現を返す"""
-        item = object.__getattribute__(self, "_item")
-        return str(item)
+        _set_item(self, item)
 
     def with_tags(self, tag_titles: List[str]) -> T:
         """
@@ -158,17 +121,21 @@ class TaggableItem(Generic[T]):
 
     # ラッパーの透過性を確保するためのメソッド
     def __getattr__(self, name: str) -> Any:
-        """ラップされたアイテムの属性にアクセスします。"""
-        item = object.__getattribute__(self, "_item")
-        return getattr(item, name)
+        """
+        ラップされたアイテムの属性にアクセスします。
+        （通常の属性検索で見つからなかった場合だけ呼ばれる）
+        """
+        if name == "_item":
+            # スロットが未設定の場合
+            raise AttributeError(name)
+        return getattr(_get_item(self), name)
 
     def __setattr__(self, name: str, value: Any) -> None:
         """ラップされたアイテムの属性を設定します。"""
         if name == "_item":
-            object.__setattr__(self, name, value)
+            _set_item(self, value)
         else:
-            item = object.__getattribute__(self, "_item")
-            setattr(item, name, value)
+            setattr(_get_item(self), name, value)
 
     def __repr__(self) -> str:
         item = object.__getattribute__(self, "_item")
@@ -334,6 +301,49 @@ class TaggableItem(Generic[T]):
         return value
 
 
+_get_item = TaggableItem._item.__get__  # type: ignore[attr-defined]
+_set_item = TaggableItem._item.__set__  # type: ignore[attr-defined]
+_new_wrapper = object.__new__
+# モデルクラス -> フィールドのプロパティを持つ TaggableItem のサブクラス
+_WRAPPER_CLASSES: dict = {}
+
+
+def _field_property(name: str) -> property:
+    def setter(self: TaggableItem, value: Any) -> None:
+        setattr(_get_item(self), name, value)
+
+    # attrgetter は C で実装されているので、`__getattr__` よりかなり速い
+    return property(attrgetter(f"_item.{name}"), setter)
+
+
+def _wrapper_class(item_cls: type) -> type:
+    wrapper_cls = _WRAPPER_CLASSES.get(item_cls)
+    if wrapper_cls is None:
+        namespace: dict = {"__slots__": (), "__module__": __name__}
+        for name in getattr(item_cls, "model_fields", ()):
+            if not hasattr(TaggableItem, name):
+                namespace[name] = _field_property(name)
+        wrapper_cls = _WRAPPER_CLASSES.setdefault(
+            item_cls, type(f"TaggableItem[{item_cls.__name__}]", (TaggableItem,), namespace)
+        )
+    return wrapper_cls
+
+
+def wrap_taggable_item(item: T) -> TaggableItem[T]:
+    """
+    アイテムを TaggableItem でラップします（ストアの読み取り用の高速な経路）。
+
+    Args:
+        item: Pydanticモデルのアイテム
+
+    Returns:
+        ラップされたアイテム
+    """
+    wrapper = _new_wrapper(_wrapper_class(type(item)))
+    _set_item(wrapper, item)
+    return wrapper
+
+
 def unwrap_taggable_item(item: Any) -> Any:
     """
     TaggableItem を自動的にアンラップします。
@@ -2,13 +2,34 @@
 Pydantic integration for transparent TaggableItem handling.
 """
 
-from typing import Any
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
 
 from pydantic import BaseModel
 from pydantic_core import core_schema
 
 from sonolus_fastapi.utils.taggable_item import TaggableItem
 
+# True の間はモデルの pre-validator で TaggableItem を探さない
+_trusted_input: ContextVar[bool] = ContextVar("sonolus_trusted_input", default=False)
+
+
+@contextmanager
+def trusted_input() -> Iterator[None]:
+    """
+    Skip the TaggableItem pre-validation for inputs that cannot contain wrappers.
+
+    The pre-validator walks the whole input at every nested model, which dominates
+    validation time for items like LevelItem. Use this when validating JSON produced
+    by the stores themselves (e.g. ``model_validate_json``).
+    """
+    token = _trusted_input.set(True)
+    try:
+        yield
+    finally:
+        _trusted_input.reset(token)
+
 
 def unwrap_taggable_items(value: Any) -> Any:
     """
@@ -34,7 +55,50 @@ def _taggable_model_core_schema(
     cls: type[BaseModel], source_type: Any, handler: Any
 ) -> core_schema.CoreSchema:
     schema = handler(source_type)
-    return core_schema.no_info_before_validator_function(unwrap_taggable_items, schema)
+    return core_schema.no_info_before_validator_function(_unwrap_untrusted, schema)
+
+
+def _unwrap_untrusted(value: Any) -> Any:
+    if _trusted_input.get():
+        return value
+    return unwrap_taggable_items_shallow(value)
+
+
+def unwrap_taggable_items_shallow(value: Any) -> Any:
+    """
+    Unwrap TaggableItem instances at the top level of a model's input.
+
+    Unwraps the value itself, the values of a dict, and the elements of lists and
+    tuples among them. Deeper wrappers sit inside nested models, whose own
+    pre-validator unwraps them, so walking the whole tree again at every level
+    is unnecessary. Containers without wrappers are returned as is.
+    """
+    if isinstance(value, TaggableItem):
+        return object.__getattribute__(value, "_item")
+    if isinstance(value, dict):
+        changed = None
+        for key, item in value.items():
+            unwrapped = _unwrap_one_level(item)
+            if unwrapped is not item:
+                if changed is None:
+                    changed = dict(value)
+                changed[key] = unwrapped
+        return value if changed is None else changed
+    return _unwrap_one_level(value)
+
+
+def _unwrap_one_level(value: Any) -> Any:
+    if isinstance(value, TaggableItem):
+        return object.__getattribute__(value, "_item")
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            if isinstance(item, TaggableItem):
+                unwrapped = [
+                    object.__getattribute__(item, "_item") if isinstance(item, TaggableItem) else item
+                    for item in value
+                ]
+                return unwrapped if isinstance(value, list) else tuple(unwrapped)
+    return value
 
 
 def install_sonolus_models_taggable_support() -> None:
@@ -76,4 +140,9 @@ def install_sonolus_models_taggable_support() -> None:
             pass
 
 
-__all__ = ["install_sonolus_models_taggable_support", "unwrap_taggable_items"]
+__all__ = [
+    "install_sonolus_models_taggable_support",
+    "trusted_input",
+    "unwrap_taggable_items",
+    "unwrap_taggable_items_shallow",
+]
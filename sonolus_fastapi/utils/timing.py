@@ -0,0 +1,131 @@
+"""
+リクエスト処理のステージごとの計測
+
+`timed("handler")` のようにステージを囲むと、現在のリクエストの StageTimer に
+そのステージの所要時間（内側のステージを除いた時間）が記録されます。
+計測が有効でないリクエストでは何もしません。
+"""
+from __future__ import annotations
+
+import threading
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar, Token
+from time import perf_counter
+from typing import Any, ContextManager, Deque, Dict, List, Optional, Tuple
+
+_current_timer: ContextVar[Optional["StageTimer"]] = ContextVar("sonolus_stage_timer", default=None)
+_NULL_STAGE = nullcontext()
+
+
+class _Stage:
+    __slots__ = ("timer", "name", "start", "child")
+
+    def __init__(self, timer: "StageTimer", name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self) -> "_Stage":
+        self.child = 0.0
+        self.timer._stack.append(self)
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> bool:
+        elapsed = perf_counter() - self.start
+        stack = self.timer._stack
+        stack.pop()
+        if stack:
+            stack[-1].child += elapsed
+        self.timer.add(self.name, elapsed - self.child)
+        return False
+
+
+class StageTimer:
+    """1リクエスト分のステージごとの所要時間"""
+
+    __slots__ = ("stages", "_stack")
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+        self._stack: List[_Stage] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def server_timing(self, total: float) -> str:
+        """Server-Timing ヘッダーの値を作る（ミリ秒）"""
+        parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(parts)
+
+
+def timed(name: str) -> ContextManager[Any]:
+    """現在のリクエストでステージ `name` を計測する"""
+    timer = _current_timer.get()
+    if timer is None:
+        return _NULL_STAGE
+    return _Stage(timer, name)
+
+
+def start_timer() -> Tuple[StageTimer, Token]:
+    timer = StageTimer()
+    return timer, _current_timer.set(timer)
+
+
+def stop_timer(token: Token) -> None:
+    _current_timer.reset(token)
+
+
+class StageTimings:
+    """
+    ステージごとの所要時間の直近 `window` 件を保持するローリング集計
+
+    使用例:
+        sonolus = Sonolus(server_timing=True)
+        sonolus.stage_timings.summary()["list"]["handler"]["p95_ms"]
+    """
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, timer: StageTimer, total: float) -> None:
+        for name, seconds in list(timer.stages.items()) + [("total", total)]:
+            samples = self._samples.get((kind, name))
+            if samples is None:
+                with self._lock:
+                    samples = self._samples.setdefault((kind, name), deque(maxlen=self.window))
+            samples.append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """{kind: {stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}} を返す"""
+        with self._lock:
+            items = list(self._samples.items())
+        result: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for (kind, name), samples in items:
+            values = sorted(samples)
+            if not values:
+                continue
+            result.setdefault(kind, {})[name] = {
+                "count": len(values),
+                "mean_ms": sum(values) / len(values) * 1000,
+                "p50_ms": _percentile(values, 0.50) * 1000,
+                "p95_ms": _percentile(values, 0.95) * 1000,
+                "p99_ms": _percentile(values, 0.99) * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    index = min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))
+    return values[index]
+
+
+__all__ = ["StageTimer", "StageTimings", "start_timer", "stop_timer", "timed"]
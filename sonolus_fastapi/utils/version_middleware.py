@@ -0,0 +1,38 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class SonolusVersionMiddleware:
+    """
+    ルーターのプレフィックス配下のレスポンスに `Sonolus-Version` ヘッダーを付与する ASGI ミドルウェア
+
+    BaseHTTPMiddleware と違い、レスポンスボディのストリームはラップせず、
+    `http.response.start` メッセージのヘッダーだけを書き換えます。
+    """
+
+    def __init__(self, app: ASGIApp, version: str, prefix: str = "/sonolus"):
+        self.app = app
+        self.prefix = prefix
+        self.header = (b"sonolus-version", version.encode("latin-1"))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        header = self.header
+
+        async def send_with_version(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [
+                    (name, value)
+                    for name, value in message.get("headers", ())
+                    if name.lower() != b"sonolus-version"
+                ]
+                headers.append(header)
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_version)
+
+
+__all__ = ["SonolusVersionMiddleware"]
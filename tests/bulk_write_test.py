@@ -0,0 +1,51 @@
+from sonolus_models import PostItem
+
+from sonolus_fastapi.backend.json import JsonItemStore
+
+
+def test_bulk_writes(store, make_post):
+    written = []
+    store.events.subscribe(lambda _events, name: written.append(name))
+
+    store.add_many([make_post(f"post-{index}", tags=["old"]) for index in range(5)])
+    store.update_many([make_post("post-1", title="Updated", tags=["new"])])
+    store.delete_many(["post-3", "post-4"])
+
+    assert written[:5] == [f"post-{index}" for index in range(5)]
+    assert sorted(store.map()) == ["post-0", "post-1", "post-2"]
+    assert store.get("post-1").title == "Updated"
+    assert [item.name for item in store.find_by_tags(all=["old"]).items] == ["post-0", "post-2"]
+    assert [item.name for item in store.find_by_tags(all=["new"]).items] == ["post-1"]
+
+
+def test_json_bulk_add_writes_the_file_once(tmp_path, monkeypatch, make_post):
+    store = JsonItemStore(PostItem, path=str(tmp_path))
+    saves = []
+    original = store._save
+    monkeypatch.setattr(store, "_save", lambda: (saves.append(1), original()))
+
+    store.add_many([make_post(f"post-{index}") for index in range(10)])
+
+    assert len(saves) == 1
+    assert len(JsonItemStore(PostItem, path=str(tmp_path)).map()) == 10
+
+
+def test_pack_falls_back_to_add_for_stores_without_add_many(monkeypatch, make_post):
+    from sonolus_fastapi import Sonolus
+    from sonolus_fastapi.utils import pack
+
+    class AddOnlyStore:
+        def __init__(self):
+            self.names = []
+
+        def add(self, item):
+            self.names.append(item.name)
+
+    sonolus = Sonolus()
+    store = AddOnlyStore()
+    sonolus.items.override(post=store)
+    monkeypatch.setattr(pack, "read_pack_items", lambda _db_path: {"post": [make_post("a"), make_post("b")]})
+
+    pack.set_pack_memory("pack.db", sonolus)
+
+    assert store.names == ["a", "b"]
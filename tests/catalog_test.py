@@ -0,0 +1,117 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sonolus_models import ServerItemList, SkinItem
+
+from sonolus_fastapi import Sonolus
+from sonolus_fastapi.backend.catalog import Catalog, CatalogItemStore, read_fingerprint, write_catalog
+
+
+def text(value: str) -> dict:
+    return {"en": value}
+
+
+def make_skin(name: str, tag: str = "tag") -> dict:
+    return {
+        "name": name,
+        "title": text(name.upper()),
+        "subtitle": text(""),
+        "author": text("Author"),
+        "description": text(""),
+        "tags": [{"title": tag}],
+        "thumbnail": {"hash": f"{name}-thumbnail", "url": f"/{name}/thumbnail"},
+        "data": {"hash": f"{name}-data", "url": f"/{name}/data"},
+        "texture": {"hash": f"{name}-texture", "url": f"/{name}/texture"},
+    }
+
+
+def make_skin_item(name: str, tag: str = "tag") -> SkinItem:
+    pack_item = make_skin(name, tag)
+    return SkinItem.model_validate({
+        **pack_item,
+        "title": name.upper(),
+        "subtitle": "",
+        "author": "Author",
+        "description": "",
+    })
+
+
+def write_pack(directory, skins) -> str:
+    directory.mkdir()
+    (directory / "repository").mkdir()
+    (directory / "db.json").write_text(json.dumps({"info": {"title": text("Pack")}, "skins": skins}))
+    return str(directory)
+
+
+def test_catalog_store_reads_through_hash_index(tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    skins = [make_skin_item(f"skin-{index}", tag="even" if index % 2 == 0 else "odd") for index in range(50)]
+    write_catalog(path, {"skin": skins}, fingerprint="v1")
+
+    catalog = Catalog(path)
+    store = CatalogItemStore(SkinItem, catalog.section("skin"), cache_size=4)
+
+    assert catalog.fingerprint == "v1"
+    assert store.get("skin-7").model_dump() == skins[7].model_dump()
+    assert store.get("missing") is None
+    assert [item.name for item in store.list(limit=3, offset=10).items] == ["skin-10", "skin-11", "skin-12"]
+    assert store.list().total_count == 50
+    assert [item.name for item in store.find_by_tags(all=["odd"], limit=3).items] == ["skin-1", "skin-11", "skin-13"]
+    assert [item.name for item in store.list(limit=2, order_by="-name").items] == ["skin-9", "skin-8"]
+    assert len(store.map()) == 50
+    assert len(store._decoded) == 4
+
+    with pytest.raises(RuntimeError):
+        store.add(skins[0])
+
+
+def test_load_builds_catalog_once_and_reuses_it(tmp_path):
+    first = write_pack(tmp_path / "first", [make_skin("a"), make_skin("b")])
+    second = write_pack(tmp_path / "second", [make_skin("b", tag="override"), make_skin("c")])
+    path = tmp_path / "catalog.bin"
+
+    sonolus = Sonolus(catalog_path=str(path))
+    sonolus.load([first, second])
+
+    assert isinstance(sonolus.items.skin, CatalogItemStore)
+    assert sorted(sonolus.items.skin.map()) == ["a", "b", "c"]
+    assert sonolus.items.skin.get("b").tags[0].title == "override"
+    assert sonolus.items.background.map() == {}
+
+    # 別のワーカーは作成済みのカタログをそのまま使う
+    built = path.stat().st_mtime_ns
+    worker = Sonolus(catalog_path=str(path))
+    worker.load([first, second])
+    assert path.stat().st_mtime_ns == built
+    assert worker.items.skin.get("c").title == "C"
+
+
+def test_catalog_can_be_closed(tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    write_catalog(path, {"skin": [make_skin_item("a")]}, fingerprint="v1")
+
+    with Catalog(path) as catalog:
+        assert catalog.section("skin").get("a") is not None
+    with pytest.raises(ValueError):
+        catalog.section("skin").get("a")
+
+    assert read_fingerprint(path) == "v1"
+    assert read_fingerprint(str(tmp_path / "missing.bin")) is None
+
+
+def test_load_invalidates_responses_of_replaced_stores(tmp_path):
+    pack = write_pack(tmp_path / "pack", [make_skin("a")])
+    sonolus = Sonolus(catalog_path=str(tmp_path / "catalog.bin"))
+
+    @sonolus.skin.list(ServerItemList, cache=True)
+    async def skin_list(ctx, query):
+        result = sonolus.items.skin.list()
+        return ServerItemList(pageCount=1, items=result.items)
+
+    client = TestClient(sonolus.app)
+    assert client.get("/sonolus/skins/list").json()["items"] == []
+
+    sonolus.load(pack)
+
+    assert [item["name"] for item in client.get("/sonolus/skins/list").json()["items"]] == ["a"]
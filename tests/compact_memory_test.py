@@ -0,0 +1,47 @@
+from sonolus_models import PostItem
+
+from sonolus_fastapi.backend import StorageBackend, StoreFactory
+from sonolus_fastapi.backend.memory import MemoryItemStore
+from sonolus_fastapi.utils.metrics import SonolusMetrics
+
+
+def test_compact_store_keeps_bytes_and_decodes_on_access(make_post):
+    store = MemoryItemStore(PostItem, compact=True, cache_size=2)
+    for index in range(5):
+        store.add(make_post(f"post-{index}", time=index, tags=["even" if index % 2 == 0 else "odd"]))
+
+    assert all(isinstance(raw, bytes) for raw in store._data.values())
+    assert store.get("post-1").model_dump() == make_post("post-1", time=1, tags=["odd"]).model_dump()
+    assert [item.name for item in store.list(limit=2, order_by="-time").items] == ["post-4", "post-3"]
+    assert [item.name for item in store.find_by_tags(all=["odd"]).items] == ["post-1", "post-3"]
+    assert len(store._decoded) == 2
+
+    hits = store.cache_hits
+    store.get("post-3")
+    assert store.cache_hits == hits + 1
+
+
+def test_compact_store_invalidates_cache_on_writes(make_post):
+    store = MemoryItemStore(PostItem, compact=True)
+    store.add(make_post("a", time=1))
+    assert store.get("a").time == 1
+
+    store.update(make_post("a", time=2))
+    assert store.get("a").time == 2
+    assert [item.name for item in store.list(order_by="time").items] == ["a"]
+
+    store.delete("a")
+    assert store.get("a") is None
+    assert store.list(order_by="time").total_count == 0
+
+
+def test_factory_enables_compact_per_store_and_reports_cache(make_post):
+    metrics = SonolusMetrics()
+    factory = StoreFactory(StorageBackend.MEMORY, metrics=metrics, compact=["post"])
+    store = factory.create(PostItem)
+    store.add(make_post("a"))
+    store.get("a")
+    store.get("a")
+
+    assert store.wrapped.compact
+    assert metrics.cache_snapshot()[("post", "memory")] == (1, 1)
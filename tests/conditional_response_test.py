@@ -0,0 +1,49 @@
+from fastapi.testclient import TestClient
+from sonolus_models import SonolusServerInfo
+
+from sonolus_fastapi import Sonolus
+from sonolus_fastapi.utils.etag import etag_matches
+
+
+def create_client(**kwargs):
+    sonolus = Sonolus(address="https://example.com", **kwargs)
+
+    @sonolus.server.server_info(SonolusServerInfo)
+    async def server_info(ctx):
+        return SonolusServerInfo(title="Server", buttons=[], configuration={"options": []})
+
+    return TestClient(sonolus.app)
+
+
+def test_server_info_returns_304_for_matching_etag():
+    client = create_client(cache_control={"server_info": "public, max-age=60"})
+
+    first = client.get("/sonolus/info")
+    etag = first.headers["ETag"]
+
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "public, max-age=60"
+
+    second = client.get("/sonolus/info", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+
+    third = client.get("/sonolus/info", headers={"If-None-Match": '"other"'})
+    assert third.status_code == 200
+    assert third.json() == first.json()
+
+
+def test_etag_can_be_disabled():
+    client = create_client(etag=False)
+
+    response = client.get("/sonolus/info")
+
+    assert "ETag" not in response.headers
+    assert "Cache-Control" not in response.headers
+
+
+def test_etag_matches_lists_and_weak_tags():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
@@ -0,0 +1,45 @@
+from typing import Iterable, Optional
+
+import pytest
+from sonolus_models import PostItem, Tag
+
+from sonolus_fastapi.backend.database import DatabaseItemStore
+from sonolus_fastapi.backend.json import JsonItemStore
+from sonolus_fastapi.backend.memory import MemoryItemStore
+
+
+@pytest.fixture
+def make_post():
+    """テスト用の PostItem を作るファクトリ。title を省略した場合は name を使う。"""
+
+    def factory(
+        name: str,
+        title: Optional[str] = None,
+        *,
+        time: int = 0,
+        tags: Iterable[str] = (),
+        author: str = "Author",
+        description: str = "",
+        source: Optional[str] = None,
+    ) -> PostItem:
+        return PostItem(
+            name=name,
+            title=name if title is None else title,
+            author=author,
+            description=description,
+            time=time,
+            tags=[Tag(title=tag) for tag in tags],
+            source=source,
+        )
+
+    return factory
+
+
+@pytest.fixture(params=["memory", "json", "database"])
+def store(request, tmp_path):
+    """PostItem のストアをバックエンドごとに作る。"""
+    if request.param == "memory":
+        return MemoryItemStore(PostItem)
+    if request.param == "json":
+        return JsonItemStore(PostItem, path=str(tmp_path))
+    return DatabaseItemStore(PostItem, url=f"sqlite:///{tmp_path / 'db.sqlite'}")
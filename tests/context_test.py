@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+from starlette.requests import Request
+
+from sonolus_fastapi import Sonolus
+from sonolus_fastapi.utils.context import SonolusContext
+
+
+def make_request(query_string: bytes, headers=()) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/sonolus/levels/list",
+        "query_string": query_string,
+        "headers": list(headers),
+    })
+
+
+def test_options_are_parsed_lazily_by_type():
+    sonolus = Sonolus(enable_itemstores=False)
+    sonolus.register_configuration_options([
+        SimpleNamespace(query="fast", type="toggle"),
+        SimpleNamespace(query="speed", type="slider"),
+        SimpleNamespace(query="level", type="slider"),
+        SimpleNamespace(query="name", type="text"),
+    ])
+
+    ctx = sonolus.build_context(
+        make_request(b"fast=1&speed=1.5&level=x&localization=ja", [(b"sonolus-session", b"s")])
+    )
+
+    assert ctx._options_loader is not None
+    assert ctx.options == {"fast": True, "speed": 1.5, "level": "x"}
+    assert ctx._options_loader is None
+    assert ctx.localization == "ja"
+    assert ctx.user_session == "s"
+
+
+def test_context_without_options():
+    sonolus = Sonolus(enable_itemstores=False)
+
+    ctx = sonolus.build_context(make_request(b""), request_body={"a": 1})
+
+    assert ctx.options is None
+    assert ctx.request == {"a": 1}
+    assert SonolusContext[dict](options={"a": 1}).model_dump()["options"] == {"a": 1}
@@ -0,0 +1,36 @@
+from fastapi.testclient import TestClient
+from sonolus_models import ItemType, ServerItemInfo
+
+from sonolus_fastapi import Sonolus
+
+
+async def handler(ctx):
+    return ServerItemInfo(sections=[])
+
+
+def test_filtered_handlers_and_default_fallback():
+    sonolus = Sonolus(enable_itemstores=False)
+    sonolus.level.info(ServerItemInfo)(handler)
+    sonolus.level.info(ServerItemInfo, info_type="quick")(handler)
+    sonolus.skin.info(ServerItemInfo)(handler)
+
+    default = sonolus.get_handler(ItemType.level, "info")
+    quick = sonolus.get_handler(ItemType.level, "info", filter_key="quick")
+
+    assert default is not None and quick is not None and default is not quick
+    # フィルターキー付きの登録がある種類では未知のキーは見つからない
+    assert sonolus.get_handler(ItemType.level, "info", filter_key="other") is None
+    # フィルターキー付きの登録がない種類ではデフォルトにフォールバックする
+    assert sonolus.get_handler(ItemType.skin, "info", filter_key="other") is not None
+    assert sonolus.get_handler(ItemType.skin, "list") is None
+
+
+def test_unregistered_handler_returns_404_body():
+    sonolus = Sonolus(enable_itemstores=False)
+    client = TestClient(sonolus.app)
+
+    for _ in range(2):
+        response = client.get("/sonolus/levels/info")
+        assert response.status_code == 404
+        assert response.json() == {"detail": "info handler not implemented"}
+        assert response.headers["Sonolus-Version"] == sonolus.version
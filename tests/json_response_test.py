@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from sonolus_fastapi.utils.json_response import encode_json, encode_json_fast
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        {"title": "日本語", "items": [1, 2.5, True, None], "nested": {"a": []}},
+        [{"source": "https://example.com"}],
+    ],
+)
+def test_fast_encoder_matches_stdlib(content):
+    assert json.loads(encode_json_fast(content)) == json.loads(encode_json(content))
+    assert encode_json(content) == encode_json_fast(content)
+
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), float("-inf")])
+def test_fast_encoder_rejects_nan_like_stdlib(value):
+    content = {"items": [{"rating": value}]}
+
+    with pytest.raises(ValueError):
+        encode_json(content)
+    with pytest.raises(ValueError):
+        encode_json_fast(content)
+
+
+def test_fast_encoder_keeps_nan_text_in_strings():
+    content = {"title": "NaN", "description": "-Infinity"}
+
+    assert encode_json_fast(content) == encode_json(content)
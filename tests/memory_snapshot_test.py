@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+from sonolus_models import PostItem
+
+from sonolus_fastapi.backend.memory import MemoryItemStore
+
+
+def test_batch_is_published_atomically(make_post):
+    store = MemoryItemStore(PostItem, indexes=["time"])
+    store.add(make_post("a"))
+    written = []
+    store.events.subscribe(lambda _events, name: written.append(name))
+
+    with store.batch() as batch:
+        batch.add(make_post("b", time=2))
+        store.update(make_post("a", time=1))
+        batch.delete("missing")
+        # ブロックを抜けるまで読み取りには反映されない
+        assert store.get("b") is None
+        assert store.list().total_count == 1
+
+    assert [item.name for item in store.list(order_by="-time").items] == ["b", "a"]
+    assert written == ["b", "a", "missing"]
+
+
+def test_failed_batch_is_discarded(make_post):
+    store = MemoryItemStore(PostItem)
+    store.add(make_post("a", tags=["tag"]))
+
+    with pytest.raises(RuntimeError):
+        with store.batch() as batch:
+            batch.delete("a")
+            batch.add(make_post("b", tags=["other"]))
+            raise RuntimeError
+
+    assert store.map().keys() == {"a"}
+    assert [item.name for item in store.find_by_tags(all=["tag"]).items] == ["a"]
+    assert store.find_by_tags(all=["other"]).total_count == 0
+
+
+def test_tag_sets_are_not_shared_between_snapshots(make_post):
+    store = MemoryItemStore(PostItem)
+    store.add(make_post("a", tags=["tag"]))
+    before = store._state
+
+    store.add(make_post("b", tags=["tag"]))
+
+    assert before.tags.find(all=["tag"]) == {"a"}
+    assert store._tags.find(all=["tag"]) == {"a", "b"}
+
+
+def test_single_writes_do_not_change_older_snapshots(make_post):
+    store = MemoryItemStore(PostItem, indexes=["time"])
+    # チャンクの分割と LayeredDict のまとめ直しが起きる件数まで1件ずつ書き込む
+    for index in range(3000):
+        store.add(make_post(f"post-{index:04}", time=index % 7, tags=[f"tag-{index % 3}"]))
+    before = store._state
+    before_page = [item.name for item in store.list(order_by="-time", limit=20, offset=100).items]
+
+    for index in range(0, 3000, 2):
+        store.delete(f"post-{index:04}")
+    store.update(make_post("post-0001", time=100, tags=["tag-2"]))
+
+    assert len(before.data) == 3000
+    assert [entry[2] for entry in before.indexes["time"]._slice(0, 3000)] == sorted(
+        before.data, key=lambda name: (before.data[name].time, name)
+    )
+    assert len(before.tags.find(any=["tag-0"])) == 1000
+    assert [item.name for item in store.list(order_by="-time", limit=1).items] == ["post-0001"]
+    assert store.list().total_count == 1500
+    assert store.find_by_tags(all=["tag-0"]).total_count == 500
+    assert store.find_by_tags(all=["tag-2"]).total_count == 501
+    assert store.find_by_tags(all=["tag-1"], limit=1).items[0].name == "post-0007"
+    assert list(store.map()) == [f"post-{index:04}" for index in range(1, 3000, 2)]
+
+    store._state = before
+    assert [item.name for item in store.list(order_by="-time", limit=20, offset=100).items] == before_page
+
+
+def test_first_ordered_read_does_not_wait_for_an_open_batch(make_post):
+    store = MemoryItemStore(PostItem)
+    store.add(make_post("b", time=2))
+    store.add(make_post("a", time=3))
+    opened = threading.Event()
+    release = threading.Event()
+
+    def writer():
+        with store.batch() as batch:
+            batch.add(make_post("c", time=1))
+            batch.delete("a")
+            opened.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    opened.wait(5)
+    try:
+        result = []
+        reader = threading.Thread(target=lambda: result.append(store.list(order_by="time")))
+        reader.start()
+        reader.join(2)
+        # batch の書き込みロックを待たずにインデックスを作って返す
+        assert not reader.is_alive()
+        assert [item.name for item in result[0].items] == ["b", "a"]
+        assert "time" in store._indexes
+    finally:
+        release.set()
+        thread.join()
+
+    # batch の公開時に、途中で作られたインデックスにも書き込みが反映される
+    assert "time" in store._indexes
+    assert [item.name for item in store.list(order_by="time").items] == ["c", "b"]
+
+
+def test_readers_see_consistent_pages_during_writes(make_post):
+    store = MemoryItemStore(PostItem, indexes=["time"])
+    with store.batch() as batch:
+        for index in range(200):
+            batch.add(make_post(f"post-{index:03}", time=index))
+    stop = threading.Event()
+
+    def writer():
+        generation = 0
+        while not stop.is_set():
+            generation += 1
+            # 削除と追加を同じ batch で行うので、総数は常に 201 件
+            with store.batch() as batch:
+                batch.delete(f"post-{generation % 200:03}")
+                batch.delete(f"extra-{generation - 1}")
+                batch.add(make_post(f"extra-{generation}", time=1000))
+                batch.add(make_post(f"post-{generation % 200:03}", time=generation % 200))
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(300):
+            items = store.map()
+            assert len(items) == 201
+            result = store.list(limit=20, order_by="time")
+            assert result.total_count == 201
+            assert [item.time for item in result.items] == sorted(item.time for item in result.items)
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,83 @@
+from fastapi.testclient import TestClient
+from sonolus_models import PostItem, ServerItemInfo
+
+from sonolus_fastapi import Sonolus
+from sonolus_fastapi.backend.instrumented import instrument_store
+from sonolus_fastapi.utils.metrics import SonolusMetrics
+
+
+def test_metrics_endpoint_reports_handler_histograms():
+    sonolus = Sonolus(enable_itemstores=False, metrics=True)
+
+    @sonolus.level.info(ServerItemInfo)
+    async def level_info(ctx):
+        return ServerItemInfo(sections=[])
+
+    client = TestClient(sonolus.app)
+    assert client.get("/sonolus/levels/info?localization=en").status_code == 200
+    assert client.get("/sonolus/skins/info").status_code == 404
+
+    response = client.get("/sonolus/_metrics")
+    text = response.text
+
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'sonolus_request_duration_seconds_count{kind="info",item_type="levels"} 1' in text
+    assert 'sonolus_request_duration_seconds_bucket{kind="info",item_type="levels",le="+Inf"} 1' in text
+    assert 'sonolus_requests_total{kind="info",item_type="skins",status="404"} 1' in text
+    assert 'sonolus_handler_errors_total{kind="info",item_type="levels"} 0' in text
+
+
+def test_metrics_endpoint_is_optional():
+    client = TestClient(Sonolus(enable_itemstores=False).app)
+
+    assert client.get("/sonolus/_metrics").status_code == 404
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = SonolusMetrics(latency_buckets=(0.1, 1.0), size_buckets=(10,))
+    metrics.observe("list", "levels", 0.05, 200, 5)
+    metrics.observe("list", "levels", 0.5, 500, 50)
+
+    text = metrics.render_prometheus()
+
+    assert 'sonolus_request_duration_seconds_bucket{kind="list",item_type="levels",le="0.1"} 1' in text
+    assert 'sonolus_request_duration_seconds_bucket{kind="list",item_type="levels",le="1.0"} 2' in text
+    assert 'sonolus_response_size_bytes_bucket{kind="list",item_type="levels",le="10"} 1' in text
+    assert 'sonolus_handler_errors_total{kind="list",item_type="levels"} 1' in text
+
+
+def test_store_operations_are_recorded():
+    sonolus = Sonolus(metrics=True)
+    sonolus.items.post.add(PostItem(name="post", title="Post", author="Author", description=""))
+    sonolus.items.post.get("post")
+    sonolus.items.post.list()
+    sonolus.items.post_comments.for_item("post").list()
+
+    text = sonolus.metrics.render_prometheus()
+
+    assert 'sonolus_store_operation_duration_seconds_count{store="post",backend="memory",operation="get"} 1' in text
+    assert 'sonolus_store_rows_read_total{store="post",backend="memory",operation="list"} 1' in text
+    assert 'sonolus_store_operation_duration_seconds_count{store="post_comments",backend="memory",operation="list"} 1' in text
+
+
+def test_store_bytes_and_cache_counters():
+    class CachedStore:
+        bytes_read = 0
+        cache_hits = 0
+        cache_misses = 0
+
+        def get(self, name):
+            self.bytes_read += 10
+            self.cache_hits += 1
+            return {"name": name}
+
+    metrics = SonolusMetrics()
+    store = instrument_store(CachedStore(), metrics, "level", "database")
+    store.get("a")
+    store.get("b")
+
+    text = metrics.render_prometheus()
+
+    assert 'sonolus_store_bytes_read_total{store="level",backend="database",operation="get"} 20' in text
+    assert 'sonolus_store_cache_requests_total{store="level",backend="database",result="hit"} 2' in text
+    assert store.wrapped.bytes_read == 20
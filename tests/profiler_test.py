@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+from sonolus_models import ServerItemInfo
+
+from sonolus_fastapi import Sonolus
+
+
+def _sonolus(**kwargs) -> Sonolus:
+    sonolus = Sonolus(enable_itemstores=False, **kwargs)
+
+    @sonolus.level.info(ServerItemInfo)
+    async def level_info(ctx):
+        return ServerItemInfo(sections=[])
+
+    return sonolus
+
+
+async def _profile(sonolus: Sonolus, query: str) -> httpx.Response:
+    transport = httpx.ASGITransport(app=sonolus.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        profile = asyncio.create_task(client.get(f"/sonolus/_debug/profile?{query}"))
+        while sonolus.profiler.session is None:
+            await asyncio.sleep(0.001)
+        for _ in range(3):
+            assert (await client.get("/sonolus/levels/info")).status_code == 200
+        return await profile
+
+
+def test_profile_reports_pstats():
+    sonolus = _sonolus(dev=True)
+
+    response = asyncio.run(_profile(sonolus, "requests=3"))
+
+    assert response.status_code == 200
+    assert response.text.startswith("# profiled 3 of 3 requests")
+    assert "level_info" in response.text
+    assert sonolus.profiler.session is None
+
+
+def test_profile_reports_collapsed_stacks():
+    sonolus = _sonolus(dev=True)
+
+    response = asyncio.run(_profile(sonolus, "requests=3&format=collapsed"))
+
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "# profiled 3 of 3 requests"
+    for line in lines[2:]:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) >= 1
+
+
+def test_profile_times_out_with_partial_report():
+    response = TestClient(_sonolus(dev=True).app).get("/sonolus/_debug/profile?requests=5&timeout=0.05")
+
+    assert response.text.startswith("# profiled 0 of 5 requests")
+
+
+def test_profile_endpoint_requires_dev():
+    response = TestClient(_sonolus().app).get("/sonolus/_debug/profile")
+
+    assert response.status_code in (404, 422)
@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sonolus_models import ItemType, ServerItemList
+from starlette.requests import Request
+
+from sonolus_fastapi import Sonolus
+
+
+def option(query, type, def_=None):
+    return SimpleNamespace(query=query, name=query, type=type, required=False, def_=def_)
+
+
+def make_request(query_string: bytes) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/sonolus/levels/list",
+        "query_string": query_string,
+        "headers": [],
+    })
+
+
+def create_sonolus():
+    sonolus = Sonolus(enable_itemstores=False)
+    sonolus.search.level = SimpleNamespace(options=[
+        option("keywords", "text", ""),
+        option("genres", "multi"),
+        option("items", "serverItems"),
+        option("random", "toggle", False),
+    ])
+    return sonolus
+
+
+def test_build_query_handles_multi_and_server_items():
+    sonolus = create_sonolus()
+
+    query = sonolus.build_query(
+        ItemType.level,
+        make_request(b"type=quick&page=2&keywords=abc&genres=a&genres=b&items=x,y&random=1"),
+    )
+
+    assert query.keywords == "abc"
+    assert query.genres == "a,b"
+    assert query.items == ["x", "y"]
+    assert query.random is True
+    assert query.page == "2"
+
+
+def test_build_query_returns_independent_models():
+    sonolus = create_sonolus()
+
+    first = sonolus.build_query(ItemType.level, make_request(b"keywords=abc&page=0"))
+    second = sonolus.build_query(ItemType.level, make_request(b"page=0&keywords=abc"))
+    first.keywords = "changed"
+
+    assert second.keywords == "abc"
+    assert sonolus.build_query(ItemType.level, make_request(b"keywords=abc&page=0")).keywords == "abc"
+
+
+def test_build_query_without_form_returns_raw_dict():
+    sonolus = Sonolus(enable_itemstores=False)
+
+    assert sonolus.build_query(ItemType.skin, make_request(b"page=1&page=3")) == {"page": "3"}
+
+
+def test_cached_query_lists_are_not_shared():
+    sonolus = create_sonolus()
+
+    first = sonolus.build_query(ItemType.level, make_request(b"items=x,y"))
+    first.items.append("z")
+
+    assert sonolus.build_query(ItemType.level, make_request(b"items=x,y")).items == ["x", "y"]
+
+
+@pytest.mark.parametrize("query_string", [b"speed=abc", b"random=maybe", b"speed=1&speed=fast"])
+def test_build_query_rejects_invalid_values(query_string):
+    sonolus = Sonolus(enable_itemstores=False)
+    sonolus.search.level = SimpleNamespace(options=[
+        option("speed", "slider", 1.0),
+        option("random", "toggle", False),
+    ])
+
+    with pytest.raises(HTTPException) as error:
+        sonolus.build_query(ItemType.level, make_request(query_string))
+
+    assert error.value.status_code == 400
+
+
+def test_invalid_query_is_a_client_error():
+    sonolus = Sonolus(enable_itemstores=False)
+    sonolus.search.level = SimpleNamespace(options=[option("speed", "slider", 1.0)])
+
+    @sonolus.level.list(ServerItemList)
+    async def level_list(ctx, query):
+        return ServerItemList(pageCount=1, items=[])
+
+    client = TestClient(sonolus.app)
+
+    assert client.get("/sonolus/levels/list?speed=abc").status_code == 400
+    assert client.get("/sonolus/levels/list?speed=1.5").status_code == 200
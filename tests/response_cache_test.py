@@ -0,0 +1,107 @@
+import pytest
+from fastapi.testclient import TestClient
+from sonolus_models import ServerItemDetails, ServerItemList
+
+from sonolus_fastapi import Sonolus
+from sonolus_fastapi.utils.response_cache import ResponseCache
+
+
+@pytest.fixture
+def cached_app(make_post):
+    sonolus = Sonolus(address="https://example.com")
+    calls = {"list": 0, "detail": 0}
+
+    @sonolus.post.list(ServerItemList, cache=True)
+    async def post_list(ctx, query):
+        calls["list"] += 1
+        result = sonolus.items.post.list()
+        return ServerItemList(pageCount=1, items=result.items)
+
+    @sonolus.post.detail(ServerItemDetails, cache=True)
+    async def post_detail(ctx, name):
+        calls["detail"] += 1
+        item = sonolus.items.post.get(name)
+        return ServerItemDetails(item=item, actions=[], hasCommunity=False, leaderboards=[], sections=[])
+
+    sonolus.items.post.add(make_post("a"))
+    sonolus.items.post.add(make_post("b"))
+    return sonolus, TestClient(sonolus.app), calls
+
+
+def test_cached_response_is_reused_until_store_write(cached_app, make_post):
+    sonolus, client, calls = cached_app
+
+    first = client.get("/sonolus/posts/list")
+    second = client.get("/sonolus/posts/list")
+
+    assert first.status_code == 200
+    assert first.content == second.content
+    assert calls["list"] == 1
+
+    sonolus.items.post.update(make_post("a", "Updated"))
+    third = client.get("/sonolus/posts/list")
+
+    assert calls["list"] == 2
+    assert third.json()["items"][0]["title"] == "Updated"
+
+
+def test_detail_cache_is_invalidated_per_item(cached_app, make_post):
+    sonolus, client, calls = cached_app
+
+    client.get("/sonolus/posts/a")
+    client.get("/sonolus/posts/b")
+    assert calls["detail"] == 2
+
+    sonolus.items.post.update(make_post("b", "Updated"))
+    client.get("/sonolus/posts/a")
+    assert calls["detail"] == 2
+
+    assert client.get("/sonolus/posts/b").json()["item"]["title"] == "Updated"
+    assert calls["detail"] == 3
+
+
+def test_cache_key_includes_query_and_skips_sessions(cached_app):
+    _, client, calls = cached_app
+
+    client.get("/sonolus/posts/list?localization=en")
+    client.get("/sonolus/posts/list?localization=ja")
+    client.get("/sonolus/posts/list?localization=en")
+    assert calls["list"] == 2
+
+    client.get("/sonolus/posts/list?localization=en", headers={"Sonolus-Session": "s"})
+    assert calls["list"] == 3
+
+
+def test_response_cache_evicts_by_bytes():
+    cache = ResponseCache(max_bytes=10)
+
+    cache.put("a", b"12345", [])
+    cache.put("b", b"12345", [])
+    cache.get("a")
+    cache.put("c", b"12345", [])
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.size == 10
+
+
+def test_cached_template_is_rendered_per_host(make_post):
+    sonolus = Sonolus()
+    calls = []
+
+    @sonolus.post.detail(ServerItemDetails, cache=True)
+    async def post_detail(ctx, name):
+        calls.append(name)
+        item = sonolus.items.post.get(name)
+        return ServerItemDetails(item=item, actions=[], hasCommunity=False, leaderboards=[], sections=[])
+
+    sonolus.items.post.add(make_post("a"))
+    client = TestClient(sonolus.app)
+
+    first = client.get("/sonolus/posts/a", headers={"host": "one.example"})
+    second = client.get("/sonolus/posts/a", headers={"host": "two.example"})
+
+    assert calls == ["a"]
+    assert first.json()["item"]["source"] == "http://one.example"
+    assert second.json()["item"]["source"] == "http://two.example"
+    assert first.headers["ETag"] != second.headers["ETag"]
@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+
+import pytest
+from sonolus_models import (
+    BackgroundItem,
+    EffectItem,
+    EngineItem,
+    LevelItem,
+    LevelSection,
+    ParticleItem,
+    ServerItemDetails,
+    ServerItemInfo,
+    ServerItemList,
+    SkinItem,
+    Srl,
+    Tag,
+)
+
+from sonolus_fastapi import Sonolus
+from sonolus_fastapi.utils.response_serializer import get_response_serializer
+from sonolus_fastapi.utils.taggable_item import TaggableItem
+
+
+def make_level(name: str, source: str | None = None) -> LevelItem:
+    resource = Srl(hash="hash", url="/resource")
+    common = dict(title="t", author="a", description="", tags=[], subtitle="")
+    engine = EngineItem(
+        name="engine",
+        source="https://stale.example",
+        **common,
+        skin=SkinItem(name="skin", data=resource, texture=resource, thumbnail=resource, **common),
+        background=BackgroundItem(
+            name="background",
+            data=resource,
+            image=resource,
+            thumbnail=resource,
+            configuration=resource,
+            **common,
+        ),
+        effect=EffectItem(name="effect", data=resource, audio=resource, thumbnail=resource, **common),
+        particle=ParticleItem(name="particle", data=resource, texture=resource, thumbnail=resource, **common),
+        thumbnail=resource,
+        playData=resource,
+        watchData=resource,
+        previewData=resource,
+        tutorialData=resource,
+        configuration=resource,
+    )
+    return LevelItem(
+        name=name,
+        source=source,
+        title="Level",
+        author="Author",
+        description="",
+        tags=[Tag(title="tag")],
+        rating=1,
+        artists="Artist",
+        engine=engine,
+        useSkin={"useDefault": True},
+        useBackground={"useDefault": True},
+        useEffect={"useDefault": True},
+        useParticle={"useDefault": True},
+        cover=resource,
+        bgm=resource,
+        data=resource,
+    )
+
+
+def drop_none_values(value):
+    # 従来の処理では `List[T]` 内のアイテムが dict として再検証されるため、
+    # `exclude_none` が効かずに null のフィールドが残る
+    if isinstance(value, dict):
+        return {k: drop_none_values(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [drop_none_values(v) for v in value]
+    return value
+
+
+def build_both(response_model, result, address):
+    handler = SimpleNamespace(response_model=response_model)
+    compiled = Sonolus(address=address, enable_itemstores=False)
+    legacy = Sonolus(address=address, enable_itemstores=False, compiled_serializer=False)
+    return (
+        compiled.api._build_response(handler, result, None),
+        drop_none_values(legacy.api._build_response(handler, result, None)),
+    )
+
+
+@pytest.mark.parametrize("address", ["https://example.com", None])
+def test_compiled_serializer_matches_legacy_list(address):
+    items = [TaggableItem(make_level("a")), None, make_level("b", source="https://old")]
+    result = ServerItemList(pageCount=1, items=items)
+
+    compiled, legacy = build_both(ServerItemList, result, address)
+
+    assert compiled == legacy
+    assert len(compiled["items"]) == 2
+
+
+@pytest.mark.parametrize("address", ["https://example.com", None])
+def test_compiled_serializer_matches_legacy_dict_result(address):
+    result = {
+        "item": TaggableItem(make_level("detail")),
+        "actions": [],
+        "hasCommunity": False,
+        "leaderboards": [],
+        "sections": [
+            {
+                "title": "Levels",
+                "itemType": "level",
+                "items": [TaggableItem(make_level("nested"))],
+            }
+        ],
+    }
+
+    compiled, legacy = build_both(ServerItemDetails, result, address)
+
+    assert compiled == legacy
+
+
+def test_compiled_serializer_overrides_nested_sources():
+    info = ServerItemInfo(
+        sections=[LevelSection(title="Levels", items=[TaggableItem(make_level("a"))])]
+    )
+
+    compiled = get_response_serializer(ServerItemInfo)(info, "https://example.com")
+
+    level = compiled["sections"][0]["items"][0]
+    assert level["source"] == "https://example.com"
+    assert level["engine"]["source"] == "https://example.com"
+    assert level["engine"]["skin"]["source"] == "https://example.com"
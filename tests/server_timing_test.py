@@ -0,0 +1,61 @@
+import time
+
+from fastapi.testclient import TestClient
+from sonolus_models import ServerItemInfo
+
+from sonolus_fastapi import Sonolus
+from sonolus_fastapi.utils.timing import StageTimings, start_timer, stop_timer, timed
+
+
+def test_server_timing_header_and_summary():
+    sonolus = Sonolus(enable_itemstores=False, server_timing=True)
+
+    @sonolus.level.info(ServerItemInfo)
+    async def level_info(ctx):
+        return ServerItemInfo(sections=[])
+
+    client = TestClient(sonolus.app)
+    response = client.get("/sonolus/levels/info")
+
+    stages = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    assert stages == ["context", "handler", "validate", "serialize", "encode", "total"]
+
+    summary = sonolus.stage_timings.summary()
+    assert summary["info"]["handler"]["count"] == 1
+    assert summary["info"]["total"]["max_ms"] >= summary["info"]["handler"]["max_ms"]
+
+
+def test_server_timing_is_optional():
+    sonolus = Sonolus(enable_itemstores=False)
+
+    @sonolus.level.info(ServerItemInfo)
+    async def level_info(ctx):
+        return ServerItemInfo(sections=[])
+
+    response = TestClient(sonolus.app).get("/sonolus/levels/info")
+
+    assert "Server-Timing" not in response.headers
+    assert sonolus.stage_timings is None
+
+
+def test_nested_stages_record_exclusive_time():
+    timer, token = start_timer()
+    try:
+        with timed("handler"):
+            with timed("query"):
+                time.sleep(0.02)
+    finally:
+        stop_timer(token)
+
+    assert timer.stages["query"] >= 0.02
+    assert timer.stages["handler"] < 0.02
+
+    timings = StageTimings(window=2)
+    for _ in range(3):
+        timings.record("list", timer, 0.05)
+    assert timings.summary()["list"]["query"]["count"] == 2
+
+
+def test_timed_without_timer_is_noop():
+    with timed("handler"):
+        pass
@@ -0,0 +1,52 @@
+import asyncio
+
+import httpx
+from sonolus_models import PostItem, ServerItemDetails
+
+from sonolus_fastapi import Sonolus
+
+
+def create_sonolus(single_flight: bool):
+    sonolus = Sonolus(single_flight=single_flight)
+    calls = []
+
+    @sonolus.post.detail(ServerItemDetails)
+    async def post_detail(ctx, name):
+        calls.append(name)
+        await asyncio.sleep(0.05)
+        item = sonolus.items.post.get(name)
+        return ServerItemDetails(item=item, actions=[], hasCommunity=False, leaderboards=[], sections=[])
+
+    sonolus.items.post.add(
+        PostItem(name="a", title="Post", author="Author", description="", tags=[], version=1, time=0)
+    )
+    return sonolus, calls
+
+
+async def fetch_concurrently(sonolus: Sonolus, count: int, headers=None):
+    transport = httpx.ASGITransport(app=sonolus.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        return await asyncio.gather(
+            *(client.get("/sonolus/posts/a", headers=headers) for _ in range(count))
+        )
+
+
+def test_identical_requests_share_one_execution():
+    sonolus, calls = create_sonolus(single_flight=True)
+
+    responses = asyncio.run(fetch_concurrently(sonolus, 10))
+
+    assert calls == ["a"]
+    assert len({response.content for response in responses}) == 1
+    assert responses[0].json()["item"]["source"] == "http://testserver"
+    assert len(sonolus.api._single_flight) == 0
+
+
+def test_single_flight_is_opt_in_and_skips_sessions():
+    sonolus, calls = create_sonolus(single_flight=False)
+    asyncio.run(fetch_concurrently(sonolus, 3))
+    assert len(calls) == 3
+
+    sonolus, calls = create_sonolus(single_flight=True)
+    asyncio.run(fetch_concurrently(sonolus, 3, headers={"Sonolus-Session": "s"}))
+    assert len(calls) == 3
@@ -0,0 +1,93 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sonolus_models import ServerItemCommunityComment, ServerItemLeaderboardRecord
+
+from sonolus_fastapi import Sonolus
+from sonolus_fastapi.backend.snapshot_file import SnapshotError, read_snapshot
+
+
+@pytest.fixture
+def seed(make_post):
+    def seed(sonolus: Sonolus) -> None:
+        sonolus.items.post.add_many([make_post(f"post-{index}", time=index, tags=["even" if index % 2 == 0 else "odd"]) for index in range(6)])
+        sonolus.items.level_comments.for_item("level-a").add(
+            ServerItemCommunityComment(name="comment-1", author="Author", time=1, content="Hello", actions=[])
+        )
+        sonolus.items.level_leaderboards.for_item("level-a", "score").add(
+            ServerItemLeaderboardRecord(name="record-1", rank="1", player="Player", playerUser=None, value="1000")
+        )
+
+    return seed
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_snapshot_round_trip(tmp_path, compact, use_mmap, seed, make_post):
+    path = str(tmp_path / "memory.snapshot")
+    source = Sonolus(compact=compact)
+    seed(source)
+    assert source.save_snapshot(path) > 0
+
+    restored = Sonolus(compact=compact, snapshot_path=path, snapshot_mmap=use_mmap)
+
+    assert restored.snapshot_restored
+    post = restored.items.post
+    assert sorted(post.map()) == [f"post-{index}" for index in range(6)]
+    assert post.get("post-3").model_dump() == make_post("post-3", time=3, tags=["odd"]).model_dump()
+    assert [item.name for item in post.find_by_tags(all=["odd"]).items] == ["post-1", "post-3", "post-5"]
+    assert [item.name for item in post.list(limit=2, order_by="-time").items] == ["post-5", "post-4"]
+    assert restored.items.level_comments.for_item("level-a").get("comment-1").content == "Hello"
+    assert restored.items.level_leaderboards.for_item("level-a", "score").get("record-1").value == "1000"
+
+
+def test_restore_converts_between_compact_modes(tmp_path, seed):
+    path = str(tmp_path / "memory.snapshot")
+    source = Sonolus()
+    seed(source)
+    source.save_snapshot(path)
+
+    restored = Sonolus(compact=True, snapshot_path=path)
+
+    assert all(isinstance(raw, bytes) for raw in restored.items.post._data.values())
+    assert [item.name for item in restored.items.post.find_by_tags(all=["even"]).items] == ["post-0", "post-2", "post-4"]
+
+
+def test_missing_snapshot_starts_empty(tmp_path):
+    sonolus = Sonolus(snapshot_path=str(tmp_path / "missing.snapshot"))
+
+    assert not sonolus.snapshot_restored
+    assert sonolus.items.post.map() == {}
+
+
+def test_lifespan_writes_snapshot_on_shutdown(tmp_path, seed):
+    path = tmp_path / "memory.snapshot"
+    sonolus = Sonolus(snapshot_path=str(path))
+    seed(sonolus)
+
+    with TestClient(sonolus.app):
+        assert not path.exists()
+
+    assert sorted(read_snapshot(str(path))["items"]["post"]["data"]) == [f"post-{index}" for index in range(6)]
+
+
+def test_lifespan_is_installed_on_external_target(tmp_path, seed):
+    path = tmp_path / "memory.snapshot"
+    app = FastAPI()
+    sonolus = Sonolus(target=app, snapshot_path=str(path))
+    seed(sonolus)
+    # 同じアプリに再登録しても書き出しは1回だけ組み込まれる
+    sonolus.attach(app)
+
+    with TestClient(app):
+        assert not path.exists()
+
+    assert sorted(read_snapshot(str(path))["items"]["post"]["data"]) == [f"post-{index}" for index in range(6)]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "memory.snapshot"
+    path.write_bytes(b"not a snapshot file at all")
+
+    with pytest.raises(SnapshotError):
+        read_snapshot(str(path))
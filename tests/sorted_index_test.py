@@ -0,0 +1,77 @@
+import pytest
+from sonolus_models import PostItem
+
+from sonolus_fastapi.backend.database import _order_clause
+from sonolus_fastapi.backend.memory import MemoryItemStore
+
+
+def names(result) -> list[str]:
+    return [item.name for item in result.items]
+
+
+def test_memory_index_is_updated_on_writes(make_post):
+    store = MemoryItemStore(PostItem, indexes=["time"])
+    for index in range(30):
+        store.add(make_post(f"post-{index}", time=index))
+
+    assert names(store.list(limit=3, order_by="-time")) == ["post-29", "post-28", "post-27"]
+    assert names(store.list(limit=2, offset=28, order_by="time")) == ["post-28", "post-29"]
+
+    store.update(make_post("post-0", time=100))
+    store.delete("post-29")
+
+    assert names(store.list(limit=2, order_by="-time")) == ["post-0", "post-28"]
+    assert names(store.list(limit=2, offset=28, order_by="-time")) == ["post-1"]
+    assert store.list(order_by="-time").total_count == 29
+
+
+def test_memory_index_is_created_on_first_use(make_post):
+    store = MemoryItemStore(PostItem)
+    store.add(make_post("b", title="B"))
+    store.add(make_post("a", title="A"))
+
+    assert names(store.list(order_by="title")) == ["a", "b"]
+    assert "title" in store._indexes
+
+    store.add(make_post("c", title="0"))
+    assert names(store.list(order_by="title")) == ["c", "a", "b"]
+
+
+@pytest.mark.parametrize("order_by", ["missing", "tags", "-authorUser", "thumbnail"])
+def test_unknown_or_non_scalar_order_by_field_is_rejected(order_by):
+    with pytest.raises(ValueError):
+        MemoryItemStore(PostItem).list(order_by=order_by)
+    with pytest.raises(ValueError):
+        MemoryItemStore(PostItem, indexes=[order_by.lstrip("-")])
+
+
+def test_database_order_by_depends_on_dialect():
+    clause, params = _order_clause("postgresql", "time", True)
+    assert "jsonb" in clause and "NULLS LAST" in clause and params == {"order_key": "time"}
+    assert _order_clause("sqlite", "time", False)[1] == {"order_path": "$.time"}
+    with pytest.raises(ValueError):
+        _order_clause("mysql", "time", False)
+
+
+def test_backends_order_the_same_way(store, make_post):
+    for name, time in [("b", 2), ("a", 2), ("c", 0), ("d", 1)]:
+        store.add(make_post(name, name.upper(), time=time))
+
+    assert names(store.list(order_by="time")) == ["c", "d", "a", "b"]
+    assert names(store.list(order_by="-time", limit=2)) == ["b", "a"]
+    assert names(store.list(order_by="-title", offset=1, limit=2)) == ["c", "b"]
+
+
+def test_memory_index_follows_items_edited_in_place(make_post):
+    store = MemoryItemStore(PostItem, indexes=["title"])
+    store.add(make_post("p1", title="a"))
+    store.add(make_post("p2", title="c"))
+
+    item = store.get("p1")
+    item.title = "z"
+    store.update(item)
+
+    result = store.list(order_by="title")
+    assert names(result) == ["p2", "p1"]
+    assert result.total_count == 2
+    assert len(store._indexes["title"]) == 2
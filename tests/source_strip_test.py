@@ -0,0 +1,66 @@
+import json
+
+from sonolus_models import PostItem
+
+from sonolus_fastapi.backend.json import JsonItemStore
+from sonolus_fastapi.backend.memory import MemoryItemStore
+from sonolus_fastapi.utils.source import has_source_fields, strip_source_fields
+
+
+def test_strip_is_skipped_without_source(make_post):
+    item = make_post("a")
+
+    assert not has_source_fields(item)
+    assert strip_source_fields(item) is item
+    assert has_source_fields({"nested": [{"source": None}]})
+
+
+def test_strip_removes_source_when_present(make_post):
+    item = make_post("a", source="https://example.com")
+
+    assert has_source_fields(item)
+    stripped = strip_source_fields(item)
+    assert stripped is not item
+    assert stripped.source is None
+    assert item.source == "https://example.com"
+
+
+def test_stores_do_not_keep_source(store, make_post):
+    store.add(make_post("a", source="https://example.com"))
+    store.add_many([make_post("b", source="https://example.com"), make_post("c")])
+
+    assert [store.get(name).source for name in "abc"] == [None, None, None]
+    if isinstance(store, JsonItemStore):
+        with open(store.file, encoding="utf-8") as f:
+            assert all(raw.get("source") is None for raw in json.load(f).values())
+
+
+def test_memory_store_writes_without_a_round_trip(monkeypatch, make_post):
+    from sonolus_fastapi.utils import source
+
+    store = MemoryItemStore(PostItem)
+    item = make_post("a")
+    store.add(item)
+    # source がなければコピーも再検証もせずにそのまま保持する
+    assert store._data["a"] is item
+
+    compact = MemoryItemStore(PostItem, compact=True)
+
+    def walk(_value):
+        raise AssertionError("compact writes check the dumped JSON instead of walking the model")
+
+    monkeypatch.setattr(source, "has_source_fields", walk)
+    compact.add(make_post("b"))
+    assert json.loads(compact._data["b"])["source"] is None
+    monkeypatch.undo()
+
+    compact.add(make_post("c", source="https://example.com"))
+    assert json.loads(compact._data["c"])["source"] is None
+
+
+def test_json_has_source_only_matches_keys(make_post):
+    from sonolus_fastapi.utils.source import json_has_source
+
+    assert json_has_source(make_post("a", source="https://example.com").model_dump_json())
+    assert not json_has_source(make_post("a").model_dump_json())
+    assert not json_has_source(make_post("a", '"source":"x"').model_dump_json().encode())
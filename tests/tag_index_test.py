@@ -0,0 +1,95 @@
+import json
+
+from sonolus_models import PostItem, Tag
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from sonolus_fastapi.backend.database import DatabaseItemStore
+from sonolus_fastapi.backend.memory import MemoryItemStore
+from sonolus_fastapi.backend.tag_index import TagIndex
+
+
+def names(result) -> list[str]:
+    return [item.name for item in result.items]
+
+
+def test_find_by_tags(store, make_post):
+    store.add(make_post("a", tags=["easy", "new"]))
+    store.add(make_post("b", tags=["hard", "new"]))
+    store.add(make_post("c", tags=["hard"]))
+    store.add(make_post("d"))
+
+    assert names(store.find_by_tags(all=["new"])) == ["a", "b"]
+    assert names(store.find_by_tags(all=["hard", "new"])) == ["b"]
+    assert names(store.find_by_tags(any=["easy", "hard"])) == ["a", "b", "c"]
+    assert names(store.find_by_tags(all=["new"], any=["hard", "missing"])) == ["b"]
+    assert names(store.find_by_tags(all=["missing"])) == []
+
+    result = store.find_by_tags(any=["easy", "hard"], limit=1, offset=1)
+    assert names(result) == ["b"]
+    assert result.total_count == 3
+
+    store.update(make_post("a", tags=["hard"]))
+    store.delete("b")
+    assert names(store.find_by_tags(all=["hard"])) == ["a", "c"]
+    assert names(store.find_by_tags(all=["new"])) == []
+
+
+def test_database_backfills_existing_items(tmp_path, make_post):
+    url = f"sqlite:///{tmp_path / 'db.sqlite'}"
+    store = DatabaseItemStore(PostItem, url=url)
+    with store.engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO items (name, item_type, data) VALUES (:name, :item_type, :data)"),
+            {"name": "a", "item_type": store.item_type, "data": json.dumps(make_post("a", tags=["old"]).model_dump(mode="json"))},
+        )
+
+        # タグテーブルができる前のデータベースには移行済みの記録がない
+        conn.execute(text("DELETE FROM item_tags_backfilled"))
+
+    reopened = DatabaseItemStore(PostItem, url=url)
+
+    assert names(reopened.find_by_tags(all=["old"])) == ["a"]
+
+
+def test_database_backfill_runs_once_for_untagged_items(tmp_path, make_post):
+    url = f"sqlite:///{tmp_path / 'db.sqlite'}"
+    DatabaseItemStore(PostItem, url=url).add(make_post("a"))
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        DatabaseItemStore(PostItem, url=url)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+    # タグのないアイテムだけでも、起動のたびに全件を読み直さない
+    assert not any("SELECT name, data FROM items" in statement for statement in statements)
+
+
+def test_intersection_starts_from_smallest_posting_list():
+    index = TagIndex((f"item-{number}", {"tags": [{"title": "common"}]}) for number in range(1000))
+    index.insert("item-1", {"tags": [{"title": "rare"}]})
+
+    assert index.find(all=["common", "rare"]) == {"item-1"}
+    assert index.find() is None
+    assert index.tags() == {"common": 1000, "rare": 1}
+
+
+def test_memory_tags_follow_items_edited_in_place(make_post):
+    store = MemoryItemStore(PostItem)
+    store.add(make_post("a", tags=["old"]))
+    store.add(make_post("b", tags=["old"]))
+
+    item = store.get("a")
+    item.tags = [Tag(title="new")]
+    store.update(item)
+
+    assert names(store.find_by_tags(all=["old"])) == ["b"]
+    assert names(store.find_by_tags(all=["new"])) == ["a"]
+
+    store.delete("a")
+    assert names(store.find_by_tags(all=["new"])) == []
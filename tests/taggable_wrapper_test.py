@@ -0,0 +1,45 @@
+from sonolus_models import PostItem, ServerItemList
+
+from sonolus_fastapi.backend.memory import MemoryItemStore
+from sonolus_fastapi.utils.taggable_item import TaggableItem, wrap_taggable_item
+
+
+def test_wrapper_forwards_fields_and_methods(make_post):
+    item = make_post("a")
+    wrapper = wrap_taggable_item(item)
+
+    assert isinstance(wrapper, TaggableItem)
+    assert wrapper.name == "a"
+    assert wrapper.unwrap() is item
+    assert wrapper == item
+    assert wrapper.model_dump()["title"] == "a"
+    assert wrapper.with_tags(["x"]).tags[0].title == "x"
+
+    wrapper.title = "Renamed"
+    assert item.title == "Renamed"
+
+
+def test_map_reuses_wrappers_until_items_change(make_post):
+    store = MemoryItemStore(PostItem)
+    store.add(make_post("a"))
+    store.add(make_post("b"))
+
+    first = store.map()
+    assert store.map() is not first
+    assert store.map()["a"] is first["a"]
+    assert store.get("a") is first["a"]
+
+    store.update(make_post("b", "New"))
+    second = store.map()
+    assert list(second) == ["a", "b"]
+    assert second["a"] is first["a"]
+    assert second["b"] is not first["b"]
+    assert second["b"].title == "New"
+
+
+def test_nested_wrappers_are_unwrapped_by_validation(make_post):
+    items = [wrap_taggable_item(make_post("a")), wrap_taggable_item(make_post("b"))]
+    result = ServerItemList.model_validate({"pageCount": 1, "items": items})
+
+    assert [type(item) for item in result.items] == [PostItem, PostItem]
+    assert ServerItemList(pageCount=1, items=items).model_dump()["items"][0]["name"] == "a"
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+from sonolus_models import PostItem
+
+from sonolus_fastapi.backend.memory import MemoryItemStore
+from sonolus_fastapi.search.text_index import TextIndex, build_text_index
+from sonolus_fastapi.utils.query_executor import apply_query, search_items
+
+
+def test_search_ranks_title_matches_first(make_post):
+    index = TextIndex()
+    index.add("a", make_post("a", "Other", description="a song about stars"))
+    index.add("b", make_post("b", "Stars"))
+    index.add("c", make_post("c", "Nothing"))
+
+    assert index.search("STARS") == (["b", "a"], 2)
+    assert index.search("stars", limit=1, offset=1) == (["a"], 2)
+    assert index.search("missing") == ([], 0)
+
+
+def test_search_matches_japanese_and_full_width_text(make_post):
+    index = TextIndex()
+    index.add("a", make_post("a", "千本桜"))
+    index.add("b", make_post("b", "桜の季節"))
+    index.add("c", make_post("c", "ＡＢＣ"))
+
+    assert index.search("桜")[0] == ["b", "a"]
+    assert index.search("千本")[0] == ["a"]
+    assert index.search("本千")[0] == []
+    assert index.search("abc")[0] == ["c"]
+    assert index.search("桜 千本")[0] == ["a"]
+
+
+def test_store_index_follows_writes(make_post):
+    store = MemoryItemStore(PostItem)
+    store.add(make_post("a", "First"))
+    index = build_text_index(store)
+
+    store.add(make_post("b", "First again"))
+    store.update(make_post("a", "Renamed"))
+    store.delete("b")
+
+    assert index.search("first") == ([], 0)
+    assert index.search("renamed")[0] == ["a"]
+    assert len(index) == 1
+
+
+def test_apply_query_matches_all_fields(make_post):
+    items = [make_post("a", "Title", author="Someone"), make_post("b", "Title")]
+    query = SimpleNamespace(keywords="someone")
+
+    assert [item.name for item in apply_query(items, query)] == ["a"]
+
+
+def test_search_items_reads_only_the_page(make_post):
+    store = MemoryItemStore(PostItem)
+    store.add_many(make_post(f"post-{index}", f"Title {index}") for index in range(30))
+    index = build_text_index(store)
+    read = []
+    get_many = store.get_many
+    store.get_many = lambda names: (read.extend(names), get_many(names))[1]
+
+    result = search_items(store, SimpleNamespace(keywords="title"), index, limit=5, offset=10)
+
+    assert result.total_count == 30
+    assert [item.name for item in result.items] == read == index.search("title", limit=5, offset=10)[0]
+    assert search_items(store, SimpleNamespace(keywords=None), index, limit=3).total_count == 30
@@ -0,0 +1,22 @@
+from fastapi.testclient import TestClient
+from sonolus_models import SonolusServerInfo
+
+from sonolus_fastapi import Sonolus
+
+
+def test_version_header_only_under_prefix():
+    sonolus = Sonolus(version="1.2.3")
+
+    @sonolus.server.server_info(SonolusServerInfo)
+    async def server_info(ctx):
+        return SonolusServerInfo(title="Server", buttons=[], configuration={"options": []})
+
+    @sonolus.app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    client = TestClient(sonolus.app)
+
+    assert client.get("/sonolus/info").headers["Sonolus-Version"] == "1.2.3"
+    assert client.get("/sonolus/levels/missing").headers["Sonolus-Version"] == "1.2.3"
+    assert "Sonolus-Version" not in client.get("/health").headers